@@ -0,0 +1,217 @@
+"""
+Agregações de uma estação calculadas uma única vez e compartilhadas pelos gráficos.
+
+Os gráficos de `main.py` usam as mesmas tabelas (totais anuais, totais mensais,
+climatologia por mês do ano, pentadas, ano x pentada). Em vez de cada função
+refazer o seu groupby sobre o DataFrame diário, `calcular_agregados` monta todas
+as tabelas de uma vez e os gráficos leem daqui.
+"""
+
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass
+class AgregadosEstacao:
+    """Tabelas agregadas de uma estação (derivadas do DataFrame de `carregar_dados`)."""
+
+    # Série mensal: ano_mes, precip_total, n_dias, media_diaria, std_diaria, data
+    mensal: pd.DataFrame
+    # Precipitação total por ano (índice: ano)
+    anual: pd.Series
+    # Climatologia diária por mês do ano: colunas mean, std (índice: mes 1-12)
+    climatologia: pd.DataFrame
+    # Pentadas 1-6: pentada, precip_total, media_diaria, std_diaria, n_dias
+    pentadal: pd.DataFrame
+    # Total por ano e pentada: ano, pentada, precip
+    pentadal_anual: pd.DataFrame
+    # Valores diários separados por mês do ano (lista de 12 arrays, Jan..Dez)
+    # None quando os agregados vêm de Acumuladores (sem os valores diários)
+    por_mes: Optional[list]
+    # Valores diários com chuva (> 0 mm); None nas mesmas condições
+    dias_com_chuva: Optional[np.ndarray]
+
+
+def _agregar_mensal(df):
+    """Total, contagem, média e desvio padrão diários por período mensal."""
+    mensal_agg = df.groupby("ano_mes")["precip"].agg(
+        ["sum", "count", "mean", "std"]
+    ).reset_index()
+
+    mensal_agg.columns = ["ano_mes", "precip_total", "n_dias", "media_diaria", "std_diaria"]
+
+    # Converter para série temporal com índice de data
+    mensal_agg["data"] = mensal_agg["ano_mes"].dt.to_timestamp()
+    return mensal_agg.sort_values("data").reset_index(drop=True)
+
+def _agregar_pentadal(df):
+    """Estatísticas por pentada (limitadas às pentadas 1-6)."""
+    pentadal_agg = df[df["pentada"] <= 6].groupby("pentada")["precip"].agg(
+        ["sum", "mean", "std", "count"]
+    ).reset_index()
+
+    pentadal_agg.columns = ["pentada", "precip_total", "media_diaria", "std_diaria", "n_dias"]
+    return pentadal_agg
+
+def _separar_por_mes(df):
+    """Separa os valores diários por mês do ano com uma única ordenação."""
+    mes = df["mes"].to_numpy()
+    ordem = np.argsort(mes, kind="stable")
+    precip_ordenada = df["precip"].to_numpy()[ordem]
+    limites = np.searchsorted(mes[ordem], np.arange(2, 13))
+    return np.split(precip_ordenada, limites)
+
+def calcular_agregados(df):
+    """Calcula todas as tabelas usadas pelos gráficos de uma estação."""
+    precip = df["precip"].to_numpy()
+
+    return AgregadosEstacao(
+        mensal=_agregar_mensal(df),
+        anual=df.groupby("ano")["precip"].sum(),
+        climatologia=df.groupby("mes")["precip"].agg(["mean", "std"]),
+        pentadal=_agregar_pentadal(df),
+        pentadal_anual=df.groupby(["ano", "pentada"])["precip"].sum().reset_index(),
+        por_mes=_separar_por_mes(df),
+        dias_com_chuva=precip[precip > 0],
+    )
+
+def como_agregados(dados):
+    """Aceita um AgregadosEstacao ou o DataFrame diário (calculando os agregados)."""
+    if isinstance(dados, AgregadosEstacao):
+        return dados
+    return calcular_agregados(dados)
+
+
+# ===============================
+# ACUMULADORES MESCLÁVEIS
+# ===============================
+# Cada tabela guarda, por grupo, a contagem de valores válidos (n), a soma e a
+# soma dos quadrados dos desvios em relação à média (m2). Tabelas de partes
+# diferentes da série (ex.: o histórico e as linhas novas) são mescladas sem
+# revisitar os dados diários, e médias/desvios são derivados no final.
+
+def _momentos(df, chave):
+    """Tabela de momentos (n, soma, m2) da precipitação por `chave`."""
+    agg = df.groupby(chave)["precip"].agg(["count", "sum", "var"])
+    return pd.DataFrame({
+        "n": agg["count"].astype(np.int64),
+        "soma": agg["sum"].astype(float),
+        "m2": (agg["var"] * (agg["count"] - 1)).fillna(0.0),
+    })
+
+def _mesclar_momentos(a, b):
+    """Combina duas tabelas de momentos (junção externa pelos grupos)."""
+    a, b = a.align(b, join="outer", fill_value=0)
+    n = a["n"] + b["n"]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        delta = b["soma"] / b["n"] - a["soma"] / a["n"]
+        correcao = (delta ** 2 * a["n"] * b["n"] / n).where((a["n"] > 0) & (b["n"] > 0), 0.0)
+    return pd.DataFrame({
+        "n": n.astype(np.int64),
+        "soma": a["soma"] + b["soma"],
+        "m2": a["m2"] + b["m2"] + correcao,
+    })
+
+def _reduzir_momentos(tabela, chave):
+    """Agrupa uma tabela de momentos por `chave` (array alinhado ao índice)."""
+    grupos = tabela.groupby(chave)
+    n = grupos["n"].sum()
+    soma = grupos["soma"].sum()
+    with np.errstate(invalid="ignore", divide="ignore"):
+        media_grupo = (soma / n).reindex(chave).to_numpy()
+        desvio = tabela["soma"].to_numpy() / tabela["n"].to_numpy() - media_grupo
+    entre_grupos = pd.Series(np.nan_to_num(tabela["n"].to_numpy() * desvio ** 2), index=tabela.index)
+    return pd.DataFrame({
+        "n": n,
+        "soma": soma,
+        "m2": grupos["m2"].sum() + entre_grupos.groupby(chave).sum(),
+    })
+
+def _media_desvio(momentos):
+    """Média e desvio padrão amostral (ddof=1) a partir dos momentos."""
+    n = momentos["n"]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        media = (momentos["soma"] / n).where(n > 0)
+        desvio = np.sqrt(momentos["m2"] / (n - 1)).where(n > 1)
+    return media, desvio
+
+@dataclass
+class Acumuladores:
+    """
+    Somas parciais de uma estação, mescláveis entre partes da série.
+
+    - mensal: índice = ordinal do período mensal (pd.Period("M").ordinal)
+    - ano_pentada: índice = (ano, pentada)
+    Ambas com colunas n, soma e m2.
+    """
+
+    mensal: pd.DataFrame
+    ano_pentada: pd.DataFrame
+
+    @classmethod
+    def de_dataframe(cls, df):
+        """Acumuladores de um DataFrame diário (formato de carregar_dados)."""
+        ordinais = pd.Series(df["ano_mes"].array.asi8, index=df.index, name="ordinal")
+        return cls(
+            mensal=_momentos(df.assign(ordinal=ordinais), "ordinal"),
+            ano_pentada=_momentos(df, ["ano", "pentada"]),
+        )
+
+    def mesclar(self, outro):
+        """Novos acumuladores com as somas deste e de `outro`."""
+        return Acumuladores(
+            mensal=_mesclar_momentos(self.mensal, outro.mensal),
+            ano_pentada=_mesclar_momentos(self.ano_pentada, outro.ano_pentada),
+        )
+
+    def agregados(self):
+        """
+        AgregadosEstacao derivado das somas parciais.
+
+        Os valores diários não são guardados, então por_mes e dias_com_chuva ficam None.
+        """
+        mensal_mom = self.mensal.sort_index()
+        ordinais = mensal_mom.index.to_numpy(dtype=np.int64)
+        ano_mes = pd.arrays.PeriodArray(ordinais, dtype=pd.PeriodDtype("M"))
+        media, desvio = _media_desvio(mensal_mom)
+        mensal = pd.DataFrame({
+            "ano_mes": ano_mes,
+            "precip_total": mensal_mom["soma"].to_numpy(),
+            "n_dias": mensal_mom["n"].to_numpy(),
+            "media_diaria": media.to_numpy(),
+            "std_diaria": desvio.to_numpy(),
+        })
+        mensal["data"] = mensal["ano_mes"].dt.to_timestamp()
+
+        ano = pd.Index(ordinais // 12 + 1970, name="ano")
+        anual = pd.Series(mensal_mom["soma"].to_numpy(), index=ano, name="precip").groupby(level=0).sum()
+
+        clima_mom = _reduzir_momentos(mensal_mom, pd.Index(ordinais % 12 + 1, name="mes"))
+        clima_media, clima_desvio = _media_desvio(clima_mom)
+        climatologia = pd.DataFrame({"mean": clima_media, "std": clima_desvio})
+
+        pent_mom = self.ano_pentada.sort_index()
+        pentada = pent_mom.index.get_level_values("pentada")
+        pent_total = _reduzir_momentos(pent_mom[pentada <= 6], pd.Index(pentada[pentada <= 6], name="pentada"))
+        pent_media, pent_desvio = _media_desvio(pent_total)
+        pentadal = pd.DataFrame({
+            "pentada": pent_total.index.to_numpy(),
+            "precip_total": pent_total["soma"].to_numpy(),
+            "media_diaria": pent_media.to_numpy(),
+            "std_diaria": pent_desvio.to_numpy(),
+            "n_dias": pent_total["n"].to_numpy(),
+        })
+        pentadal_anual = pent_mom["soma"].rename("precip").reset_index()
+
+        return AgregadosEstacao(
+            mensal=mensal,
+            anual=anual,
+            climatologia=climatologia,
+            pentadal=pentadal,
+            pentadal_anual=pentadal_anual,
+            por_mes=None,
+            dias_com_chuva=None,
+        )
@@ -0,0 +1,306 @@
+"""
+Backtest walk-forward (origem móvel) das previsões mensais do GLM.
+
+O `train_test_split` de glm_predicao.py sorteia os meses, então o treino contém
+meses posteriores aos de teste. Aqui cada origem o usa só os meses anteriores a
+ela para ajustar o modelo (mesmas variáveis do GLM: constante, t, mes e
+precip_lag1) e prevê os `horizonte` meses seguintes de forma recursiva (a
+defasagem dos passos seguintes é a própria previsão).
+
+- Janela expansiva (todo o histórico até a origem) ou deslizante (os últimos
+  `tamanho_janela` meses).
+- Gaussiana: mínimos quadrados recursivos, com atualização de posto um a cada
+  mês que entra na janela (e remoção do que sai, na janela deslizante), em vez
+  de reajustar do zero.
+- Gamma: as origens de cada bloco são ajustadas juntas pelo IRLS em lote de irls.py.
+- As origens de cada (estação, família) são divididas em blocos contíguos,
+  processados em paralelo.
+
+Saída: erros por origem e horizonte e a tabela de MAE/RMSE por horizonte em
+output/graficos/GLM_Predicoes/backtest_walk_forward.csv.
+
+Uso:
+    python backtest.py [--painel] [--janela expansiva|deslizante] [--horizonte 12] [--workers 4]
+"""
+
+import argparse
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import statsmodels.api as sm
+
+from glm_predicao import ESTACOES, FAMILIAS, GLM_DIR, carregar_dados_estacao
+from irls import ajustar_irls
+from painel import PAINEL_DIR, Painel
+
+warnings.filterwarnings('ignore')
+
+# ===============================
+# CONFIGURAÇÕES
+# ===============================
+HORIZONTE = 12        # meses à frente
+TREINO_MINIMO = 60    # meses de treino antes da primeira origem
+TAMANHO_JANELA = 120  # meses na janela deslizante
+JANELAS = ("expansiva", "deslizante")
+
+ARQUIVO_RESUMO = GLM_DIR / "backtest_walk_forward.csv"
+
+
+def _familia_sm(familia):
+    return sm.families.Gamma() if familia == 'gamma' else sm.families.Gaussian()
+
+def _matriz(df):
+    """Linhas i >= 1: x_i = [1, t_i, mes_i, y_(i-1)], alvo y_i (mesma ordem das colunas do GLM)."""
+    y = df['precip_mm'].to_numpy(dtype=float)
+    t = np.arange(len(y), dtype=float)
+    mes = df['periodo'].dt.month.to_numpy(dtype=float)
+    X = np.column_stack([np.ones(len(y)), t, mes, np.r_[np.nan, y[:-1]]])
+    return X, y, t, mes
+
+# ===============================
+# AJUSTE POR ORIGEM
+# ===============================
+def _coeficientes_gaussiana(X, y, origens, inicio_janela):
+    """
+    Coeficientes de mínimos quadrados em cada origem, por atualizações de posto um.
+
+    O treino da origem o são as linhas [inicio_janela(o), o), com inicio_janela >= 1.
+    Linhas com NaN (meses incompletos e os meses seguintes, sem defasagem) não
+    entram no ajuste.
+    """
+    valido = np.isfinite(X).all(axis=1) & np.isfinite(y)
+    coefs = np.empty((len(origens), X.shape[1]))
+    P = b = None
+    ini_atual = fim_atual = None
+
+    for k, o in enumerate(origens):
+        ini = inicio_janela(o)
+        if P is None or ini < ini_atual or o < fim_atual:
+            # Primeira origem do bloco: solução direta
+            usar = valido[ini:o]
+            Xj, yj = X[ini:o][usar], y[ini:o][usar]
+            P = np.linalg.inv(Xj.T @ Xj)
+            b = P @ (Xj.T @ yj)
+        else:
+            # Entram as linhas [fim_atual, o)
+            for i in range(fim_atual, o):
+                if not valido[i]:
+                    continue
+                x = X[i]
+                Px = P @ x
+                ganho = Px / (1.0 + x @ Px)
+                b = b + ganho * (y[i] - x @ b)
+                P = P - np.outer(ganho, Px)
+            # Saem as linhas [ini_atual, ini) (janela deslizante)
+            for i in range(ini_atual, ini):
+                if not valido[i]:
+                    continue
+                x = X[i]
+                Px = P @ x
+                P = P + np.outer(Px, Px) / (1.0 - x @ Px)
+                b = b - (P @ x) * (y[i] - x @ b)
+        ini_atual, fim_atual = ini, o
+        coefs[k] = b
+
+    return coefs
+
+def _coeficientes_gamma(X, y, origens, inicio_janela):
+    """
+    Coeficientes do GLM Gamma em cada origem, com todas as origens ajustadas juntas.
+
+    A janela de cada origem vira uma linha de pesos 0/1 sobre a mesma matriz X
+    e o IRLS em lote (irls.py) ajusta todas de uma vez. Origens cujo ajuste não
+    convergiu ficam com coeficientes NaN (descartadas, sem previsão).
+    """
+    linhas = np.arange(1, len(y))
+    inicios = np.array([inicio_janela(o) for o in origens])
+    valido = np.isfinite(X[1:]).all(axis=1)
+    # Meses sem chuva ficam de fora, como no ajuste Gamma de glm_predicao.py (NaN também)
+    pesos = (linhas >= inicios[:, None]) & (linhas < origens[:, None]) & (y[1:] > 0) & valido
+    ajuste = ajustar_irls(np.where(valido[:, None], X[1:], 0.0), y[1:], pesos.astype(float), familia="gamma")
+    return np.where(ajuste.convergiu[:, None], ajuste.params, np.nan)
+
+def _prever_recursivo(coefs, origens, X, y, horizonte, familia):
+    """
+    Previsões (origens x horizonte) para todas as origens de uma vez; NaN além do fim da série.
+
+    Na Gamma, uma média prevista <= 0 (preditor linear negativo na ligação inversa)
+    está fora do domínio da família: a previsão e as seguintes da origem ficam NaN.
+    """
+    inversa = _familia_sm(familia).link.inverse
+    n = len(y)
+    previsto = np.full((len(origens), horizonte), np.nan)
+    defasagem = y[origens - 1]
+
+    for h in range(horizonte):
+        linha = origens + h
+        dentro = linha < n
+        x = X[np.minimum(linha, n - 1)].copy()
+        x[:, 3] = defasagem
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            previsao = inversa(np.einsum("ij,ij->i", x, coefs))
+        if familia == 'gamma':
+            previsao[~(previsao > 0)] = np.nan
+        previsto[dentro, h] = previsao[dentro]
+        defasagem = previsao
+
+    return previsto
+
+def backtest_origens(df, familia, origens, horizonte=HORIZONTE, janela="expansiva",
+                     tamanho_janela=TAMANHO_JANELA):
+    """
+    Erros (observado - previsto) de cada origem em `origens` e cada horizonte 1..`horizonte`.
+
+    Retorna DataFrame com colunas origem, periodo_origem, horizonte, observado,
+    previsto, erro e descartada (origem sem ajuste convergido). Entram todos os
+    meses observados: previsto e erro ficam NaN nas origens descartadas e nas
+    previsões inválidas (média Gamma <= 0).
+    """
+    if janela not in JANELAS:
+        raise ValueError(f"Janela inválida: {janela!r} (use {', '.join(JANELAS)})")
+
+    X, y, _, _ = _matriz(df)
+    origens = np.asarray(origens, dtype=np.int64)
+    if janela == "expansiva":
+        inicio_janela = lambda o: 1
+    else:
+        inicio_janela = lambda o: max(1, o - tamanho_janela)
+
+    if familia == 'gamma':
+        coefs = _coeficientes_gamma(X, y, origens, inicio_janela)
+    else:
+        coefs = _coeficientes_gaussiana(X, y, origens, inicio_janela)
+
+    descartada = ~np.isfinite(coefs).all(axis=1)
+    previsto = _prever_recursivo(coefs, origens, X, y, horizonte, familia)
+    linhas = origens[:, None] + np.arange(horizonte)[None, :]
+    observado = np.where(linhas < len(y), y[np.minimum(linhas, len(y) - 1)], np.nan)
+
+    erros = pd.DataFrame({
+        "origem": np.repeat(origens, horizonte),
+        "periodo_origem": np.repeat(df['periodo'].to_numpy()[origens], horizonte),
+        "horizonte": np.tile(np.arange(1, horizonte + 1), len(origens)),
+        "observado": observado.ravel(),
+        "previsto": previsto.ravel(),
+        "descartada": np.repeat(descartada, horizonte),
+    })
+    erros["erro"] = erros["observado"] - erros["previsto"]
+    return erros.dropna(subset=["observado"]).reset_index(drop=True)
+
+# ===============================
+# VÁRIAS ESTAÇÕES EM PARALELO
+# ===============================
+def _tarefa(nome_estacao, familia, df, origens, opcoes):
+    erros = backtest_origens(df, familia, origens, **opcoes)
+    erros.insert(0, "Distribuição", familia.capitalize())
+    erros.insert(0, "Estação", nome_estacao)
+    return erros
+
+def resumir_erros(erros):
+    """
+    MAE e RMSE por estação, distribuição e horizonte, sobre as N previsões válidas.
+
+    "Descartadas" conta as origens sem ajuste convergido e "Inválidas" as
+    previsões com média Gamma <= 0; nenhuma das duas entra no MAE/RMSE.
+    """
+    invalida = erros["erro"].isna() & ~erros["descartada"]
+    grupos = erros.assign(erro_abs=erros["erro"].abs(), erro_quad=erros["erro"] ** 2,
+                          invalida=invalida).groupby(["Estação", "Distribuição", "horizonte"], sort=False)
+    resumo = grupos.agg(N=("erro", "count"), Descartadas=("descartada", "sum"), Inválidas=("invalida", "sum"),
+                        MAE=("erro_abs", "mean"), RMSE=("erro_quad", "mean")).reset_index()
+    resumo["RMSE"] = np.sqrt(resumo["RMSE"])
+    return resumo.rename(columns={"horizonte": "Horizonte"})
+
+def backtest(series, familias=FAMILIAS, horizonte=HORIZONTE, janela="expansiva",
+             tamanho_janela=TAMANHO_JANELA, treino_minimo=TREINO_MINIMO, passo=1, workers=1):
+    """
+    Backtest walk-forward de todas as estações de `series` ({nome: DataFrame mensal}).
+
+    As origens de cada (estação, família) são divididas em `workers` blocos
+    contíguos; dentro de cada bloco os ajustes são incrementais.
+    Retorna (erros, resumo).
+    """
+    opcoes = {"horizonte": horizonte, "janela": janela, "tamanho_janela": tamanho_janela}
+    tarefas = []
+    for nome_estacao, df in series.items():
+        origens = np.arange(max(treino_minimo, 2), len(df), passo)
+        if len(origens) == 0:
+            continue
+        for familia in familias:
+            for bloco in np.array_split(origens, min(max(1, workers), len(origens))):
+                tarefas.append((nome_estacao, familia, df, bloco, opcoes))
+
+    if workers <= 1 or len(tarefas) <= 1:
+        partes = [_tarefa(*tarefa) for tarefa in tarefas]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            partes = list(pool.map(_tarefa, *zip(*tarefas)))
+
+    if not partes:
+        raise ValueError("Nenhuma estação com meses suficientes para o backtest")
+    erros = pd.concat(partes, ignore_index=True)
+    return erros, resumir_erros(erros)
+
+# ===============================
+# EXECUÇÃO PRINCIPAL
+# ===============================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backtest walk-forward das previsões mensais do GLM")
+    parser.add_argument("--painel", nargs="?", type=Path, const=PAINEL_DIR, default=None,
+                        help="lê as séries do painel (padrão: %(const)s) em vez das séries de main.py")
+    parser.add_argument("--janela", choices=JANELAS, default="expansiva",
+                        help="janela de treino (padrão: %(default)s)")
+    parser.add_argument("--tamanho-janela", type=int, default=TAMANHO_JANELA,
+                        help="meses na janela deslizante (padrão: %(default)d)")
+    parser.add_argument("--horizonte", type=int, default=HORIZONTE,
+                        help="meses à frente (padrão: %(default)d)")
+    parser.add_argument("--treino-minimo", type=int, default=TREINO_MINIMO,
+                        help="meses antes da primeira origem (padrão: %(default)d)")
+    parser.add_argument("--passo", type=int, default=1,
+                        help="meses entre origens consecutivas (padrão: %(default)d)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="processos em paralelo (padrão: 1)")
+    args = parser.parse_args()
+
+    print("\n" + "="*70)
+    print("🔁 BACKTEST WALK-FORWARD - GLM MENSAL")
+    print("="*70)
+
+    painel = Painel.abrir(args.painel) if args.painel else None
+    estacoes = ESTACOES if painel is None else {e["nome"]: e["pasta"] for e in painel.estacoes}
+    series = {}
+    for nome_estacao, pasta_estacao in estacoes.items():
+        df = carregar_dados_estacao(pasta_estacao, painel)
+        if df is None:
+            print(f"✗ {nome_estacao}: dados não encontrados")
+        else:
+            series[nome_estacao] = df
+
+    print(f"\n📊 {len(series)} estação(ões) | janela {args.janela} | horizonte {args.horizonte} meses\n")
+    erros, resumo = backtest(
+        series,
+        horizonte=args.horizonte,
+        janela=args.janela,
+        tamanho_janela=args.tamanho_janela,
+        treino_minimo=args.treino_minimo,
+        passo=args.passo,
+        workers=args.workers,
+    )
+    resumo.insert(2, "Janela", args.janela)
+    resumo.to_csv(ARQUIVO_RESUMO, index=False)
+
+    print(f"✓ {erros['origem'].nunique()} origens x {len(series)} estações | {erros['erro'].count()} previsões avaliadas")
+    origens = erros[erros["horizonte"] == 1]
+    descartadas = origens.groupby(["Estação", "Distribuição"], sort=False)["descartada"].sum()
+    for (nome_estacao, familia), n in descartadas[descartadas > 0].items():
+        print(f"⚠️  {nome_estacao} ({familia}): {n} origens sem ajuste convergido, descartadas")
+    if resumo["Inválidas"].any():
+        print(f"⚠️  {resumo['Inválidas'].sum()} previsões Gamma com média <= 0 fora do MAE/RMSE "
+              f"(coluna Inválidas)")
+    print(f"✓ Tabela salva: {ARQUIVO_RESUMO}\n")
+    print(resumo.pivot_table(index=["Estação", "Distribuição"], columns="Horizonte", values="RMSE")
+          .round(1).to_string())
+    print("\n" + "="*70)
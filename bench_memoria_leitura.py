@@ -0,0 +1,80 @@
+"""
+Benchmark de memória da leitura de estações.
+
+Gera um arquivo sintético no formato HIDROWEB com várias leituras por dia
+(como uma exportação de telemetria sub-diária) e mede, com tracemalloc, o pico
+de memória e o tempo de:
+
+- carregar_dados + Acumuladores.de_dataframe (arquivo inteiro em memória);
+- carregar_acumuladores com diferentes tamanhos de bloco.
+
+Uso:
+    python bench_memoria_leitura.py [--linhas 2000000] [--leituras-por-dia 144]
+"""
+
+import argparse
+import gc
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from agregacao import Acumuladores
+from main import carregar_acumuladores, carregar_dados
+
+
+def gerar_arquivo_sintetico(caminho, linhas, leituras_por_dia, semente=0):
+    """Grava `linhas` leituras (data dd/mm/aaaa e precipitação com vírgula) após um cabeçalho HIDROWEB."""
+    rng = np.random.default_rng(semente)
+    dias = pd.date_range("1980-01-01", periods=-(-linhas // leituras_por_dia), freq="D")
+    datas = np.repeat(dias.strftime("%d/%m/%Y").to_numpy(), leituras_por_dia)[:linhas]
+    precip = np.where(rng.random(linhas) < 0.7, 0.0, rng.gamma(0.8, 2.0, linhas))
+    valores = np.char.replace(np.char.mod("%.1f", precip), ".", ",")
+
+    with open(caminho, "w", encoding="latin1") as f:
+        f.write("Estacao sintetica\nData Precip\n")
+        for inicio in range(0, linhas, 100_000):
+            fim = inicio + 100_000
+            f.write("\n".join(f"{d}   {v}" for d, v in zip(datas[inicio:fim], valores[inicio:fim])))
+            f.write("\n")
+
+def medir(funcao, *args):
+    """Executa funcao(*args) e retorna (pico de memória em MB, tempo em s)."""
+    gc.collect()
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    funcao(*args)
+    tempo = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return pico / 1024**2, tempo
+
+def _leitura_completa(caminho):
+    return Acumuladores.de_dataframe(carregar_dados(caminho))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pico de memória da leitura completa x leitura em blocos")
+    parser.add_argument("--linhas", type=int, default=2_000_000,
+                        help="linhas do arquivo sintético (padrão: %(default)d)")
+    parser.add_argument("--leituras-por-dia", type=int, default=144,
+                        help="leituras por data, 144 = intervalo de 10 min (padrão: %(default)d)")
+    parser.add_argument("--blocos", type=int, nargs="+", default=[50_000, 250_000, 1_000_000],
+                        help="tamanhos de bloco (linhas) a medir")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = Path(pasta) / "sintetica33.txt"
+        print(f"📝 Gerando arquivo sintético com {args.linhas:,} linhas...")
+        gerar_arquivo_sintetico(caminho, args.linhas, args.leituras_por_dia)
+        print(f"   Tamanho: {caminho.stat().st_size / 1024**2:.1f} MB\n")
+
+        print(f"{'Leitura':<32} {'Pico (MB)':>10} {'Tempo (s)':>10}")
+        print("-" * 54)
+        pico, tempo = medir(_leitura_completa, caminho)
+        print(f"{'completa (carregar_dados)':<32} {pico:>10.1f} {tempo:>10.2f}")
+        for bloco in args.blocos:
+            pico, tempo = medir(carregar_acumuladores, caminho, bloco)
+            print(f"{f'em blocos ({bloco:,} linhas)':<32} {pico:>10.1f} {tempo:>10.2f}")
@@ -0,0 +1,248 @@
+"""
+Benchmark reprodutível do pipeline com estações sintéticas (dados_sinteticos.py).
+
+Numa pasta temporária, gera a rede sintética e mede, com `repeticoes` execuções
+de cada caso:
+
+- main.py: carregar_dados, calcular_agregados e cada agregação interna,
+  cada função de gráfico de GRAFICOS_ESTACAO e exportar_serie_arima;
+- comparacao.py: carregar_series_mensais e cada função de comparação;
+- glm_predicao.py: ajustar_modelo_glm (Gamma e Gaussiana, sem modelos salvos).
+
+Cada caso soma o tempo de todas as estações. O resultado (configuração,
+versões das bibliotecas e mínimo/mediana de cada caso) vai para um JSON; com
+`--comparar`, cada caso é comparado com um JSON anterior pelo tempo mínimo e o
+script termina com código 1 se algum ficou mais lento que a tolerância.
+
+Uso:
+    python benchmark.py [--estacoes 4] [--anos 40] [--repeticoes 5] [--saida output/benchmarks/benchmark.json]
+    python benchmark.py --comparar output/benchmarks/linha_base.json [--tolerancia 0.10]
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import warnings
+from contextlib import contextmanager, redirect_stdout
+from datetime import datetime
+from pathlib import Path
+
+import matplotlib
+import numpy as np
+import pandas as pd
+import statsmodels
+
+import agregacao
+import comparacao
+import glm_predicao
+import main
+from dados_sinteticos import gerar_rede
+from renderizacao import definir_perfil
+
+warnings.filterwarnings('ignore')
+
+# ===============================
+# CONFIGURAÇÕES
+# ===============================
+REPETICOES = 5
+TOLERANCIA = 0.10   # fração de aumento do tempo mínimo aceita na comparação
+FOLGA_ABSOLUTA = 0.005   # s; diferenças menores são ruído de medição
+ARQUIVO_SAIDA = Path("output/benchmarks/benchmark.json")
+
+FUNCOES_AGREGACAO = [
+    agregacao.calcular_agregados,
+    agregacao._agregar_mensal,
+    agregacao._agregar_pentadal,
+    agregacao._separar_por_mes,
+]
+FUNCOES_COMPARACAO = [
+    comparacao.comparacao_series_temporais,
+    comparacao.comparacao_estatisticas,
+    comparacao.comparacao_boxplot,
+    comparacao.comparacao_climatologia_mensal,
+    comparacao.comparacao_tendencia_linear,
+    comparacao.comparacao_coeficiente_variacao,
+]
+
+
+@contextmanager
+def _pasta_de_trabalho(pasta):
+    """Executa o bloco com `pasta` como diretório atual (os scripts usam caminhos relativos)."""
+    anterior = Path.cwd()
+    os.chdir(pasta)
+    try:
+        yield
+    finally:
+        os.chdir(anterior)
+
+def cronometrar(funcao, chamadas, repeticoes=REPETICOES):
+    """
+    Tempo total (s) de chamar funcao(*args) para cada args em `chamadas`, em
+    cada uma das `repeticoes`. Retorna a lista de tempos.
+    """
+    tempos = []
+    for _ in range(repeticoes):
+        gc.collect()
+        inicio = time.perf_counter()
+        for args in chamadas:
+            funcao(*args)
+        tempos.append(time.perf_counter() - inicio)
+    return tempos
+
+def _resultado(tempos):
+    return {"minimo_s": min(tempos), "mediana_s": statistics.median(tempos), "tempos_s": tempos}
+
+def ambiente():
+    """Versões e máquina, para saber se duas execuções são comparáveis."""
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "matplotlib": matplotlib.__version__,
+        "statsmodels": statsmodels.__version__,
+        "plataforma": platform.platform(),
+        "processador": platform.processor() or platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+def executar_benchmark(estacoes=4, anos=40, lacunas=0.02, malformadas=0.001, semente=0,
+                       repeticoes=REPETICOES, perfil="publicacao", log=print):
+    """Gera a rede sintética numa pasta temporária e mede todos os casos; retorna {caso: resultado}."""
+    casos = {}
+
+    def medir(nome, funcao, chamadas):
+        casos[nome] = _resultado(cronometrar(funcao, chamadas, repeticoes))
+        log(f"   {nome:<45} {casos[nome]['minimo_s']:>8.3f} s")
+
+    definir_perfil(perfil)
+    with tempfile.TemporaryDirectory() as pasta, _pasta_de_trabalho(pasta):
+        arquivos = gerar_rede(main.DATA_DIR, estacoes, anos, lacunas, malformadas, semente)
+        main.OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+        comparacao.COMPARACAO_DIR.mkdir(parents=True, exist_ok=True)
+        glm_predicao.GLM_DIR.mkdir(parents=True, exist_ok=True)
+
+        # main.py
+        medir("main.carregar_dados", main.carregar_dados, [(arquivo,) for arquivo in arquivos])
+        diarios = [main.carregar_dados(arquivo) for arquivo in arquivos]
+        for funcao in FUNCOES_AGREGACAO:
+            medir(f"agregacao.{funcao.__name__}", funcao, [(df,) for df in diarios])
+
+        por_estacao = []
+        for arquivo, df in zip(arquivos, diarios):
+            nome_estacao, nome_corrigido = main.identificar_estacao(arquivo)
+            pasta_saida = main.OUTPUT_DIR / nome_estacao.lower().replace(" ", "_")
+            pasta_saida.mkdir(parents=True, exist_ok=True)
+            por_estacao.append((main.calcular_agregados(df), nome_estacao, nome_corrigido, pasta_saida))
+        for funcao, _ in main.GRAFICOS_ESTACAO:
+            medir(f"main.{funcao.__name__}", funcao,
+                  [(agregados, nome_corrigido, pasta_saida) for agregados, _, nome_corrigido, pasta_saida in por_estacao])
+        medir("main.exportar_serie_arima", main.exportar_serie_arima,
+              [(agregados.mensal, nome_estacao, pasta_saida) for agregados, nome_estacao, _, pasta_saida in por_estacao])
+
+        # comparacao.py (as estações com nome de estação real, lidas das séries exportadas)
+        with open(os.devnull, "w") as nulo, redirect_stdout(nulo):
+            casos_comparacao = {}
+            mensais = comparacao.carregar_series_mensais()
+            casos_comparacao["comparacao.carregar_series_mensais"] = (comparacao.carregar_series_mensais, [()])
+            for funcao in FUNCOES_COMPARACAO:
+                casos_comparacao[f"comparacao.{funcao.__name__}"] = (funcao, [(mensais,)])
+            tempos = {nome: cronometrar(funcao, chamadas, repeticoes)
+                      for nome, (funcao, chamadas) in casos_comparacao.items()}
+        for nome, lista in tempos.items():
+            casos[nome] = _resultado(lista)
+            log(f"   {nome:<45} {casos[nome]['minimo_s']:>8.3f} s")
+        if len(mensais) < 2:
+            log("   (comparação com menos de 2 estações: use --estacoes >= 2)")
+
+        # glm_predicao.py
+        series_glm = [glm_predicao.carregar_dados_estacao(pasta_saida.name) for _, _, _, pasta_saida in por_estacao]
+        for familia in glm_predicao.FAMILIAS:
+            medir(f"glm_predicao.ajustar_modelo_glm[{familia}]", glm_predicao.ajustar_modelo_glm,
+                  [(df, familia, False) for df in series_glm])
+
+    return casos
+
+def comparar(casos, linha_base, tolerancia=TOLERANCIA):
+    """
+    Tabela caso a caso: tempo mínimo atual, da linha de base e a razão.
+
+    `regressao` marca os casos com razão acima de 1 + tolerancia e mais de
+    FOLGA_ABSOLUTA segundos acima da linha de base.
+    """
+    linhas = []
+    for nome, resultado in casos.items():
+        base = linha_base.get(nome, {}).get("minimo_s", np.nan)
+        linhas.append({"caso": nome, "atual_s": resultado["minimo_s"], "base_s": base})
+    tabela = pd.DataFrame(linhas)
+    tabela["razao"] = tabela["atual_s"] / tabela["base_s"]
+    tabela["regressao"] = (tabela["razao"] > 1 + tolerancia) & (tabela["atual_s"] - tabela["base_s"] > FOLGA_ABSOLUTA)
+    return tabela
+
+# ===============================
+# EXECUÇÃO PRINCIPAL
+# ===============================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark do pipeline com estações sintéticas")
+    parser.add_argument("--estacoes", type=int, default=4,
+                        help="estações sintéticas (padrão: %(default)d)")
+    parser.add_argument("--anos", type=int, default=40,
+                        help="anos de dados diários por estação (padrão: %(default)d)")
+    parser.add_argument("--lacunas", type=float, default=0.02,
+                        help="fração de dias ausentes (padrão: %(default)s)")
+    parser.add_argument("--malformadas", type=float, default=0.001,
+                        help="fração de linhas malformadas (padrão: %(default)s)")
+    parser.add_argument("--semente", type=int, default=0,
+                        help="semente dos dados sintéticos (padrão: %(default)d)")
+    parser.add_argument("--repeticoes", type=int, default=REPETICOES,
+                        help="execuções de cada caso (padrão: %(default)d)")
+    parser.add_argument("--preview", action="store_true",
+                        help="gráficos no perfil preview em vez de publicacao")
+    parser.add_argument("--saida", type=Path, default=ARQUIVO_SAIDA,
+                        help="JSON com os resultados (padrão: %(default)s)")
+    parser.add_argument("--comparar", type=Path, default=None,
+                        help="JSON de uma execução anterior (linha de base) para comparar")
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA,
+                        help="aumento relativo do tempo mínimo aceito na comparação (padrão: %(default)s)")
+    args = parser.parse_args()
+
+    configuracao = {
+        "estacoes": args.estacoes,
+        "anos": args.anos,
+        "lacunas": args.lacunas,
+        "malformadas": args.malformadas,
+        "semente": args.semente,
+        "repeticoes": args.repeticoes,
+        "perfil": "preview" if args.preview else "publicacao",
+    }
+    print(f"⏱️  Benchmark: {args.estacoes} estações sintéticas x {args.anos} anos, "
+          f"{args.repeticoes} repetições (tempo mínimo)\n")
+    casos = executar_benchmark(**configuracao)
+
+    args.saida.parent.mkdir(parents=True, exist_ok=True)
+    resultado = {
+        "gerado_em": datetime.now().isoformat(timespec="seconds"),
+        "configuracao": configuracao,
+        "ambiente": ambiente(),
+        "casos": casos,
+    }
+    args.saida.write_text(json.dumps(resultado, indent=1, ensure_ascii=False), encoding="utf-8")
+    print(f"\n✓ Resultados salvos: {args.saida}")
+
+    if args.comparar:
+        base = json.loads(args.comparar.read_text(encoding="utf-8"))
+        if base.get("configuracao") != configuracao:
+            print("⚠️  Configuração diferente da linha de base: a comparação pode não ser válida")
+        tabela = comparar(casos, base["casos"], args.tolerancia)
+        print(f"\n📊 Comparação com {args.comparar} (tolerância {args.tolerancia:.0%}):\n")
+        print(tabela.round(3).to_string(index=False))
+        regressoes = tabela[tabela["regressao"]]
+        if len(regressoes):
+            print(f"\n❌ {len(regressoes)} caso(s) mais lento(s) que a linha de base")
+            sys.exit(1)
+        print("\n✅ Nenhuma regressão")
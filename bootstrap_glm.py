@@ -0,0 +1,187 @@
+"""
+Intervalos de predição dos GLM mensais por bootstrap.
+
+Para cada modelo (estação, família) ajustado em glm_predicao.py:
+
+1. gera `reamostras` versões dos dados de treino, de um de dois modos:
+   - "residuos": y* = mu + r* sqrt(V(mu)), com r* sorteados entre os resíduos de
+     Pearson do ajuste (X fixo);
+   - "blocos": bootstrap de blocos móveis de `tamanho_bloco` meses consecutivos
+     do calendário (respeita a autocorrelação da série). O treino é um sorteio
+     de meses, então os blocos são sorteados sobre o calendário e os meses de
+     teste (ou sem dado) dentro de um bloco são pulados. Cada reamostra vira um
+     vetor de contagens por mês, usado como peso de frequência, sem copiar X;
+2. reajusta todas as reamostras de uma vez com o IRLS em lote de irls.py;
+3. para cada mês da série, soma à média prevista por cada reamostra um resíduo
+   de Pearson sorteado e toma os quantis como intervalo de predição.
+
+Só entram as reamostras cujo ajuste convergiu. O número de reamostras válidas
+fica no intervalo (e no CSV e no relatório de métricas de glm_predicao.py);
+abaixo de FRACAO_MINIMA_VALIDAS os quantis vêm de um subconjunto pequeno e
+possivelmente enviesado, e intervalos_modelos avisa.
+
+Os sorteios de cada modelo vêm de uma semente derivada de (semente, estação,
+família): o resultado não depende da ordem nem do número de processos.
+"""
+
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import instrumentacao
+from irls import FAMILIAS, LIGACOES, ajustar_irls
+
+# ===============================
+# CONFIGURAÇÕES
+# ===============================
+METODOS = ("residuos", "blocos")
+REAMOSTRAS = 1000
+TAMANHO_BLOCO = 12   # meses por bloco no bootstrap de blocos
+NIVEL = 0.95
+SEMENTE = 42
+FRACAO_MINIMA_VALIDAS = 0.9   # abaixo disso, aviso de intervalo pouco confiável
+
+
+def gerador_modelo(semente, nome_estacao, familia):
+    """Gerador aleatório próprio do modelo (estação, família), derivado da semente global."""
+    chave = (zlib.crc32(nome_estacao.encode("utf-8")), zlib.crc32(familia.encode("utf-8")))
+    return np.random.default_rng(np.random.SeedSequence(semente, spawn_key=chave))
+
+def pesos_blocos(rng, posicoes, reamostras, tamanho_bloco=TAMANHO_BLOCO):
+    """
+    Contagens (reamostras x len(posicoes)) do bootstrap de blocos móveis.
+
+    `posicoes` são as posições no calendário mensal das linhas de treino, em
+    ordem crescente. Cada reamostra junta blocos de `tamanho_bloco` meses
+    consecutivos do calendário, com início sorteado, até cobrir o trecho de
+    posicoes[0] a posicoes[-1]; os meses do bloco fora de `posicoes` não contam.
+    """
+    posicoes = np.asarray(posicoes, dtype=np.int64)
+    extensao = int(posicoes[-1] - posicoes[0]) + 1
+    tamanho_bloco = max(1, min(tamanho_bloco, extensao))
+    blocos = -(-extensao // tamanho_bloco)
+    inicios = rng.integers(0, extensao - tamanho_bloco + 1, size=(reamostras, blocos))
+    meses = (inicios[:, :, None] + np.arange(tamanho_bloco)).reshape(reamostras, -1)[:, :extensao]
+    deslocados = meses + extensao * np.arange(reamostras)[:, None]
+    contagens = np.bincount(deslocados.ravel(), minlength=reamostras * extensao).reshape(reamostras, extensao)
+    return contagens[:, posicoes - posicoes[0]].astype(float)
+
+def intervalos_bootstrap(dados, params, familia, reamostras=REAMOSTRAS, metodo="blocos",
+                         tamanho_bloco=TAMANHO_BLOCO, nivel=NIVEL, rng=None):
+    """
+    Intervalo de predição de cada mês da série para um GLM ajustado.
+
+    `dados` é a DivisaoTreinoTeste de ajustar_modelo_glm (o bootstrap usa só o
+    treino, em ordem cronológica; o índice é a posição do mês no calendário) e
+    `params` os coeficientes ajustados.
+    Retorna DataFrame com posicao (linha da série mensal), observado, previsto,
+    inferior e superior; `attrs` guarda metodo, nivel, reamostras (pedidas) e
+    reamostras_validas (ajustes que convergiram, as únicas usadas nos quantis).
+    Levanta ValueError se nenhuma reamostra convergiu.
+    """
+    if metodo not in METODOS:
+        raise ValueError(f"Método inválido: {metodo!r} (use {', '.join(METODOS)})")
+    rng = rng if rng is not None else np.random.default_rng(SEMENTE)
+
+    X_treino, _, y_treino, _ = dados
+    matriz = dados.matriz
+    cronologica = np.argsort(X_treino.index.to_numpy(), kind="stable")
+    posicoes = X_treino.index.to_numpy()[cronologica]
+    X = X_treino.to_numpy()[cronologica]
+    y = y_treino.to_numpy()[cronologica]
+    params = np.asarray(params, dtype=float)
+
+    variancia = FAMILIAS[familia][0]
+    inversa = LIGACOES[FAMILIAS[familia][2]][1]
+    mu = inversa(X @ params)
+    desvio_padrao = np.sqrt(variancia(mu))
+    residuos = (y - mu) / desvio_padrao
+
+    if metodo == "residuos":
+        sorteio = rng.integers(0, len(y), size=(reamostras, len(y)))
+        ajuste = ajustar_irls(X, mu + residuos[sorteio] * desvio_padrao, familia=familia, inicio=params)
+    else:
+        ajuste = ajustar_irls(X, y, pesos_blocos(rng, posicoes, reamostras, tamanho_bloco),
+                              familia=familia, inicio=params)
+
+    validas = ajuste.convergiu & np.isfinite(ajuste.params).all(axis=1)
+    if not validas.any():
+        raise ValueError(f"Nenhuma das {reamostras} reamostras do bootstrap convergiu")
+
+    # Média de cada reamostra em todos os meses + ruído com os resíduos de Pearson
+    with np.errstate(invalid="ignore", divide="ignore"):
+        media = inversa(ajuste.params[validas] @ matriz.X.T)
+        ruido = residuos[rng.integers(0, len(y), size=media.shape)]
+        simulado = media + ruido * np.sqrt(variancia(media))
+    if familia == 'gaussian':
+        # Precipitação não é negativa
+        simulado = np.maximum(simulado, 0.0)
+    alfa = (1 - nivel) / 2
+    inferior, superior = np.nanquantile(simulado, [alfa, 1 - alfa], axis=0)
+
+    intervalo = pd.DataFrame({
+        "posicao": matriz.posicao,
+        "observado": matriz.y,
+        "previsto": inversa(matriz.X @ params),
+        "inferior": inferior,
+        "superior": superior,
+    })
+    intervalo.attrs.update(metodo=metodo, nivel=nivel, reamostras=reamostras,
+                           reamostras_validas=int(validas.sum()))
+    return intervalo
+
+def cobertura(intervalo, posicoes):
+    """Fração dos meses em `posicoes` cujo valor observado está dentro do intervalo."""
+    linhas = intervalo[intervalo["posicao"].isin(posicoes)]
+    dentro = (linhas["observado"] >= linhas["inferior"]) & (linhas["observado"] <= linhas["superior"])
+    return float(dentro.mean())
+
+def fracao_validas(intervalo):
+    """Fração das reamostras pedidas cujo ajuste convergiu."""
+    return intervalo.attrs["reamostras_validas"] / intervalo.attrs["reamostras"]
+
+def salvar_intervalo(intervalo, df, caminho):
+    """
+    Grava o intervalo em CSV, com o período de cada mês tirado da série mensal `df`
+    e as reamostras válidas / pedidas em colunas próprias.
+    """
+    tabela = intervalo.copy()
+    tabela.insert(0, "periodo", df["periodo"].to_numpy()[intervalo["posicao"].to_numpy()])
+    tabela["reamostras_validas"] = intervalo.attrs["reamostras_validas"]
+    tabela["reamostras"] = intervalo.attrs["reamostras"]
+    tabela.to_csv(caminho, index=False)
+
+# ===============================
+# VÁRIOS MODELOS EM PARALELO
+# ===============================
+def _tarefa(nome_estacao, familia, dados, params, opcoes, semente):
+    rng = gerador_modelo(semente, nome_estacao, familia)
+    with instrumentacao.medir(f"bootstrap:{familia}", nome_estacao):
+        return nome_estacao, familia, intervalos_bootstrap(dados, params, familia, rng=rng, **opcoes)
+
+def intervalos_modelos(ajustes, reamostras=REAMOSTRAS, metodo="blocos", tamanho_bloco=TAMANHO_BLOCO,
+                       nivel=NIVEL, semente=SEMENTE, workers=1, log=print):
+    """
+    Intervalos de todos os modelos de `ajustes` ({(estação, família): (modelo, dados, métricas)}).
+
+    Avisa por `log` os modelos com menos de FRACAO_MINIMA_VALIDAS das reamostras válidas.
+    Retorna {(estação, família): DataFrame de intervalos_bootstrap}.
+    """
+    opcoes = {"reamostras": reamostras, "metodo": metodo, "tamanho_bloco": tamanho_bloco, "nivel": nivel}
+    tarefas = [(nome_estacao, familia, dados, np.asarray(modelo.params, dtype=float), opcoes, semente)
+               for (nome_estacao, familia), (modelo, dados, _) in ajustes.items() if modelo is not None]
+
+    if workers <= 1 or len(tarefas) <= 1:
+        resultados = [_tarefa(*tarefa) for tarefa in tarefas]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tarefas))) as pool:
+            resultados = instrumentacao.mapear(pool, _tarefa, *zip(*tarefas))
+
+    for nome_estacao, familia, intervalo in resultados:
+        if fracao_validas(intervalo) < FRACAO_MINIMA_VALIDAS:
+            log(f"   ⚠️  {nome_estacao} ({familia}): só {intervalo.attrs['reamostras_validas']} de "
+                f"{reamostras} reamostras convergiram; intervalo pouco confiável")
+
+    return {(nome_estacao, familia): intervalo for nome_estacao, familia, intervalo in resultados}
@@ -0,0 +1,302 @@
+"""
+Busca automática de ordens ARIMA/SARIMA (p,d,q)(P,D,Q)12 para cada estação.
+
+Para cada estação e cada combinação de diferenciações (d, D):
+
+- modo "stepwise" (padrão): parte de poucos modelos iniciais e só avalia os
+  vizinhos (±1 em p, q, P ou Q, ou em p e q juntos, P e Q juntos) do melhor modelo
+  até o AIC parar de melhorar;
+- modo "grade": avalia a grade inteira com um ajuste rápido (poucas iterações do
+  otimizador, AIC aproximado) e reajusta por completo só os `refinar` melhores.
+
+Os ajustes de todas as estações em cada rodada são distribuídos num pool de
+processos. Cada candidato fica salvo em output/cache/modelos/ (modelos_salvos.py),
+então uma busca interrompida continua de onde parou.
+
+Saída: tabela em output/graficos/<estação>/busca_arima.csv, ordenada pelo AIC
+dentro de cada par (d, D). Modelos com diferenciações diferentes não são
+comparados entre si: o AIC de cada um vem da verossimilhança de uma série
+diferenciada diferente.
+
+Uso:
+    python busca_arima.py [--painel] [--modo stepwise|grade] [--workers 4]
+"""
+
+import argparse
+import itertools
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from statsmodels.tsa.arima.model import ARIMA
+from statsmodels.tsa.stattools import adfuller
+
+from calendario import trecho_continuo
+from glm_predicao import ESTACOES, OUTPUT_DIR, carregar_dados_estacao
+from modelos_salvos import chave_modelo, gravar_modelo, ler_modelo
+from painel import PAINEL_DIR, Painel
+
+warnings.filterwarnings('ignore')
+
+# ===============================
+# CONFIGURAÇÕES
+# ===============================
+PERIODO_SAZONAL = 12
+MAX_P, MAX_Q = 3, 3          # limites de p e q
+MAX_P_SAZ, MAX_Q_SAZ = 1, 1  # limites de P e Q
+ITERACOES_RAPIDAS = 15       # iterações do otimizador no ajuste rápido (modo grade)
+REFINAR = 5                  # candidatos reajustados por completo no modo grade
+MAX_RODADAS = 30             # limite de rodadas do stepwise
+MODOS = ("stepwise", "grade")
+
+# Modelos iniciais do stepwise: (p, q, P, Q)
+INICIAIS = [(2, 2, 1, 1), (0, 0, 0, 0), (1, 0, 1, 0), (0, 1, 0, 1)]
+
+
+def diferenciacao_adf(y, nivel=0.05):
+    """
+    d sugerido pelo teste ADF, como em exemplo_arima.py (0 se estacionária, senão 1).
+
+    O teste usa o trecho mais longo de meses consecutivos com dado: tirar os NaN
+    juntaria meses separados por lacunas.
+    """
+    y = np.asarray(y, dtype=float)
+    inicio, tamanho = trecho_continuo(y)
+    return 0 if adfuller(y[inicio:inicio + tamanho])[1] < nivel else 1
+
+# ===============================
+# AJUSTE DE UM CANDIDATO
+# ===============================
+def ajustar_candidato(y, ordem, sazonal, maxiter=None, usar_salvos=True):
+    """
+    Ajusta ARIMA(ordem)(sazonal)12 e retorna as métricas (aic, bic, llf, convergiu).
+
+    maxiter limita o otimizador (ajuste rápido, AIC aproximado). O resultado é
+    salvo por candidato; falhas de ajuste ficam registradas com AIC infinito.
+    """
+    especificacao = {
+        "modelo": "ARIMA",
+        "ordem": list(ordem),
+        "sazonal": [*sazonal, PERIODO_SAZONAL],
+        "maxiter": maxiter,
+    }
+    chave = chave_modelo(y, especificacao)
+    salvo = ler_modelo(chave) if usar_salvos else None
+    if salvo is not None:
+        return salvo["metricas"]
+
+    opcoes = {} if maxiter is None else {"method_kwargs": {"maxiter": maxiter}}
+    try:
+        resultado = ARIMA(y, order=ordem, seasonal_order=(*sazonal, PERIODO_SAZONAL)).fit(**opcoes)
+        params = resultado.params
+        metricas = {
+            "aic": resultado.aic,
+            "bic": resultado.bic,
+            "llf": resultado.llf,
+            "convergiu": float(resultado.mle_retvals.get("converged", True)),
+        }
+    except Exception:
+        params = pd.Series(dtype=float)
+        metricas = {"aic": np.inf, "bic": np.inf, "llf": -np.inf, "convergiu": 0.0}
+
+    gravar_modelo(chave, params, metricas, especificacao)
+    return metricas
+
+def _tarefa(chave_busca, y, ordem, sazonal, maxiter, usar_salvos):
+    return chave_busca, ordem, sazonal, maxiter, ajustar_candidato(y, ordem, sazonal, maxiter, usar_salvos)
+
+# ===============================
+# BUSCA
+# ===============================
+class _Busca:
+    """Estado da busca de uma estação para um par (d, D)."""
+
+    def __init__(self, nome_estacao, y, d, D):
+        self.nome_estacao = nome_estacao
+        self.y = y
+        self.d = d
+        self.D = D
+        self.avaliados = {}  # (p, q, P, Q) -> (métricas, maxiter)
+        self.melhor = None
+        self.ativa = True
+
+    def ordem(self, candidato):
+        p, q, P, Q = candidato
+        return (p, self.d, q), (P, self.D, Q)
+
+    def aic(self, candidato):
+        return self.avaliados[candidato][0]["aic"]
+
+def _vizinhos(candidato):
+    """Candidatos a ±1 em p, q, P ou Q (e em p e q juntos, P e Q juntos), dentro dos limites."""
+    p, q, P, Q = candidato
+    passos = [(1, 0, 0, 0), (0, 1, 0, 0), (0, 0, 1, 0), (0, 0, 0, 1), (1, 1, 0, 0), (0, 0, 1, 1)]
+    limites = (MAX_P, MAX_Q, MAX_P_SAZ, MAX_Q_SAZ)
+    vizinhos = []
+    for passo in passos:
+        for sinal in (1, -1):
+            novo = tuple(v + sinal * s for v, s in zip(candidato, passo))
+            if all(0 <= v <= limite for v, limite in zip(novo, limites)):
+                vizinhos.append(novo)
+    return vizinhos
+
+def _grade():
+    return list(itertools.product(range(MAX_P + 1), range(MAX_Q + 1),
+                                  range(MAX_P_SAZ + 1), range(MAX_Q_SAZ + 1)))
+
+def _avaliar(buscas, pedidos, maxiter, pool, usar_salvos):
+    """Ajusta os candidatos pedidos {indice_busca: [candidatos]} de todas as buscas de uma vez."""
+    tarefas = []
+    for i, candidatos in pedidos.items():
+        busca = buscas[i]
+        for candidato in candidatos:
+            ordem, sazonal = busca.ordem(candidato)
+            tarefas.append((i, busca.y, ordem, sazonal, maxiter, usar_salvos))
+    if not tarefas:
+        return
+
+    resultados = pool.map(_tarefa, *zip(*tarefas)) if pool is not None else (_tarefa(*t) for t in tarefas)
+    for i, ordem, sazonal, _, metricas in resultados:
+        candidato = (ordem[0], ordem[2], sazonal[0], sazonal[2])
+        buscas[i].avaliados[candidato] = (metricas, maxiter)
+
+def _stepwise(buscas, pool, usar_salvos):
+    _avaliar(buscas, {i: INICIAIS for i in range(len(buscas))}, None, pool, usar_salvos)
+    for busca in buscas:
+        busca.melhor = min(busca.avaliados, key=busca.aic)
+
+    for _ in range(MAX_RODADAS):
+        pedidos = {}
+        for i, busca in enumerate(buscas):
+            if busca.ativa:
+                novos = [v for v in _vizinhos(busca.melhor) if v not in busca.avaliados]
+                if novos:
+                    pedidos[i] = novos
+                else:
+                    busca.ativa = False
+        if not pedidos:
+            break
+
+        _avaliar(buscas, pedidos, None, pool, usar_salvos)
+        for i in pedidos:
+            busca = buscas[i]
+            melhor = min(pedidos[i], key=busca.aic)
+            if busca.aic(melhor) < busca.aic(busca.melhor):
+                busca.melhor = melhor
+            else:
+                # Nenhum vizinho melhora o AIC: a busca desta estação termina
+                busca.ativa = False
+
+def _grade_com_poda(buscas, pool, usar_salvos, refinar):
+    grade = _grade()
+    _avaliar(buscas, {i: grade for i in range(len(buscas))}, ITERACOES_RAPIDAS, pool, usar_salvos)
+    # Só os melhores pelo AIC aproximado são reajustados por completo
+    pedidos = {i: sorted(busca.avaliados, key=busca.aic)[:refinar] for i, busca in enumerate(buscas)}
+    _avaliar(buscas, pedidos, None, pool, usar_salvos)
+
+def buscar_ordens(series, modo="stepwise", ds=None, Ds=(0,), workers=1, usar_salvos=True,
+                  refinar=REFINAR):
+    """
+    Busca as ordens de todas as estações de `series` ({nome: série mensal}).
+
+    ds: diferenciações d a testar (None = escolhida pelo teste ADF de cada estação).
+    Retorna {nome: DataFrame ordenado pelo AIC dentro de cada (d, D), com a
+    posição contada dentro do par}.
+    """
+    if modo not in MODOS:
+        raise ValueError(f"Modo inválido: {modo!r} (use {', '.join(MODOS)})")
+
+    buscas = []
+    for nome_estacao, y in series.items():
+        y = np.asarray(y, dtype=float)
+        for d in (ds if ds is not None else [diferenciacao_adf(y)]):
+            for D in Ds:
+                buscas.append(_Busca(nome_estacao, y, d, D))
+
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        if modo == "stepwise":
+            _stepwise(buscas, pool, usar_salvos)
+        else:
+            _grade_com_poda(buscas, pool, usar_salvos, refinar)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    tabelas = {}
+    for nome_estacao in series:
+        linhas = []
+        for busca in (b for b in buscas if b.nome_estacao == nome_estacao):
+            # No modo grade, o ajuste completo dos refinados substitui o rápido
+            for (p, q, P, Q), (metricas, maxiter) in busca.avaliados.items():
+                linhas.append({
+                    "modelo": f"ARIMA({p},{busca.d},{q})({P},{busca.D},{Q}){PERIODO_SAZONAL}",
+                    "p": p, "d": busca.d, "q": q, "P": P, "D": busca.D, "Q": Q,
+                    "aic": metricas["aic"],
+                    "bic": metricas["bic"],
+                    "convergiu": bool(metricas["convergiu"]),
+                    "ajuste": "completo" if maxiter is None else "rapido",
+                })
+        # O AIC só compara modelos com as mesmas diferenciações
+        tabela = pd.DataFrame(linhas).sort_values(["d", "D", "aic", "bic"]).reset_index(drop=True)
+        tabela.insert(0, "posicao", tabela.groupby(["d", "D"]).cumcount() + 1)
+        tabelas[nome_estacao] = tabela
+
+    return tabelas
+
+# ===============================
+# EXECUÇÃO PRINCIPAL
+# ===============================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Busca de ordens ARIMA/SARIMA por estação")
+    parser.add_argument("--painel", nargs="?", type=Path, const=PAINEL_DIR, default=None,
+                        help="lê as séries do painel (padrão: %(const)s) em vez das séries de main.py")
+    parser.add_argument("--modo", choices=MODOS, default="stepwise",
+                        help="stepwise (vizinhos do melhor) ou grade (com poda pelo AIC aproximado)")
+    parser.add_argument("--d", type=int, nargs="+", default=None,
+                        help="diferenciações d a testar (padrão: pelo teste ADF)")
+    parser.add_argument("--D", type=int, nargs="+", default=[0],
+                        help="diferenciações sazonais D a testar (padrão: 0)")
+    parser.add_argument("--meses", type=int, default=None,
+                        help="usa só os últimos N meses de cada série")
+    parser.add_argument("--refinar", type=int, default=REFINAR,
+                        help="candidatos reajustados por completo no modo grade (padrão: %(default)d)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="processos para os ajustes (padrão: 1)")
+    parser.add_argument("--reajustar", action="store_true",
+                        help="ignora os candidatos já salvos em output/cache/modelos/")
+    args = parser.parse_args()
+
+    print("\n" + "="*70)
+    print("🔎 BUSCA DE ORDENS ARIMA/SARIMA")
+    print("="*70)
+
+    painel = Painel.abrir(args.painel) if args.painel else None
+    estacoes = ESTACOES if painel is None else {e["nome"]: e["pasta"] for e in painel.estacoes}
+    series, pastas = {}, {}
+    for nome_estacao, pasta_estacao in estacoes.items():
+        df = carregar_dados_estacao(pasta_estacao, painel)
+        if df is None:
+            print(f"✗ {nome_estacao}: dados não encontrados")
+            continue
+        y = df['precip_mm']
+        series[nome_estacao] = y.iloc[-args.meses:] if args.meses else y
+        pastas[nome_estacao] = pasta_estacao
+
+    print(f"\n📊 {len(series)} estação(ões) | modo {args.modo} | {max(1, args.workers)} processo(s)\n")
+    tabelas = buscar_ordens(series, modo=args.modo, ds=args.d, Ds=args.D, workers=args.workers,
+                            usar_salvos=not args.reajustar, refinar=args.refinar)
+
+    for nome_estacao, tabela in tabelas.items():
+        pasta_saida = OUTPUT_DIR / pastas[nome_estacao]
+        pasta_saida.mkdir(parents=True, exist_ok=True)
+        tabela.to_csv(pasta_saida / "busca_arima.csv", index=False)
+
+        print(f"📈 {nome_estacao}: {len(tabela)} candidatos avaliados")
+        # Os 5 melhores de cada (d, D)
+        print(tabela[tabela["posicao"] <= 5][["posicao", "modelo", "aic", "bic", "ajuste"]].to_string(index=False))
+        print(f"   ✓ Tabela: {pasta_saida / 'busca_arima.csv'}\n")
+
+    print("="*70)
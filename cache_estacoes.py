@@ -0,0 +1,148 @@
+"""
+Cache em disco das estações já lidas por `main.carregar_dados`.
+
+Cada DataFrame (com as colunas derivadas ano, mes, dia_mes, ano_mes e pentada)
+é gravado como arquivo .npz colunar em output/cache/. A chave combina caminho,
+tamanho, data de modificação e hash do conteúdo do .txt de origem: qualquer
+alteração no arquivo gera uma chave nova e força uma nova leitura.
+
+O tamanho total do cache é limitado; quando o limite é ultrapassado, as entradas
+usadas há mais tempo são removidas primeiro (LRU pela data de modificação).
+"""
+
+import hashlib
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# ===============================
+# CONFIGURAÇÕES
+# ===============================
+CACHE_DIR = Path("output/cache")
+TAMANHO_MAXIMO_CACHE = 512 * 1024 * 1024  # bytes
+
+# Colunas periódicas são gravadas como ordinais inteiros e reconstruídas na leitura
+COLUNAS_PERIODO = {"ano_mes": "M"}
+
+# Incrementar quando o layout do DataFrame mudar, para invalidar entradas antigas
+VERSAO_FORMATO = 1
+
+# ===============================
+# CHAVES
+# ===============================
+def _hash_conteudo(caminho_arquivo, tamanho_bloco=1024 * 1024):
+    """Hash SHA-256 do conteúdo do arquivo, lido em blocos."""
+    h = hashlib.sha256()
+    with open(caminho_arquivo, "rb") as f:
+        for bloco in iter(lambda: f.read(tamanho_bloco), b""):
+            h.update(bloco)
+    return h.hexdigest()
+
+def _prefixo_arquivo(caminho_arquivo):
+    """Prefixo estável por arquivo de origem (usado para descartar versões antigas)."""
+    caminho = str(Path(caminho_arquivo).resolve())
+    return hashlib.sha256(caminho.encode("utf-8")).hexdigest()[:12]
+
+def chave_arquivo(caminho_arquivo):
+    """
+    Chave de cache do arquivo: caminho + tamanho + mtime + hash do conteúdo.
+
+    Retorna o nome do arquivo .npz correspondente dentro do diretório de cache.
+    """
+    caminho = Path(caminho_arquivo).resolve()
+    info = caminho.stat()
+    partes = [
+        str(VERSAO_FORMATO),
+        str(caminho),
+        str(info.st_size),
+        str(info.st_mtime_ns),
+        _hash_conteudo(caminho),
+    ]
+    chave = hashlib.sha256("|".join(partes).encode("utf-8")).hexdigest()[:24]
+    return f"{_prefixo_arquivo(caminho)}_{chave}.npz"
+
+# ===============================
+# LEITURA E GRAVAÇÃO
+# ===============================
+def ler_cache(chave, pasta_cache=CACHE_DIR):
+    """
+    Retorna o DataFrame guardado sob `chave`, ou None se não houver entrada.
+
+    Um acerto atualiza a data de modificação da entrada (ordem LRU).
+    """
+    arquivo = Path(pasta_cache) / chave
+    try:
+        with np.load(arquivo, allow_pickle=False) as npz:
+            colunas = [str(nome) for nome in npz["__colunas__"]]
+            df = pd.DataFrame({
+                nome: (
+                    pd.arrays.PeriodArray(npz[nome], dtype=pd.PeriodDtype(COLUNAS_PERIODO[nome]))
+                    if nome in COLUNAS_PERIODO else npz[nome]
+                )
+                for nome in colunas
+            })
+    except (OSError, KeyError, ValueError):
+        # Entrada ausente, corrompida ou de formato antigo: tratar como falta
+        return None
+
+    try:
+        os.utime(arquivo)
+    except FileNotFoundError:
+        # Removida por outro processo depois da leitura: os dados já estão em memória
+        pass
+    return df
+
+def gravar_cache(chave, df, pasta_cache=CACHE_DIR, tamanho_maximo=TAMANHO_MAXIMO_CACHE):
+    """
+    Grava o DataFrame no cache sob `chave` e aplica a política de remoção.
+
+    Entradas anteriores do mesmo arquivo de origem são descartadas, já que
+    nunca mais serão acessadas.
+    """
+    pasta_cache = Path(pasta_cache)
+    pasta_cache.mkdir(parents=True, exist_ok=True)
+
+    colunas = {"__colunas__": np.array(df.columns, dtype=str)}
+    for nome in df.columns:
+        if nome in COLUNAS_PERIODO:
+            colunas[nome] = df[nome].array.asi8
+        else:
+            colunas[nome] = df[nome].to_numpy()
+
+    # Gravar em arquivo temporário e renomear: leitores nunca veem um .npz parcial
+    destino = pasta_cache / chave
+    temporario = destino.with_name(f".{chave}.{os.getpid()}.tmp")
+    with open(temporario, "wb") as f:
+        np.savez(f, **colunas)
+    os.replace(temporario, destino)
+
+    prefixo = chave.split("_", 1)[0]
+    for antigo in pasta_cache.glob(f"{prefixo}_*.npz"):
+        if antigo.name != chave:
+            antigo.unlink(missing_ok=True)
+
+    remover_excedente(pasta_cache, tamanho_maximo)
+    return destino
+
+def remover_excedente(pasta_cache=CACHE_DIR, tamanho_maximo=TAMANHO_MAXIMO_CACHE):
+    """Remove as entradas menos usadas até o cache caber em `tamanho_maximo` bytes."""
+    entradas = []
+    for arquivo in Path(pasta_cache).glob("*.npz"):
+        try:
+            info = arquivo.stat()
+        except FileNotFoundError:
+            continue
+        entradas.append((info.st_mtime_ns, info.st_size, arquivo))
+
+    total = sum(tamanho for _, tamanho, _ in entradas)
+    removidos = 0
+    for _, tamanho, arquivo in sorted(entradas, key=lambda e: e[0]):
+        if total <= tamanho_maximo:
+            break
+        arquivo.unlink(missing_ok=True)
+        total -= tamanho
+        removidos += 1
+
+    return removidos
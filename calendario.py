@@ -0,0 +1,162 @@
+"""
+Alinhamento das estações ao calendário contínuo, com a contagem de dados ausentes.
+
+As agregações por groupby só trazem os meses que existem no arquivo: um mês sem
+nenhuma leitura desaparece da série, e a posição do mês (o `t` dos GLM, o x das
+tendências) passa a contar só os meses presentes. Aqui as séries vão para o
+calendário contínuo:
+
+- diário: `alinhar_diario` coloca todas as estações numa matriz dias x estações
+  (NaN = sem leitura) com uma única atribuição vetorizada;
+- mensal: `contagem_mensal` tira dessa matriz o total e o número de dias com
+  dado de cada mês e estação com um único np.add.reduceat; `alinhar_mensal`
+  reindexa a série mensal de uma estação (AgregadosEstacao.mensal);
+- completude: dias com dado / dias do mês. Meses abaixo de `limiar`
+  (LIMIAR_COMPLETUDE) são marcados como incompletos e ficam fora dos modelos e
+  das tendências (`mascarar_incompletos`), sem mudar a posição dos demais;
+- trechos: `trecho_continuo` acha o trecho mais longo de meses consecutivos com
+  dado, para os testes que precisam de uma série sem lacunas (ADF, KPSS).
+"""
+
+import numpy as np
+import pandas as pd
+
+# ===============================
+# CONFIGURAÇÕES
+# ===============================
+LIMIAR_COMPLETUDE = 0.8   # fração mínima de dias com dado para o mês contar como completo
+
+
+def dias_no_mes(periodos):
+    """Número de dias de cada mês (periodos em datetime64[M])."""
+    periodos = np.asarray(periodos, dtype="datetime64[M]")
+    return ((periodos + 1).astype("datetime64[D]") - periodos.astype("datetime64[D]")).astype(np.int64)
+
+def completude(n_dias, periodos):
+    """Fração de dias com dado de cada mês; n_dias pode ter uma coluna por estação."""
+    dias = dias_no_mes(periodos)
+    n_dias = np.asarray(n_dias)
+    return n_dias / (dias if n_dias.ndim == 1 else dias[:, None])
+
+# ===============================
+# CALENDÁRIO DIÁRIO
+# ===============================
+def alinhar_diario(series):
+    """
+    Matriz dias x estações no calendário diário comum a todas as séries.
+
+    `series` é uma lista de (valores, inicio): vetor diário contínuo e a data
+    (datetime64[D]) do primeiro valor, como SerieDiaria.precip e .inicio.
+    Retorna (inicio, matriz float32 com NaN nos dias sem dado).
+    """
+    inicios = np.array([np.datetime64(inicio, "D") for _, inicio in series])
+    tamanhos = np.array([len(valores) for valores, _ in series])
+    inicio = inicios.min()
+    deslocamentos = (inicios - inicio).astype(np.int64)
+    n_dias = int((deslocamentos + tamanhos).max())
+
+    # Linha e coluna de cada valor de todas as séries, numa única atribuição
+    linhas = np.concatenate([d + np.arange(t) for d, t in zip(deslocamentos, tamanhos)])
+    colunas = np.repeat(np.arange(len(series)), tamanhos)
+    matriz = np.full((n_dias, len(series)), np.nan, dtype=np.float32)
+    matriz[linhas, colunas] = np.concatenate([np.asarray(valores, dtype=np.float32) for valores, _ in series])
+    return inicio, matriz
+
+def contagem_mensal(diario, inicio):
+    """
+    Total e dias com dado de cada mês de uma matriz diária (dias x estações, ou um vetor).
+
+    `inicio` é a data da primeira linha. Retorna (periodos datetime64[M], total,
+    n_dias): total é NaN nos meses sem nenhum dia com dado.
+    """
+    diario = np.asarray(diario)
+    inicio = np.datetime64(inicio, "D")
+    fim = inicio + len(diario) - 1
+    periodos = np.arange(inicio.astype("datetime64[M]"), fim.astype("datetime64[M]") + 1)
+    limites = np.maximum((periodos.astype("datetime64[D]") - inicio).astype(np.int64), 0)
+
+    validos = ~np.isnan(diario)
+    n_dias = np.add.reduceat(validos, limites, axis=0, dtype=np.int64)
+    total = np.add.reduceat(np.where(validos, diario, 0.0), limites, axis=0, dtype=np.float64)
+    total[n_dias == 0] = np.nan
+    return periodos, total, n_dias
+
+# ===============================
+# CALENDÁRIO MENSAL
+# ===============================
+def alinhar_mensal(mensal, inicio=None, fim=None, limiar=LIMIAR_COMPLETUDE):
+    """
+    Série mensal (AgregadosEstacao.mensal) reindexada no calendário mensal contínuo.
+
+    Vai de `inicio` a `fim` (Period ou datetime64[M]; padrão: primeiro e último
+    mês com dado). Meses ausentes entram com n_dias = 0 e as demais colunas NaN.
+    Acrescenta dias_no_mes, completude (n_dias / dias_no_mes) e completo
+    (completude >= limiar).
+    """
+    ordinais = mensal["ano_mes"].array.asi8
+    primeiro = ordinais.min() if inicio is None else pd.Period(inicio, "M").ordinal
+    ultimo = ordinais.max() if fim is None else pd.Period(fim, "M").ordinal
+    calendario = np.arange(primeiro, ultimo + 1)
+
+    dentro = (ordinais >= primeiro) & (ordinais <= ultimo)
+    posicao = ordinais[dentro] - primeiro
+    alinhada = {"ano_mes": pd.arrays.PeriodArray(calendario, dtype=pd.PeriodDtype("M"))}
+    for coluna in ("precip_total", "n_dias", "media_diaria", "std_diaria"):
+        valores = np.full(len(calendario), 0 if coluna == "n_dias" else np.nan,
+                          dtype=np.int64 if coluna == "n_dias" else np.float64)
+        valores[posicao] = mensal[coluna].to_numpy()[dentro]
+        alinhada[coluna] = valores
+
+    alinhada = pd.DataFrame(alinhada)
+    alinhada["data"] = alinhada["ano_mes"].dt.to_timestamp()
+    periodos = calendario.astype("datetime64[M]")
+    alinhada["dias_no_mes"] = dias_no_mes(periodos)
+    alinhada["completude"] = completude(alinhada["n_dias"].to_numpy(), periodos)
+    alinhada["completo"] = alinhada["completude"] >= limiar
+    return alinhada
+
+def mascarar_incompletos(df, coluna="precip_mm"):
+    """
+    Cópia de `df` com `coluna` em NaN nos meses marcados como incompletos.
+
+    As linhas continuam no calendário (a posição dos meses não muda); sem a
+    coluna `completo`, o DataFrame é devolvido como está.
+    """
+    if "completo" not in df:
+        return df
+    df = df.copy()
+    df.loc[~df["completo"], coluna] = np.nan
+    return df
+
+def trecho_continuo(valores):
+    """
+    Início e tamanho do trecho mais longo de meses consecutivos com dado (sem NaN).
+
+    `valores` é um vetor ou uma matriz meses x estações (um trecho por coluna);
+    no empate fica o trecho mais antigo. Juntar os trechos separados por meses
+    mascarados mudaria a defasagem entre os meses de um lado e do outro.
+    Retorna (inicio, tamanho): inteiros para um vetor, vetores por coluna para
+    uma matriz (tamanho 0 numa coluna sem dado).
+    """
+    valores = np.asarray(valores, dtype=float)
+    matriz = valores[:, None] if valores.ndim == 1 else valores
+    colunas = matriz.shape[1]
+
+    # Bordas dos trechos: +1 onde um trecho começa, -1 logo depois de onde termina
+    valido = np.zeros((matriz.shape[0] + 2, colunas), dtype=np.int8)
+    valido[1:-1] = ~np.isnan(matriz)
+    bordas = np.diff(valido, axis=0).T
+    coluna, inicio = np.nonzero(bordas == 1)
+    _, fim = np.nonzero(bordas == -1)
+    tamanho = fim - inicio
+
+    # Por coluna, o trecho mais longo (lexsort é estável: no empate, o primeiro)
+    ordem = np.lexsort((-tamanho, coluna))
+    colunas_com_dado, primeiro = np.unique(coluna[ordem], return_index=True)
+    inicios = np.zeros(colunas, dtype=np.int64)
+    tamanhos = np.zeros(colunas, dtype=np.int64)
+    inicios[colunas_com_dado] = inicio[ordem][primeiro]
+    tamanhos[colunas_com_dado] = tamanho[ordem][primeiro]
+    if valores.ndim == 1:
+        return int(inicios[0]), int(tamanhos[0])
+    return inicios, tamanhos
@@ -51,7 +51,7 @@ def limpar_png():
     return total_removidos
 
 def limpar_csv():
-    """Remove todos os arquivos CSV gerados."""
+    """Remove todos os arquivos CSV gerados (e as séries mensais serie_mensal_*)."""
     print("\n🗑️  Removendo arquivos CSV...\n")
     
     total_removidos = 0
@@ -63,7 +63,7 @@ def limpar_csv():
     for pasta in pastas:
         pasta_path = OUTPUT_DIR / pasta
         if pasta_path.exists():
-            csvs = list(pasta_path.glob("*.csv"))
+            csvs = list(pasta_path.glob("*.csv")) + list(pasta_path.glob("serie_mensal_*"))
             for csv in csvs:
                 csv.unlink()
                 total_removidos += 1
@@ -74,7 +74,7 @@ clean_csv() {
     # Remover CSV das pastas por estação
     for folder in campoalegre goianesia marzagao tresranchos Comparacao; do
         if [ -d "$OUTPUT_DIR/$folder" ]; then
-            for file in $OUTPUT_DIR/$folder/*.csv; do
+            for file in $OUTPUT_DIR/$folder/*.csv $OUTPUT_DIR/$folder/serie_mensal_*; do
                 if [ -f "$file" ]; then
                     rm "$file"
                     echo -e "${GREEN}  ✓${NC} Removido: $folder/$(basename $file)"
@@ -14,7 +14,14 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 from pathlib import Path
-from scipy.stats import linregress
+import argparse
+
+import instrumentacao
+from calendario import mascarar_incompletos
+from estatisticas_rede import climatologia_mensal, estatisticas_colunas, matriz_de_series, tendencia_linear
+from painel import PAINEL_DIR, Painel
+from renderizacao import FilaRenderizacao, definir_perfil, salvar_figura
+from serie_mensal import ler_serie_mensal
 
 # ===============================
 # CONFIGURAÇÕES
@@ -37,6 +44,9 @@ CORES = {
     "Três Ranchos": "#d62728"
 }
 
+# Paleta para estações sem cor definida em CORES (ex.: estações vindas do painel)
+PALETA_EXTRA = plt.cm.tab20.colors
+
 # Configurar estilo
 plt.style.use('seaborn-v0_8-darkgrid')
 plt.rcParams.update({
@@ -56,19 +66,38 @@ plt.rcParams.update({
 # ===============================
 # CARREGAMENTO DE DADOS
 # ===============================
-def carregar_series_mensais():
-    """Carrega as séries mensais de todas as estações."""
+def cor_estacao(nome_estacao):
+    """Cor da estação: CORES quando definida, senão uma cor fixa da PALETA_EXTRA."""
+    if nome_estacao in CORES:
+        return CORES[nome_estacao]
+    indice = sum(nome_estacao.encode("utf-8")) % len(PALETA_EXTRA)
+    return PALETA_EXTRA[indice]
+
+@instrumentacao.medido("leitura")
+def carregar_series_mensais(painel=None, estacoes=ESTACOES):
+    """
+    Carrega as séries mensais de todas as estações.
+    
+    Sem painel, lê as séries mensais gravadas por main.py (serie_mensal.py) das
+    `estacoes` ({nome: pasta}, padrão ESTACOES).
+    Com `painel` (Painel aberto), usa todas as estações do painel.
+    Meses incompletos (calendario.py) ficam em NaN.
+    """
     dados = {}
     
-    for nome_estacao, pasta_estacao in ESTACOES.items():
-        arquivo_csv = OUTPUT_DIR / pasta_estacao / f"serie_temporal_mensal_arima_{pasta_estacao}.csv"
-        
-        if arquivo_csv.exists():
-            df = pd.read_csv(arquivo_csv)
-            df['periodo'] = pd.to_datetime(df['periodo'] + '-01')
-            df = df.sort_values('periodo')
+    if painel is not None:
+        for nome_estacao in painel.nomes:
+            df = mascarar_incompletos(painel.serie_mensal(nome_estacao))
             dados[nome_estacao] = df
-            print(f"✓ {nome_estacao}: {len(df)} meses | {df['precip_mm'].mean():.2f} mm média")
+            print(f"✓ {nome_estacao}: {df['precip_mm'].count()} meses completos | {df['precip_mm'].mean():.2f} mm média")
+        return dados
+    
+    for nome_estacao, pasta_estacao in estacoes.items():
+        df = ler_serie_mensal(OUTPUT_DIR / pasta_estacao, pasta_estacao)
+        
+        if df is not None:
+            dados[nome_estacao] = mascarar_incompletos(df)
+            print(f"✓ {nome_estacao}: {df['precip_mm'].count()} meses completos | {df['precip_mm'].mean():.2f} mm média")
         else:
             print(f"✗ {nome_estacao}: arquivo não encontrado")
     
@@ -84,7 +113,7 @@ def comparacao_series_temporais(dados):
     
     for nome_estacao, df in dados.items():
         ax.plot(df['periodo'], df['precip_mm'], 
-                label=nome_estacao, color=CORES[nome_estacao], 
+                label=nome_estacao, color=cor_estacao(nome_estacao), 
                 linewidth=2, alpha=0.8, marker='o', markersize=2)
     
     ax.set_title('Comparação de Séries Temporais Mensais de Precipitação\n(1994-2024)', 
@@ -95,34 +124,31 @@ def comparacao_series_temporais(dados):
     ax.grid(True, alpha=0.3)
     
     plt.tight_layout()
-    plt.savefig(COMPARACAO_DIR / "01_series_temporais_comparacao.png", dpi=300, bbox_inches='tight')
-    plt.close()
+    salvar_figura(COMPARACAO_DIR / "01_series_temporais_comparacao.png")
     print("✓ Gráfico: 01_series_temporais_comparacao.png")
 
 def comparacao_estatisticas(dados):
     """Compara estatísticas descritivas das 4 estações."""
-    estatisticas = []
-    
-    for nome_estacao, df in dados.items():
-        precip = df['precip_mm']
-        estatisticas.append({
-            'Estação': nome_estacao,
-            'Média': precip.mean(),
-            'Mediana': precip.median(),
-            'Desvio Padrão': precip.std(),
-            'Mínimo': precip.min(),
-            'Máximo': precip.max(),
-            'Q1': precip.quantile(0.25),
-            'Q3': precip.quantile(0.75)
-        })
-    
-    df_stats = pd.DataFrame(estatisticas)
+    # Todas as estações de uma vez, sobre a matriz meses x estações
+    _, matriz, nomes = matriz_de_series(dados)
+    est = estatisticas_colunas(matriz)
+    
+    df_stats = pd.DataFrame({
+        'Estação': nomes,
+        'Média': est['media'],
+        'Mediana': est['mediana'],
+        'Desvio Padrão': est['desvio'],
+        'Mínimo': est['minimo'],
+        'Máximo': est['maximo'],
+        'Q1': est['q1'],
+        'Q3': est['q3']
+    })
     
     # Gráfico de barras: Média de precipitação
     fig, ax = plt.subplots(figsize=(10, 6))
     nomes = df_stats['Estação'].values
     medias = df_stats['Média'].values
-    cores_lista = [CORES[nome] for nome in nomes]
+    cores_lista = [cor_estacao(nome) for nome in nomes]
     
     bars = ax.bar(nomes, medias, color=cores_lista, edgecolor='black', linewidth=1.5, alpha=0.8)
     
@@ -136,20 +162,20 @@ def comparacao_estatisticas(dados):
     ax.grid(True, alpha=0.3, axis='y')
     
     plt.tight_layout()
-    plt.savefig(COMPARACAO_DIR / "02_media_precipitacao_comparacao.png", dpi=300, bbox_inches='tight')
-    plt.close()
+    salvar_figura(COMPARACAO_DIR / "02_media_precipitacao_comparacao.png")
     print("✓ Gráfico: 02_media_precipitacao_comparacao.png")
     
     # Salvar tabela de estatísticas
-    df_stats.to_csv(COMPARACAO_DIR / "estatisticas_descritivas.csv", index=False)
+    with instrumentacao.medir("exportacao_csv"):
+        df_stats.to_csv(COMPARACAO_DIR / "estatisticas_descritivas.csv", index=False)
     print("✓ Arquivo: estatisticas_descritivas.csv")
     
     return df_stats
 
 def comparacao_boxplot(dados):
     """Boxplot comparativo das 4 estações."""
-    dados_lista = [dados[nome]['precip_mm'].values for nome in ESTACOES.keys()]
-    nomes = list(ESTACOES.keys())
+    nomes = list(dados.keys())
+    dados_lista = [dados[nome]['precip_mm'].dropna().values for nome in nomes]
     
     fig, ax = plt.subplots(figsize=(10, 6))
     bp = ax.boxplot(dados_lista, labels=nomes, patch_artist=True, 
@@ -158,7 +184,7 @@ def comparacao_boxplot(dados):
     
     # Colorir as caixas
     for patch, nome in zip(bp['boxes'], nomes):
-        patch.set_facecolor(CORES[nome])
+        patch.set_facecolor(cor_estacao(nome))
         patch.set_alpha(0.8)
     
     ax.set_title('Distribuição de Precipitação Mensal - Boxplot Comparativo', 
@@ -167,8 +193,7 @@ def comparacao_boxplot(dados):
     ax.grid(True, alpha=0.3, axis='y')
     
     plt.tight_layout()
-    plt.savefig(COMPARACAO_DIR / "03_boxplot_comparacao.png", dpi=300, bbox_inches='tight')
-    plt.close()
+    salvar_figura(COMPARACAO_DIR / "03_boxplot_comparacao.png")
     print("✓ Gráfico: 03_boxplot_comparacao.png")
 
 def comparacao_climatologia_mensal(dados):
@@ -178,15 +203,14 @@ def comparacao_climatologia_mensal(dados):
     
     fig, ax = plt.subplots(figsize=(13, 6))
     
-    for nome_estacao in ESTACOES.keys():
-        # Recalcular climatologia a partir dos dados mensais
-        df_mensal = dados[nome_estacao]
-        df_mensal['mes'] = df_mensal['periodo'].dt.month
-        climatologia = df_mensal.groupby('mes')['precip_mm'].mean()
-        
-        ax.plot(range(1, 13), climatologia.values, 
+    # Climatologia de todas as estações (12 x estações) a partir dos dados mensais
+    periodos, matriz, nomes = matriz_de_series(dados)
+    climatologia = climatologia_mensal(matriz, periodos[0])
+    
+    for j, nome_estacao in enumerate(nomes):
+        ax.plot(range(1, 13), climatologia[:, j], 
                 marker='o', markersize=7, linewidth=2,
-                label=nome_estacao, color=CORES[nome_estacao], alpha=0.8)
+                label=nome_estacao, color=cor_estacao(nome_estacao), alpha=0.8)
     
     ax.set_xticks(range(1, 13))
     ax.set_xticklabels(MESES)
@@ -198,27 +222,27 @@ def comparacao_climatologia_mensal(dados):
     ax.grid(True, alpha=0.3)
     
     plt.tight_layout()
-    plt.savefig(COMPARACAO_DIR / "04_climatologia_mensal_comparacao.png", dpi=300, bbox_inches='tight')
-    plt.close()
+    salvar_figura(COMPARACAO_DIR / "04_climatologia_mensal_comparacao.png")
     print("✓ Gráfico: 04_climatologia_mensal_comparacao.png")
 
 def comparacao_tendencia_linear(dados):
     """Compara as tendências lineares das 4 estações."""
     fig, ax = plt.subplots(figsize=(14, 7))
     
-    for nome_estacao, df in dados.items():
-        # Preparar dados
-        x = np.arange(len(df))
+    # Tendências de todas as estações de uma vez (mínimos quadrados em forma fechada)
+    periodos, matriz, _ = matriz_de_series(dados)
+    regressao = tendencia_linear(matriz)
+    
+    for j, (nome_estacao, df) in enumerate(dados.items()):
+        # Preparar dados (x = posição do mês no calendário da matriz)
+        x = (df['periodo'].to_numpy().astype('datetime64[M]') - periodos[0]).astype(np.int64)
         y = df['precip_mm'].values
-        
-        # Calcular tendência
-        slope, intercept, r_value, p_value, std_err = linregress(x, y)
-        tendencia = intercept + slope * x
+        tendencia = regressao['intercepto'][j] + regressao['inclinacao'][j] * x
         
         # Plotar
-        ax.plot(df['periodo'], y, color=CORES[nome_estacao], alpha=0.3, linewidth=1)
-        ax.plot(df['periodo'], tendencia, color=CORES[nome_estacao], 
-                linewidth=2.5, label=f"{nome_estacao} (R²={r_value**2:.3f})", linestyle='--')
+        ax.plot(df['periodo'], y, color=cor_estacao(nome_estacao), alpha=0.3, linewidth=1)
+        ax.plot(df['periodo'], tendencia, color=cor_estacao(nome_estacao), 
+                linewidth=2.5, label=f"{nome_estacao} (R²={regressao['r2'][j]:.3f})", linestyle='--')
     
     ax.set_title('Análise de Tendência Linear - Comparação entre Estações', 
                  fontweight='bold', fontsize=13)
@@ -228,27 +252,20 @@ def comparacao_tendencia_linear(dados):
     ax.grid(True, alpha=0.3)
     
     plt.tight_layout()
-    plt.savefig(COMPARACAO_DIR / "05_tendencia_linear_comparacao.png", dpi=300, bbox_inches='tight')
-    plt.close()
+    salvar_figura(COMPARACAO_DIR / "05_tendencia_linear_comparacao.png")
     print("✓ Gráfico: 05_tendencia_linear_comparacao.png")
 
 def comparacao_coeficiente_variacao(dados):
     """Compara o coeficiente de variação (variabilidade relativa)."""
-    cv_data = []
+    _, matriz, nomes = matriz_de_series(dados)
+    cv = estatisticas_colunas(matriz)['cv']  # CV em percentual
     
-    for nome_estacao, df in dados.items():
-        precip = df['precip_mm']
-        media = precip.mean()
-        desvio = precip.std()
-        cv = (desvio / media) * 100  # CV em percentual
-        cv_data.append({'Estação': nome_estacao, 'CV (%)': cv})
-    
-    df_cv = pd.DataFrame(cv_data)
+    df_cv = pd.DataFrame({'Estação': nomes, 'CV (%)': cv})
     
     fig, ax = plt.subplots(figsize=(10, 6))
     nomes = df_cv['Estação'].values
     cvs = df_cv['CV (%)'].values
-    cores_lista = [CORES[nome] for nome in nomes]
+    cores_lista = [cor_estacao(nome) for nome in nomes]
     
     bars = ax.bar(nomes, cvs, color=cores_lista, edgecolor='black', linewidth=1.5, alpha=0.8)
     
@@ -263,47 +280,86 @@ def comparacao_coeficiente_variacao(dados):
     ax.grid(True, alpha=0.3, axis='y')
     
     plt.tight_layout()
-    plt.savefig(COMPARACAO_DIR / "06_coeficiente_variacao_comparacao.png", dpi=300, bbox_inches='tight')
-    plt.close()
+    salvar_figura(COMPARACAO_DIR / "06_coeficiente_variacao_comparacao.png")
     print("✓ Gráfico: 06_coeficiente_variacao_comparacao.png")
     
-    df_cv.to_csv(COMPARACAO_DIR / "coeficiente_variacao.csv", index=False)
+    with instrumentacao.medir("exportacao_csv"):
+        df_cv.to_csv(COMPARACAO_DIR / "coeficiente_variacao.csv", index=False)
+
+# Gráficos da comparação e os arquivos que cada um grava em COMPARACAO_DIR
+GRAFICOS_COMPARACAO = [
+    (comparacao_series_temporais, ["01_series_temporais_comparacao.png"]),
+    (comparacao_estatisticas, ["02_media_precipitacao_comparacao.png", "estatisticas_descritivas.csv"]),
+    (comparacao_boxplot, ["03_boxplot_comparacao.png"]),
+    (comparacao_climatologia_mensal, ["04_climatologia_mensal_comparacao.png"]),
+    (comparacao_tendencia_linear, ["05_tendencia_linear_comparacao.png"]),
+    (comparacao_coeficiente_variacao, ["06_coeficiente_variacao_comparacao.png", "coeficiente_variacao.csv"]),
+]
+
+def graficos_comparacao(dados, fila=None):
+    """
+    Gera os gráficos e tabelas de GRAFICOS_COMPARACAO pela fila de renderização.
+    
+    Sem `fila`, usa uma fila sequencial; gráficos cujos dados, código e estilo
+    não mudaram desde a última execução são reaproveitados.
+    Retorna (renderizados, reaproveitados).
+    """
+    fila = FilaRenderizacao() if fila is None else fila
+    for funcao, saidas in GRAFICOS_COMPARACAO:
+        fila.adicionar(funcao, dados, saidas=[COMPARACAO_DIR / saida for saida in saidas])
+    return fila.executar()
 
 # ===============================
 # EXECUÇÃO
 # ===============================
 if __name__ == "__main__":
-    print("\n" + "="*70)
-    print("📊 ANÁLISE COMPARATIVA - 4 ESTAÇÕES PLUVIOMÉTRICAS")
-    print("="*70)
-    
-    print("\n📈 Carregando dados das séries mensais...")
-    dados = carregar_series_mensais()
-    
-    if len(dados) < 4:
-        print("⚠️  Apenas {} estações foram carregadas.".format(len(dados)))
-        exit(1)
-    
-    print("\n📉 Gerando gráficos comparativos...")
-    comparacao_series_temporais(dados)
-    df_stats = comparacao_estatisticas(dados)
-    comparacao_boxplot(dados)
-    comparacao_climatologia_mensal(dados)
-    comparacao_tendencia_linear(dados)
-    comparacao_coeficiente_variacao(dados)
-    
-    print("\n" + "="*70)
-    print("✅ COMPARAÇÃO CONCLUÍDA!")
-    print("="*70)
-    print("\n📁 Arquivo: output/graficos/Comparacao/")
-    print("\n📊 Gráficos gerados:")
-    print("   1. Series temporais comparativas")
-    print("   2. Média de precipitação mensal")
-    print("   3. Boxplot comparativo")
-    print("   4. Climatologia mensal sazonal")
-    print("   5. Tendência linear")
-    print("   6. Coeficiente de variação")
-    print("\n📋 Tabelas CSV:")
-    print("   - estatisticas_descritivas.csv")
-    print("   - coeficiente_variacao.csv")
-    print("\n" + "="*70)
+    parser = argparse.ArgumentParser(description="Análise comparativa entre as estações")
+    parser.add_argument("--preview", action="store_true",
+                        help="gráficos em baixa resolução, sem bbox justo (execução interativa)")
+    parser.add_argument("--painel", nargs="?", type=Path, const=PAINEL_DIR, default=None,
+                        help="lê as séries do painel (padrão: %(const)s) em vez das séries de main.py, com todas as estações dele")
+    parser.add_argument("--profile", action="store_true",
+                        help="grava o cProfile em output/execucoes/comparacao.prof")
+    parser.add_argument("--render-workers", type=int, default=1,
+                        help="processos para renderizar os gráficos (padrão: 1)")
+    parser.add_argument("--force-render", action="store_true",
+                        help="renderiza todos os gráficos, mesmo os que não mudaram")
+    args = parser.parse_args()
+    definir_perfil("preview" if args.preview else "publicacao")
+    
+    with instrumentacao.sessao("comparacao", perfil_cprofile=args.profile):
+        print("\n" + "="*70)
+        print("📊 ANÁLISE COMPARATIVA - 4 ESTAÇÕES PLUVIOMÉTRICAS")
+        print("="*70)
+        
+        print("\n📈 Carregando dados das séries mensais...")
+        painel = Painel.abrir(args.painel) if args.painel else None
+        dados = carregar_series_mensais(painel)
+        
+        if len(dados) < (2 if painel is not None else 4):
+            print("⚠️  Apenas {} estações foram carregadas.".format(len(dados)))
+            exit(1)
+        
+        print("\n📉 Gerando gráficos comparativos...")
+        fila = FilaRenderizacao(workers=args.render_workers, reaproveitar=not args.force_render)
+        try:
+            renderizados, reaproveitados = graficos_comparacao(dados, fila)
+        finally:
+            fila.encerrar()
+        print(f"✓ {renderizados} gráficos criados | {reaproveitados} sem alteração (reaproveitados)")
+        
+        print("\n" + "="*70)
+        print("✅ COMPARAÇÃO CONCLUÍDA!")
+        print("="*70)
+        print("\n📁 Arquivo: output/graficos/Comparacao/")
+        print("\n📊 Gráficos gerados:")
+        print("   1. Series temporais comparativas")
+        print("   2. Média de precipitação mensal")
+        print("   3. Boxplot comparativo")
+        print("   4. Climatologia mensal sazonal")
+        print("   5. Tendência linear")
+        print("   6. Coeficiente de variação")
+        print("\n📋 Tabelas CSV:")
+        print("   - estatisticas_descritivas.csv")
+        print("   - coeficiente_variacao.csv")
+        print("\n" + "="*70)
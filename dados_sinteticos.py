@@ -0,0 +1,129 @@
+"""
+Gerador de arquivos sintéticos de estações no formato HIDROWEB (.txt).
+
+Cada estação tem uma série diária com estação chuvosa (outubro a março) e seca,
+como as estações de Goiás: a ocorrência de chuva segue uma probabilidade
+sazonal e a altura de chuva uma distribuição Gamma. Sobre essa série:
+
+- `lacunas`: fração dos dias ausentes do arquivo, em trechos de dias
+  consecutivos (falhas do equipamento);
+- `malformadas`: fração das linhas trocadas por linhas que a leitura descarta
+  (linha vazia, só a data, precipitação não numérica).
+
+As primeiras estações recebem os nomes de arquivo das estações reais
+(goianesia33.txt, ...), para que comparacao.py e glm_predicao.py as encontrem;
+as demais são sintetica05, sintetica06, ... Cada estação tem a sua semente,
+derivada da semente global: a estação k é a mesma para qualquer número de estações.
+
+Uso:
+    python dados_sinteticos.py [--pasta data] [--estacoes 4] [--anos 40] [--lacunas 0.02] [--malformadas 0.001]
+"""
+
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# ===============================
+# CONFIGURAÇÕES
+# ===============================
+ARQUIVOS_REAIS = ["goianesia", "campoalegre", "marzagao", "tresranchos"]
+ANO_INICIAL = 1980
+DURACAO_MEDIA_LACUNA = 10   # dias por trecho ausente
+
+# Probabilidade de dia chuvoso e altura média (mm) por mês, jan..dez
+PROBABILIDADE_CHUVA = np.array([0.55, 0.50, 0.45, 0.25, 0.10, 0.03, 0.02, 0.04, 0.15, 0.35, 0.50, 0.58])
+ALTURA_MEDIA = np.array([14.0, 13.0, 12.0, 10.0, 8.0, 6.0, 5.0, 6.0, 9.0, 12.0, 14.0, 15.0])
+FORMA_GAMMA = 0.8
+
+LINHAS_MALFORMADAS = ["", "{data}", "{data}   ---", "{data}   ,", "{data}   ND"]
+
+
+def nome_arquivo(indice):
+    """Nome do arquivo da estação de índice `indice` (0, 1, ...)."""
+    base = ARQUIVOS_REAIS[indice] if indice < len(ARQUIVOS_REAIS) else f"sintetica{indice + 1:02d}"
+    return f"{base}33.txt"
+
+def serie_diaria(anos, lacunas=0.0, semente=0, ano_inicial=ANO_INICIAL):
+    """
+    Série diária sintética: DataFrame com data e precip (mm), sem os dias em lacuna.
+    """
+    rng = np.random.default_rng(semente)
+    datas = pd.date_range(f"{ano_inicial}-01-01", f"{ano_inicial + anos - 1}-12-31", freq="D")
+    mes = datas.month.to_numpy() - 1
+    chove = rng.random(len(datas)) < PROBABILIDADE_CHUVA[mes]
+    altura = rng.gamma(FORMA_GAMMA, ALTURA_MEDIA[mes] / FORMA_GAMMA)
+    precip = np.round(np.where(chove, altura, 0.0), 1)
+
+    presente = np.ones(len(datas), dtype=bool)
+    if lacunas > 0:
+        # Trechos de duração geométrica até cobrir a fração pedida de dias
+        trechos = rng.binomial(len(datas), lacunas / DURACAO_MEDIA_LACUNA)
+        inicios = rng.integers(0, len(datas), size=trechos)
+        duracoes = rng.geometric(1 / DURACAO_MEDIA_LACUNA, size=trechos)
+        cobertura = np.zeros(len(datas) + 1, dtype=int)
+        np.add.at(cobertura, inicios, 1)
+        np.add.at(cobertura, np.minimum(inicios + duracoes, len(datas)), -1)
+        presente = np.cumsum(cobertura[:-1]) == 0
+
+    return pd.DataFrame({"data": datas[presente], "precip": precip[presente]})
+
+def linhas_hidroweb(serie, malformadas=0.0, rng=None):
+    """Linhas do corpo da tabela ("dd/mm/aaaa   12,3"), com uma fração de linhas malformadas."""
+    rng = rng if rng is not None else np.random.default_rng()
+    datas = serie["data"].dt.strftime("%d/%m/%Y").to_numpy()
+    valores = np.char.replace(np.char.mod("%.1f", serie["precip"].to_numpy()), ".", ",")
+    linhas = [f"{d}   {v}" for d, v in zip(datas, valores)]
+
+    if malformadas > 0:
+        for i in np.flatnonzero(rng.random(len(linhas)) < malformadas):
+            modelo = LINHAS_MALFORMADAS[rng.integers(len(LINHAS_MALFORMADAS))]
+            linhas[i] = modelo.format(data=datas[i])
+    return linhas
+
+def gerar_estacao(caminho, anos, lacunas=0.0, malformadas=0.0, semente=0):
+    """Grava um arquivo HIDROWEB sintético; retorna a série diária gravada (sem as linhas malformadas)."""
+    sementes = np.random.SeedSequence(semente).spawn(2)
+    serie = serie_diaria(anos, lacunas, sementes[0])
+    linhas = linhas_hidroweb(serie, malformadas, np.random.default_rng(sementes[1]))
+    nome = Path(caminho).stem.split("33")[0]
+    with open(caminho, "w", encoding="latin1") as f:
+        f.write(f"Estacao {nome} (sintetica)\nData Precip\n")
+        f.write("\n".join(linhas))
+        f.write("\n")
+    return serie
+
+def gerar_rede(pasta, estacoes=4, anos=40, lacunas=0.0, malformadas=0.0, semente=0):
+    """Grava `estacoes` arquivos em `pasta`; retorna a lista de caminhos."""
+    pasta = Path(pasta)
+    pasta.mkdir(parents=True, exist_ok=True)
+    caminhos = []
+    for indice in range(estacoes):
+        caminho = pasta / nome_arquivo(indice)
+        gerar_estacao(caminho, anos, lacunas, malformadas, semente=(semente, indice))
+        caminhos.append(caminho)
+    return caminhos
+
+# ===============================
+# EXECUÇÃO PRINCIPAL
+# ===============================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera estações sintéticas no formato HIDROWEB")
+    parser.add_argument("--pasta", type=Path, default=Path("data"),
+                        help="pasta de saída (padrão: %(default)s)")
+    parser.add_argument("--estacoes", type=int, default=4,
+                        help="número de estações (padrão: %(default)d)")
+    parser.add_argument("--anos", type=int, default=40,
+                        help="anos de dados diários por estação (padrão: %(default)d)")
+    parser.add_argument("--lacunas", type=float, default=0.02,
+                        help="fração de dias ausentes, em trechos (padrão: %(default)s)")
+    parser.add_argument("--malformadas", type=float, default=0.001,
+                        help="fração de linhas malformadas (padrão: %(default)s)")
+    parser.add_argument("--semente", type=int, default=0,
+                        help="semente (padrão: %(default)d)")
+    args = parser.parse_args()
+
+    caminhos = gerar_rede(args.pasta, args.estacoes, args.anos, args.lacunas, args.malformadas, args.semente)
+    print(f"📝 {len(caminhos)} estação(ões) sintética(s) em {args.pasta}/ "
+          f"({args.anos} anos, {args.lacunas:.1%} de lacunas, {args.malformadas:.2%} de linhas malformadas)")
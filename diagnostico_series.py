@@ -0,0 +1,372 @@
+"""
+Diagnóstico de estacionariedade e autocorrelação de todas as estações de uma vez.
+
+Faz para a rede inteira o que exemplo_arima.py faz para uma estação: teste ADF,
+teste KPSS, ACF e PACF até a defasagem 24. As séries mensais ficam numa matriz
+(linhas = meses do calendário, colunas = estações, NaN nos meses sem dado ou
+incompletos) e cada passo é uma operação sobre a matriz inteira:
+
+- autocovariâncias de todas as colunas por FFT. A ACF e a PACF usam o
+  calendário inteiro: os meses sem dado entram como desvio zero, então a
+  defasagem k é sempre k meses (como acf(missing='conservative'));
+- ADF e KPSS precisam de meses consecutivos: rodam no trecho contínuo mais
+  longo de cada estação (calendario.trecho_continuo), com o tamanho em n_trecho;
+- PACF por Durbin-Levinson, com a recursão aplicada a todas as colunas;
+- ADF com escolha da defasagem pelo AIC: as regressões de todas as estações e
+  de todas as defasagens saem de uma única matriz de Gram por estação.
+
+Os resultados são os de statsmodels (acf com missing='conservative', pacf
+'ywm' sobre essa ACF, e adfuller com autolag='AIC' e kpss com regression='c',
+nlags='auto' sobre o trecho contínuo) aplicados a cada série.
+
+Saída: tabela longa (Estação, medida, defasagem, valor) em
+output/graficos/diagnostico_series.csv. Os gráficos ACF/PACF são opcionais
+(--graficos) e feitos a partir da tabela.
+
+Uso:
+    python diagnostico_series.py [--painel] [--defasagens 24] [--graficos]
+"""
+
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from statsmodels.tsa.adfvalues import mackinnonp
+
+from calendario import trecho_continuo
+from estatisticas_rede import matriz_de_series
+from painel import PAINEL_DIR, Painel
+
+# ===============================
+# CONFIGURAÇÕES
+# ===============================
+OUTPUT_DIR = Path("output/graficos")
+ARQUIVO_DIAGNOSTICO = OUTPUT_DIR / "diagnostico_series.csv"
+DEFASAGENS = 24
+
+# Valores críticos do KPSS com constante (Kwiatkowski et al., 1992), como no statsmodels
+KPSS_CRITICOS = [0.347, 0.463, 0.574, 0.739]
+KPSS_NIVEIS = [0.10, 0.05, 0.025, 0.01]
+
+
+def trecho_no_topo(matriz):
+    """
+    Move o trecho contínuo mais longo de cada coluna para o topo, na ordem original.
+
+    Retorna (matriz com NaN abaixo do trecho de cada coluna, tamanho do trecho
+    por coluna): a linha i da coluna j é o i-ésimo mês do trecho da estação j.
+    Os meses fora do trecho ficam de fora, em vez de juntar trechos separados
+    por lacunas.
+    """
+    inicio, n = trecho_continuo(matriz)
+    linhas = np.arange(matriz.shape[0])[:, None]
+    origem = np.minimum(inicio + linhas, matriz.shape[0] - 1)
+    trecho = np.take_along_axis(matriz, origem, axis=0)
+    trecho[linhas >= n] = np.nan
+    return trecho, n
+
+# ===============================
+# AUTOCORRELAÇÃO
+# ===============================
+def autocovariancias(series, n):
+    """
+    Somas dos produtos defasados dos desvios da média, sum_t d_t d_(t+k), para
+    k = 0 .. linhas-1 e todas as colunas, por FFT.
+
+    As posições sem dado entram como desvio zero (n = meses com dado por coluna):
+    no calendário, um mês faltante não desloca os demais e só some dos produtos
+    em que aparece, como em acf(missing='conservative').
+    """
+    tamanho = series.shape[0]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        desvios = np.nan_to_num(series - np.nansum(series, axis=0) / n)
+    nfft = 1 << int(2 * tamanho - 1).bit_length()
+    espectro = np.fft.rfft(desvios, n=nfft, axis=0)
+    return np.fft.irfft(espectro * espectro.conj(), n=nfft, axis=0)[:tamanho]
+
+def acf_colunas(somas, defasagens):
+    """ACF (defasagens 0..`defasagens`) de cada coluna, a partir de autocovariancias()."""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return somas[:defasagens + 1] / somas[0]
+
+def pacf_colunas(acf, defasagens):
+    """
+    PACF (defasagens 0..`defasagens`) de cada coluna pela recursão de Durbin-Levinson.
+
+    Equivale a statsmodels.pacf(method='ywm'): Yule-Walker com autocovariâncias
+    não ajustadas, resolvido para todas as ordens e colunas de uma vez.
+    """
+    colunas = acf.shape[1]
+    pacf = np.ones((defasagens + 1, colunas))
+    phi = np.zeros((defasagens + 1, colunas))
+    variancia = np.ones(colunas)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for k in range(1, defasagens + 1):
+            # phi[1..k-1] são os coeficientes da ordem k-1
+            reflexao = (acf[k] - np.einsum("ij,ij->j", phi[1:k], acf[k - 1:0:-1])) / variancia
+            phi[1:k] = phi[1:k] - reflexao * phi[k - 1:0:-1]
+            phi[k] = reflexao
+            variancia = variancia * (1.0 - reflexao ** 2)
+            pacf[k] = reflexao
+    return pacf
+
+def limites_confianca(acf, n):
+    """Meia-largura do intervalo de 95% da ACF (fórmula de Bartlett) e da PACF (1/sqrt(n))."""
+    acumulado = np.cumsum(acf[1:-1] ** 2, axis=0)
+    variancia_acf = np.vstack([np.zeros((1, acf.shape[1])), np.ones((1, acf.shape[1])),
+                               1 + 2 * acumulado]) / n
+    z = 1.959963984540054
+    limite_pacf = np.broadcast_to(z / np.sqrt(n), acf.shape).copy()
+    limite_pacf[0] = 0.0
+    return z * np.sqrt(variancia_acf), limite_pacf
+
+# ===============================
+# TESTES DE ESTACIONARIEDADE
+# ===============================
+def teste_kpss(trecho, n, somas):
+    """
+    KPSS com constante (H0: série estacionária) de cada coluna de `trecho`
+    (meses consecutivos no topo, NaN abaixo; `somas` = autocovariancias(trecho, n)).
+
+    A escolha automática de defasagens (Hobijn et al., 1998) e a variância de
+    longo prazo usam as autocovariâncias já calculadas. Retorna dict com
+    estatistica, p_valor (interpolado na tabela, limitado a 0.01..0.10) e defasagens.
+    """
+    defasagem = np.arange(somas.shape[0])[:, None]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        residuos = np.nan_to_num(trecho - np.nansum(trecho, axis=0) / n)
+        eta = np.sum(np.cumsum(residuos, axis=0) ** 2, axis=0) / n ** 2
+
+        # Defasagens automáticas
+        covlags = np.power(n, 2.0 / 9.0).astype(int)
+        produtos = np.where((defasagem >= 1) & (defasagem <= covlags), somas / (n / 2.0), 0.0)
+        s0 = somas[0] / n + produtos.sum(axis=0)
+        s1 = (defasagem * produtos).sum(axis=0)
+        gama = 1.1447 * np.power((s1 / s0) ** 2, 1.0 / 3.0)
+        nlags = np.minimum((gama * np.power(n, 1.0 / 3.0)).astype(int), n - 1)
+
+        # Variância de longo prazo (núcleo de Bartlett)
+        pesos = np.where((defasagem >= 1) & (defasagem <= nlags), 1.0 - defasagem / (nlags + 1.0), 0.0)
+        variancia = (somas[0] + 2 * (pesos * somas).sum(axis=0)) / n
+        estatistica = eta / variancia
+
+    p_valor = np.interp(estatistica, KPSS_CRITICOS, KPSS_NIVEIS)
+    return {"estatistica": estatistica, "p_valor": p_valor, "defasagens": nlags}
+
+def _resolver_lotes(gram, xy):
+    """Resolve os sistemas gram[s] b[s] = xy[s]; sistemas singulares ficam com NaN."""
+    b = np.full(xy.shape, np.nan)
+    regulares = np.isfinite(gram).all(axis=(1, 2)) & (np.abs(np.linalg.det(gram)) > 0)
+    if regulares.any():
+        b[regulares] = np.linalg.solve(gram[regulares], xy[regulares, :, None])[..., 0]
+    return b, regulares
+
+def teste_adf(trecho, n, max_defasagem=None):
+    """
+    ADF com constante (H0: raiz unitária) de cada coluna de `trecho` (meses
+    consecutivos no topo, NaN abaixo), defasagem escolhida pelo AIC.
+
+    Regressão de Δx_t = x_(t+1) - x_t em x_t, constante e Δx_(t-1) .. Δx_(t-L),
+    como em adfuller. As regressões de todas as defasagens usam as submatrizes de uma única matriz
+    de Gram por estação, sobre a amostra comum (como em adfuller); a defasagem
+    escolhida é reajustada na amostra completa. Retorna dict com estatistica,
+    p_valor (MacKinnon), defasagens e nobs.
+    """
+    tamanho, colunas = trecho.shape
+    if max_defasagem is None:
+        # Schwert (1989), como no statsmodels
+        max_defasagem = np.minimum(np.ceil(12.0 * np.power(n / 100.0, 0.25)).astype(int), n // 2 - 2)
+    max_defasagem = np.broadcast_to(np.asarray(max_defasagem, dtype=int), (colunas,))
+    L = int(max(max_defasagem.max(), 0))
+
+    # Linha t: Δx_t = x_(t+1) - x_t, regressores x_t, 1, Δx_(t-1) .. Δx_(t-L)
+    x = np.nan_to_num(trecho)
+    dx = np.zeros((tamanho - 1, colunas))
+    dx[:] = x[1:] - x[:-1]
+    X = np.empty((tamanho - 1, colunas, L + 2))
+    X[:, :, 0] = x[:-1]
+    X[:, :, 1] = 1.0
+    for k in range(1, L + 1):
+        X[:k, :, k + 1] = 0.0
+        X[k:, :, k + 1] = dx[:-k]
+
+    t = np.arange(tamanho - 1)[:, None]
+
+    def gram(primeira_linha):
+        w = ((t >= primeira_linha) & (t <= n - 2)).astype(float)
+        return (np.einsum("ts,tsi,tsj->sij", w, X, X),
+                np.einsum("ts,tsi,ts->si", w, X, dx),
+                np.einsum("ts,ts,ts->s", w, dx, dx),
+                w.sum(axis=0))
+
+    # Escolha da defasagem: amostra comum a partir de max_defasagem
+    G, h, yy, nobs = gram(max_defasagem)
+    aic = np.full((L + 1, colunas), np.inf)
+    for lag in range(L + 1):
+        k = lag + 2
+        b, ok = _resolver_lotes(G[:, :k, :k], h[:, :k])
+        ssr = yy - np.einsum("si,si->s", b, h[:, :k])
+        with np.errstate(invalid="ignore", divide="ignore"):
+            llf = -nobs / 2.0 * (np.log(2 * np.pi) + np.log(ssr / nobs) + 1.0)
+        valido = ok & (lag <= max_defasagem) & (ssr > 0)
+        aic[lag] = np.where(valido, -2.0 * llf + 2.0 * k, np.inf)
+    escolhida = np.argmin(aic, axis=0)
+
+    # Reajuste com a defasagem escolhida; colunas além dela viram identidade
+    G, h, yy, nobs = gram(escolhida)
+    fora = np.arange(L + 2)[None, :] >= (escolhida + 2)[:, None]
+    G[fora[:, :, None] | fora[:, None, :]] = 0.0
+    G[:, np.arange(L + 2), np.arange(L + 2)] += fora
+    h[fora] = 0.0
+    b, ok = _resolver_lotes(G, h)
+    ssr = yy - np.einsum("si,si->s", b, h)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        inversa = np.full(G.shape, np.nan)
+        inversa[ok] = np.linalg.inv(G[ok])
+        sigma2 = ssr / (nobs - (escolhida + 2))
+        estatistica = b[:, 0] / np.sqrt(sigma2 * inversa[:, 0, 0])
+
+    p_valor = np.array([mackinnonp(e, regression="c", N=1) if np.isfinite(e) else np.nan
+                        for e in estatistica])
+    return {"estatistica": estatistica, "p_valor": p_valor, "defasagens": escolhida,
+            "nobs": nobs.astype(int)}
+
+# ===============================
+# DIAGNÓSTICO DA REDE
+# ===============================
+def diagnosticar(matriz, nomes, defasagens=DEFASAGENS):
+    """
+    ADF, KPSS, ACF e PACF de todas as colunas de `matriz` (meses x estações, NaN sem dado).
+
+    ACF e PACF usam o calendário inteiro (n = meses com dado); ADF e KPSS, o
+    trecho contínuo mais longo de cada coluna (n_trecho meses).
+    Retorna a tabela longa com colunas Estação, medida, defasagem e valor
+    (defasagem vazia nas medidas dos testes).
+    """
+    matriz = np.asarray(matriz, dtype=float)
+    n = (~np.isnan(matriz)).sum(axis=0)
+    defasagens = int(min(defasagens, matriz.shape[0] - 1))
+
+    acf = acf_colunas(autocovariancias(matriz, n), defasagens)
+    pacf = pacf_colunas(acf, defasagens)
+    limite_acf, limite_pacf = limites_confianca(acf, n)
+
+    trecho, n_trecho = trecho_no_topo(matriz)
+    adf = teste_adf(trecho, n_trecho)
+    kpss = teste_kpss(trecho, n_trecho, autocovariancias(trecho, n_trecho))
+
+    testes = {
+        "n": n,
+        "n_trecho": n_trecho,
+        "adf_estatistica": adf["estatistica"],
+        "adf_p_valor": adf["p_valor"],
+        "adf_defasagens": adf["defasagens"],
+        "kpss_estatistica": kpss["estatistica"],
+        "kpss_p_valor": kpss["p_valor"],
+        "kpss_defasagens": kpss["defasagens"],
+    }
+    por_defasagem = {"acf": acf, "acf_limite95": limite_acf, "pacf": pacf, "pacf_limite95": limite_pacf}
+
+    colunas = len(nomes)
+    partes = [pd.DataFrame({
+        "Estação": np.tile(nomes, len(testes)),
+        "medida": np.repeat(list(testes), colunas),
+        "defasagem": pd.array([pd.NA] * (len(testes) * colunas), dtype="Int64"),
+        "valor": np.concatenate([np.asarray(v, dtype=float) for v in testes.values()]),
+    })]
+    for medida, valores in por_defasagem.items():
+        partes.append(pd.DataFrame({
+            "Estação": np.tile(nomes, defasagens + 1),
+            "medida": medida,
+            "defasagem": pd.array(np.repeat(np.arange(defasagens + 1), colunas), dtype="Int64"),
+            "valor": valores.ravel(),
+        }))
+    tabela = pd.concat(partes, ignore_index=True)
+    ordem = {nome: i for i, nome in enumerate(nomes)}
+    return tabela.sort_values("Estação", key=lambda s: s.map(ordem), kind="stable").reset_index(drop=True)
+
+def resumo_testes(tabela, nivel=0.05):
+    """Uma linha por estação com os testes e a diferenciação sugerida (d=0 se o ADF rejeita a raiz unitária)."""
+    testes = tabela[tabela["defasagem"].isna()].pivot(index="Estação", columns="medida", values="valor")
+    testes = testes.reindex(tabela["Estação"].unique())
+    testes["d_sugerido"] = np.where(testes["adf_p_valor"] < nivel, 0, 1)
+    return testes
+
+# ===============================
+# GRÁFICOS (OPCIONAIS)
+# ===============================
+def plotar_acf_pacf(tabela, pastas):
+    """Gráfico ACF/PACF de cada estação (como o de exemplo_arima.py), a partir da tabela."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    series = tabela.dropna(subset=["defasagem"]).pivot_table(
+        index=["Estação", "defasagem"], columns="medida", values="valor")
+    for nome_estacao, pasta_estacao in pastas.items():
+        dados = series.loc[nome_estacao]
+        defasagem = dados.index.to_numpy(dtype=int)
+        fig, axes = plt.subplots(2, 1, figsize=(12, 8))
+        for ax, medida, titulo in ((axes[0], "acf", "Autocorrelação (ACF)"),
+                                   (axes[1], "pacf", "Autocorrelação Parcial (PACF)")):
+            limite = dados[f"{medida}_limite95"].to_numpy()
+            ax.fill_between(defasagem[1:], -limite[1:], limite[1:], alpha=0.25, color="steelblue", lw=0)
+            ax.vlines(defasagem, 0, dados[medida], color="steelblue")
+            ax.plot(defasagem, dados[medida], "o", color="steelblue", markersize=4)
+            ax.axhline(0, color="black", lw=0.8)
+            ax.set_title(f"{titulo} - {nome_estacao}", fontweight="bold")
+            ax.set_ylabel(medida.upper())
+        axes[1].set_xlabel("Defasagem (meses)")
+        plt.tight_layout()
+        destino = OUTPUT_DIR / pasta_estacao
+        destino.mkdir(parents=True, exist_ok=True)
+        plt.savefig(destino / "acf_pacf.png", dpi=150, bbox_inches="tight")
+        plt.close(fig)
+
+# ===============================
+# EXECUÇÃO PRINCIPAL
+# ===============================
+if __name__ == "__main__":
+    from glm_predicao import ESTACOES, carregar_dados_estacao
+
+    parser = argparse.ArgumentParser(description="ADF, KPSS, ACF e PACF de todas as estações")
+    parser.add_argument("--painel", nargs="?", type=Path, const=PAINEL_DIR, default=None,
+                        help="lê as séries do painel (padrão: %(const)s) em vez das séries de main.py")
+    parser.add_argument("--defasagens", type=int, default=DEFASAGENS,
+                        help="defasagem máxima da ACF/PACF (padrão: %(default)d)")
+    parser.add_argument("--graficos", action="store_true",
+                        help="também salva o gráfico ACF/PACF de cada estação")
+    args = parser.parse_args()
+
+    print("\n" + "="*70)
+    print("🔍 DIAGNÓSTICO DE ESTACIONARIEDADE E AUTOCORRELAÇÃO")
+    print("="*70)
+
+    painel = Painel.abrir(args.painel) if args.painel else None
+    estacoes = ESTACOES if painel is None else {e["nome"]: e["pasta"] for e in painel.estacoes}
+    dados, pastas = {}, {}
+    for nome_estacao, pasta_estacao in estacoes.items():
+        df = carregar_dados_estacao(pasta_estacao, painel)
+        if df is None:
+            print(f"✗ {nome_estacao}: dados não encontrados")
+            continue
+        dados[nome_estacao] = df
+        pastas[nome_estacao] = pasta_estacao
+
+    _, matriz, nomes = matriz_de_series(dados)
+    tabela = diagnosticar(matriz, nomes, args.defasagens)
+    ARQUIVO_DIAGNOSTICO.parent.mkdir(parents=True, exist_ok=True)
+    tabela.to_csv(ARQUIVO_DIAGNOSTICO, index=False)
+
+    resumo = resumo_testes(tabela)
+    print(f"\n📊 {len(nomes)} estação(ões)\n")
+    print(resumo[["n", "n_trecho", "adf_estatistica", "adf_p_valor", "kpss_estatistica", "kpss_p_valor", "d_sugerido"]]
+          .round(4).to_string())
+    print(f"\n✓ Tabela salva: {ARQUIVO_DIAGNOSTICO}")
+
+    if args.graficos:
+        plotar_acf_pacf(tabela, pastas)
+        print(f"✓ Gráficos ACF/PACF salvos: {OUTPUT_DIR}/<estação>/acf_pacf.png")
+
+    print("\n" + "="*70)
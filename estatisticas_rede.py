@@ -0,0 +1,100 @@
+"""
+Estatísticas de várias estações de uma só vez, sobre a matriz meses x estações.
+
+As séries mensais ficam numa matriz 2D (linhas = meses do calendário contínuo,
+colunas = estações, NaN onde a estação não tem dado) e cada estatística é
+calculada para todas as colunas numa única operação do NumPy:
+
+- média, mediana, desvio padrão, mínimo, máximo, quartis e CV por coluna;
+- regressão linear (inclinação, intercepto e R²) em forma fechada para todas as colunas;
+- climatologia por mês do ano com um único reshape (anos x 12 x estações).
+
+Os resultados são os mesmos das versões por estação em pandas/scipy. O eixo x
+da regressão é a posição do mês no calendário contínuo (a linha da matriz):
+meses sem dado ou incompletos (calendario.py) ficam de fora sem deslocar os
+demais.
+"""
+
+import warnings
+
+import numpy as np
+
+
+def matriz_de_series(dados, coluna="precip_mm"):
+    """
+    Monta a matriz meses x estações a partir de {estação: DataFrame com 'periodo' e `coluna`}.
+
+    Retorna (periodos datetime64[M], matriz float64, nomes das estações).
+    """
+    nomes = list(dados)
+    meses = [dados[nome]["periodo"].to_numpy().astype("datetime64[M]") for nome in nomes]
+    inicio = min(m.min() for m in meses)
+    fim = max(m.max() for m in meses)
+
+    periodos = np.arange(inicio, fim + 1)
+    matriz = np.full((len(periodos), len(nomes)), np.nan)
+    for j, (nome, m) in enumerate(zip(nomes, meses)):
+        matriz[(m - inicio).astype(np.int64), j] = dados[nome][coluna].to_numpy(dtype=float)
+    return periodos, matriz, nomes
+
+def estatisticas_colunas(matriz):
+    """Média, mediana, desvio padrão (ddof=1), mínimo, máximo, Q1, Q3 e CV (%) de cada coluna."""
+    with warnings.catch_warnings():
+        # Colunas sem nenhum dado resultam em NaN
+        warnings.simplefilter("ignore", RuntimeWarning)
+        media = np.nanmean(matriz, axis=0)
+        desvio = np.nanstd(matriz, axis=0, ddof=1)
+        q1, mediana, q3 = np.nanquantile(matriz, [0.25, 0.5, 0.75], axis=0)
+        return {
+            "media": media,
+            "mediana": mediana,
+            "desvio": desvio,
+            "minimo": np.nanmin(matriz, axis=0),
+            "maximo": np.nanmax(matriz, axis=0),
+            "q1": q1,
+            "q3": q3,
+            "cv": desvio / media * 100,
+        }
+
+def tendencia_linear(matriz):
+    """
+    Regressão linear y = intercepto + inclinacao * x de cada coluna, em forma fechada.
+
+    x é a linha da matriz (posição do mês no calendário, 0 na primeira linha);
+    os NaN ficam fora do ajuste. Retorna dict com inclinacao, intercepto, r2 e
+    n (arrays, um valor por coluna).
+    """
+    valido = ~np.isnan(matriz)
+    n = valido.sum(axis=0)
+    x = np.where(valido, np.arange(len(matriz), dtype=float)[:, None], 0.0)
+    y = np.where(valido, matriz, 0.0)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        media_x = x.sum(axis=0) / n
+        media_y = y.sum(axis=0) / n
+        dx = np.where(valido, x - media_x, 0.0)
+        dy = np.where(valido, y - media_y, 0.0)
+        sxx = (dx * dx).sum(axis=0)
+        sxy = (dx * dy).sum(axis=0)
+        syy = (dy * dy).sum(axis=0)
+
+        inclinacao = sxy / sxx
+        intercepto = media_y - inclinacao * media_x
+        r2 = sxy ** 2 / (sxx * syy)
+
+    return {"inclinacao": inclinacao, "intercepto": intercepto, "r2": r2, "n": n}
+
+def climatologia_mensal(matriz, inicio):
+    """
+    Média por mês do ano (Jan..Dez) de cada coluna: matriz 12 x estações.
+
+    `inicio` é o mês (datetime64[M]) da primeira linha. A matriz é completada com
+    NaN até anos inteiros e reorganizada em (anos, 12, estações).
+    """
+    antes = int(np.datetime64(inicio, "M").astype(np.int64) % 12)
+    depois = -(antes + len(matriz)) % 12
+    completa = np.pad(matriz, ((antes, depois), (0, 0)), constant_values=np.nan)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return np.nanmean(completa.reshape(-1, 12, matriz.shape[1]), axis=0)
@@ -1,36 +1,58 @@
 """
 EXEMPLO: Preparação de dados para ARIMA
 
-Este script demonstra como usar os arquivos CSV exportados
-para modelagem ARIMA. Execute após `python main.py`.
+Este script demonstra como usar a série mensal exportada por main.py
+(serie_mensal_<estação>.npy) para modelagem ARIMA. Execute após `python main.py`.
 
 Requisitos adicionais:
     pip install statsmodels scikit-learn
+
+O ARIMA ajustado fica salvo em output/cache/modelos/; rodando de novo com a mesma
+série, os parâmetros são recarregados (use --reajustar para ajustar de novo).
 """
 
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 from pathlib import Path
+import argparse
+
+from calendario import mascarar_incompletos, trecho_continuo
+from modelos_salvos import chave_modelo, gravar_modelo, ler_modelo
+from serie_mensal import caminho_serie, ler_serie_mensal
+
+parser = argparse.ArgumentParser(description="Exemplo de preparação e ajuste ARIMA da série mensal")
+parser.add_argument("--reajustar", action="store_true",
+                    help="ignora o modelo salvo em output/cache/modelos/ e ajusta de novo")
+args = parser.parse_args()
 
 # ==============================================================================
 # 1. CARREGAR SÉRIE MENSAL
 # ==============================================================================
 
 pasta_dados = Path("output/graficos/campoalegre")
-arquivo_csv = pasta_dados / "serie_temporal_mensal_arima_campoalegre.csv"
+df = ler_serie_mensal(pasta_dados, "campoalegre")
 
-if not arquivo_csv.exists():
-    print(f"❌ Arquivo não encontrado: {arquivo_csv}")
+if df is None:
+    print(f"❌ Arquivo não encontrado: {caminho_serie(pasta_dados, 'campoalegre')}")
     print("   Execute primeiro: python main.py")
     exit(1)
 
 print("📊 Carregando série temporal mensal...")
-df = pd.read_csv(arquivo_csv)
-df['periodo'] = pd.to_datetime(df['periodo'] + '-01')
-df = df.sort_values('periodo')
 
-print(f"   ✓ {len(df)} meses carregados ({df['periodo'].min().year}-{df['periodo'].max().year})")
+# Meses incompletos ficam em NaN (o ARIMA os trata como ausentes). A série segue
+# no calendário: tirar os NaN juntaria meses distantes e a defasagem k deixaria
+# de ser k meses
+df = mascarar_incompletos(df)
+observado = df['precip_mm'].dropna()
+
+# Trecho mais longo de meses completos consecutivos, para o teste ADF
+inicio_trecho, tamanho_trecho = trecho_continuo(df['precip_mm'])
+trecho = df['precip_mm'].iloc[inicio_trecho:inicio_trecho + tamanho_trecho]
+periodos_trecho = df['periodo'].iloc[inicio_trecho:inicio_trecho + tamanho_trecho]
+
+print(f"   ✓ {len(df)} meses carregados ({df['periodo'].min().year}-{df['periodo'].max().year}), "
+      f"{len(observado)} completos")
 
 # ==============================================================================
 # 2. VISUALIZAR SÉRIE
@@ -50,7 +72,9 @@ try:
     from statsmodels.tsa.stattools import adfuller
     
     print("\n🔍 Teste de Estacionariedade (Augmented Dickey-Fuller)...")
-    resultado_adf = adfuller(df['precip_mm'])
+    print(f"   Trecho contínuo: {periodos_trecho.iloc[0].strftime('%Y-%m')} a "
+          f"{periodos_trecho.iloc[-1].strftime('%Y-%m')} ({tamanho_trecho} meses)")
+    resultado_adf = adfuller(trecho)
     
     print(f"   Estatística ADF: {resultado_adf[0]:.6f}")
     print(f"   p-value: {resultado_adf[1]:.6f}")
@@ -73,17 +97,27 @@ except ImportError:
 # ==============================================================================
 
 try:
-    from statsmodels.graphics.tsaplots import plot_acf, plot_pacf
+    from statsmodels.graphics.tsaplots import plot_acf
+    from statsmodels.tsa.stattools import acf, levinson_durbin
     
     print("\n📊 Analisando correlações...")
     
     fig, axes = plt.subplots(2, 1, figsize=(12, 8))
     
-    plot_acf(df['precip_mm'], lags=24, ax=axes[0])
+    # Meses ausentes ficam de fora só dos produtos em que aparecem
+    plot_acf(df['precip_mm'], lags=24, ax=axes[0], missing='conservative')
     axes[0].set_title('Autocorrelação (ACF) - Série Mensal', fontweight='bold')
     axes[0].set_ylabel('ACF')
     
-    plot_pacf(df['precip_mm'], lags=24, ax=axes[1], method='ywm')
+    # plot_pacf não aceita ausentes: PACF 'ywm' (Durbin-Levinson) sobre a mesma ACF
+    acf_calendario = acf(df['precip_mm'], nlags=24, missing='conservative')
+    pacf_calendario = levinson_durbin(acf_calendario, nlags=24, isacov=True)[2]
+    limite_pacf = 1.959963984540054 / np.sqrt(len(observado))
+    defasagens = np.arange(25)
+    axes[1].fill_between(defasagens[1:], -limite_pacf, limite_pacf, alpha=0.25, color='steelblue', lw=0)
+    axes[1].vlines(defasagens, 0, pacf_calendario, color='steelblue')
+    axes[1].plot(defasagens, pacf_calendario, 'o', color='steelblue', markersize=4)
+    axes[1].axhline(0, color='black', lw=0.8)
     axes[1].set_title('Autocorrelação Parcial (PACF) - Série Mensal', fontweight='bold')
     axes[1].set_ylabel('PACF')
     
@@ -120,7 +154,19 @@ try:
     print("\n⚙️  Ajustando ARIMA(1,1,1)...")
     
     modelo = ARIMA(df['precip_mm'], order=(1, d, 1))
-    resultado = modelo.fit()
+    
+    especificacao = {"modelo": "ARIMA", "ordem": [1, d, 1]}
+    chave = chave_modelo(df['precip_mm'].to_numpy(), especificacao)
+    salvo = None if args.reajustar else ler_modelo(chave)
+    
+    if salvo is not None:
+        # Só o filtro de Kalman com os parâmetros salvos, sem otimização; a
+        # covariância padrão de filter() é a mesma de fit()
+        resultado = modelo.filter(salvo['params'].to_numpy())
+        print("   ✓ Parâmetros recarregados de output/cache/modelos/ (sem novo ajuste)")
+    else:
+        resultado = modelo.fit()
+        gravar_modelo(chave, resultado.params, {"aic": resultado.aic, "bic": resultado.bic}, especificacao)
     
     print(resultado.summary())
     
@@ -144,5 +190,5 @@ print("   3. Ajustar ARIMA com diferentes ordens")
 print("   4. Validar previsões com teste fora-da-amostra")
 print("   5. Gerar previsões para 6-12 meses à frente")
 
-print(f"\n📝 Arquivo CSV: {arquivo_csv.name}")
+print(f"\n📝 Arquivo: {caminho_serie(pasta_dados, 'campoalegre').name}")
 print(f"📦 Série: {df['periodo'].min().strftime('%Y-%m')} a {df['periodo'].max().strftime('%Y-%m')}")
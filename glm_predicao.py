@@ -12,9 +12,21 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 from pathlib import Path
-from sklearn.model_selection import train_test_split
+from concurrent.futures import ProcessPoolExecutor
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+import argparse
 import warnings
+from dataclasses import dataclass
+
+import instrumentacao
+from calendario import mascarar_incompletos
+from bootstrap_glm import (METODOS, REAMOSTRAS, SEMENTE, TAMANHO_BLOCO, cobertura, intervalos_modelos,
+                           salvar_intervalo)
+from matriz_desenho import SAZONALIDADES, DivisaoTreinoTeste, EspecificacaoDesenho, construir_matriz
+from modelos_salvos import chave_modelo, gravar_modelo, ler_modelo
+from painel import PAINEL_DIR, Painel
+from renderizacao import FilaRenderizacao, definir_perfil, salvar_figura
+from serie_mensal import ler_serie_mensal
 
 warnings.filterwarnings('ignore')
 
@@ -51,6 +63,9 @@ CORES = {
     "Três Ranchos": "#d62728"
 }
 
+# Paleta para estações sem cor definida em CORES (ex.: estações vindas do painel)
+PALETA_EXTRA = plt.cm.tab20.colors
+
 # Configurar estilo
 plt.style.use('seaborn-v0_8-darkgrid')
 plt.rcParams.update({
@@ -70,25 +85,42 @@ plt.rcParams.update({
 # CARREGAMENTO E PREPARAÇÃO
 # ===============================
 
-def carregar_dados_estacao(pasta_estacao):
-    """Carrega a série mensal de uma estação."""
-    arquivo_csv = OUTPUT_DIR / pasta_estacao / f"serie_temporal_mensal_arima_{pasta_estacao}.csv"
-    
-    if arquivo_csv.exists():
-        df = pd.read_csv(arquivo_csv)
-        df['periodo'] = pd.to_datetime(df['periodo'] + '-01')
-        df = df.sort_values('periodo').reset_index(drop=True)
-        
-        # Adicionar variáveis temporais
-        df['ano'] = df['periodo'].dt.year
-        df['mes'] = df['periodo'].dt.month
-        df['trimestre'] = df['periodo'].dt.quarter
-        df['t'] = np.arange(len(df))  # Índice de tempo
-        df['precip_lag1'] = df['precip_mm'].shift(1)
-        
-        return df
+def cor_estacao(nome_estacao):
+    """Cor da estação: CORES quando definida, senão uma cor fixa da PALETA_EXTRA."""
+    if nome_estacao in CORES:
+        return CORES[nome_estacao]
+    indice = sum(nome_estacao.encode("utf-8")) % len(PALETA_EXTRA)
+    return PALETA_EXTRA[indice]
+
+def carregar_dados_estacao(pasta_estacao, painel=None):
+    """
+    Carrega a série mensal de uma estação (da série binária de main.py ou do `painel`).
+    
+    A série está no calendário mensal contínuo: meses incompletos (calendario.py)
+    ficam com precip_mm NaN e saem do ajuste, sem mudar a posição `t` dos demais.
+    A série vai do primeiro ao último mês completo.
+    """
+    if painel is not None:
+        df = painel.serie_mensal(pasta_estacao)
     else:
+        df = ler_serie_mensal(OUTPUT_DIR / pasta_estacao, pasta_estacao)
+        if df is None:
+            return None
+    
+    df = mascarar_incompletos(df.sort_values('periodo'))
+    completos = np.flatnonzero(df['precip_mm'].notna().to_numpy())
+    if len(completos) == 0:
         return None
+    df = df.iloc[completos[0]:completos[-1] + 1].reset_index(drop=True)
+    
+    # Adicionar variáveis temporais
+    df['ano'] = df['periodo'].dt.year
+    df['mes'] = df['periodo'].dt.month
+    df['trimestre'] = df['periodo'].dt.quarter
+    df['t'] = np.arange(len(df))  # Índice de tempo (posição no calendário mensal)
+    df['precip_lag1'] = df['precip_mm'].shift(1)
+    
+    return df
 
 def preparar_dados_glm(df):
     """Prepara dados removendo NaN da defasagem."""
@@ -99,37 +131,91 @@ def preparar_dados_glm(df):
 # MODELOS GLM
 # ===============================
 
-def ajustar_modelo_glm(df, familia='gamma'):
-    """Ajusta modelo GLM com distribuição especificada."""
+class GLMSalvo:
+    """
+    GLM reconstruído a partir de parâmetros salvos, sem novo ajuste.
+    
+    Oferece o que os gráficos usam do resultado do statsmodels: params e predict(exog).
+    """
+    
+    def __init__(self, model, params):
+        self.model = model
+        self.params = params
+    
+    def predict(self, exog):
+        previsto = self.model.predict(self.params.to_numpy(), np.asarray(exog, dtype=float))
+        if isinstance(exog, pd.DataFrame):
+            return pd.Series(previsto, index=exog.index)
+        return previsto
+
+@dataclass
+class PreditorGLM:
+    """
+    Predição de um GLM a partir da família e dos parâmetros ajustados.
+    
+    É o que vai para a fila de renderização no lugar do modelo: serializa com
+    pickle para os workers e entra no hash da tarefa pelo conteúdo.
+    """
+    
+    familia: str
+    params: np.ndarray
+    
+    @classmethod
+    def de_modelo(cls, modelo, familia):
+        return cls(familia, np.asarray(modelo.params, dtype=float))
+    
+    def predict(self, exog):
+        familia_sm = sm.families.Gamma() if self.familia == 'gamma' else sm.families.Gaussian()
+        previsto = familia_sm.fitted(np.asarray(exog, dtype=float) @ self.params)
+        if isinstance(exog, pd.DataFrame):
+            return pd.Series(previsto, index=exog.index)
+        return previsto
+
+def ajustar_modelo_glm(df, familia='gamma', usar_salvos=True, desenho=None):
+    """
+    Ajusta modelo GLM com distribuição especificada.
+    
+    `desenho` (EspecificacaoDesenho) define as variáveis explicativas; o padrão é
+    const, t, mes e precip_lag1. A matriz de desenho é montada uma única vez e o
+    treino/teste são visões dela (DivisaoTreinoTeste).
     
-    # Preparar dados
-    df_prep = preparar_dados_glm(df)
+    Com usar_salvos=True, um modelo já ajustado com os mesmos dados, especificação
+    e versão das bibliotecas é recarregado de output/cache/modelos/ (GLMSalvo).
+    """
+    desenho = desenho or EspecificacaoDesenho()
     
     # Evitar valores zero/negativos para Gamma
-    if familia == 'gamma':
-        df_prep = df_prep[df_prep['precip_mm'] > 0].reset_index(drop=True)
+    matriz = construir_matriz(df, desenho, apenas_positivos=(familia == 'gamma'))
     
-    if len(df_prep) < 20:
+    if len(matriz) < 20:
         return None, None, None
     
     # Dividir em treino e teste (80/20)
-    X = df_prep[['t', 'mes', 'precip_lag1']]
-    y = df_prep['precip_mm']
-    
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42
-    )
+    dados = matriz.dividir(test_size=0.2, random_state=42)
+    X_train_sm, X_test_sm, y_train, y_test = dados
+    
+    especificacao = {
+        'modelo': 'GLM',
+        'familia': familia,
+        'exog': matriz.colunas,
+        'desenho': desenho.como_dict(),
+        'divisao': {'test_size': 0.2, 'random_state': 42},
+    }
+    chave = chave_modelo([matriz.X, matriz.y], especificacao)
+    salvo = ler_modelo(chave) if usar_salvos else None
     
     # Ajustar modelo GLM
     try:
-        # Adicionar constante
-        X_train_sm = sm.add_constant(X_train)
-        X_test_sm = sm.add_constant(X_test)
-        
         if familia == 'gamma':
-            modelo = sm.GLM(y_train, X_train_sm, family=sm.families.Gamma()).fit()
+            modelo_sm = sm.GLM(y_train, X_train_sm, family=sm.families.Gamma())
         else:  # gaussian
-            modelo = sm.GLM(y_train, X_train_sm, family=sm.families.Gaussian()).fit()
+            modelo_sm = sm.GLM(y_train, X_train_sm, family=sm.families.Gaussian())
+        
+        if salvo is not None:
+            # Parâmetros e métricas salvos: nada a ajustar nem a recalcular
+            return GLMSalvo(modelo_sm, salvo['params']), dados, salvo['metricas']
+        
+        modelo = modelo_sm.fit()
         
         # Fazer predições
         y_pred_train = modelo.predict(X_train_sm)
@@ -151,9 +237,9 @@ def ajustar_modelo_glm(df, familia='gamma'):
             'r2_train': r2_train,
             'r2_test': r2_test
         }
+        gravar_modelo(chave, modelo.params, metricas, especificacao)
         
-        # Armazenar X_test_sm para uso posterior
-        return modelo, (X_train_sm, X_test_sm, y_train, y_test), metricas
+        return modelo, dados, metricas
         
     except Exception as e:
         print(f"   ⚠️  Erro ao ajustar modelo: {str(e)}")
@@ -163,8 +249,8 @@ def ajustar_modelo_glm(df, familia='gamma'):
 # VISUALIZAÇÕES
 # ===============================
 
-def plotar_predicao_vs_observado(modelo, dados, nome_estacao, cor, familia):
-    """Plota predição vs observado."""
+def plotar_predicao_vs_observado(modelo, dados, nome_estacao, cor, familia, caminho):
+    """Plota predição vs observado e salva em `caminho`."""
     X_train, X_test, y_train, y_test = dados
     
     y_pred_train = modelo.predict(X_train)
@@ -195,27 +281,36 @@ def plotar_predicao_vs_observado(modelo, dados, nome_estacao, cor, familia):
     ax2.grid(True, alpha=0.3)
     
     plt.tight_layout()
-    return fig
+    salvar_figura(caminho, fig)
 
-def plotar_series_com_predicao(df, modelo, nome_estacao, cor, familia):
-    """Plota série temporal com predição sobreposta."""
-    df_prep = preparar_dados_glm(df)
-    
-    if familia == 'gamma':
-        df_prep = df_prep[df_prep['precip_mm'] > 0].reset_index(drop=True)
+def plotar_series_com_predicao(df, modelo, nome_estacao, cor, familia, caminho, dados=None, intervalo=None):
+    """
+    Plota série temporal com predição sobreposta e salva em `caminho`.
+    
+    Com `dados` de ajustar_modelo_glm, reaproveita a matriz de desenho já montada.
+    Com `intervalo` (de bootstrap_glm), desenha a faixa do intervalo de predição.
+    """
+    if isinstance(dados, DivisaoTreinoTeste):
+        matriz = dados.matriz
+    else:
+        matriz = construir_matriz(df, apenas_positivos=(familia == 'gamma'))
     
-    X = df_prep[['t', 'mes', 'precip_lag1']]
-    X_sm = sm.add_constant(X)
-    y_pred = modelo.predict(X_sm)
+    indice = np.arange(len(matriz))
+    y_pred = modelo.predict(matriz.X)
     
     fig, ax = plt.subplots(figsize=(14, 6))
     
-    ax.plot(df_prep.index, df_prep['precip_mm'], 'o-', label='Observado', 
+    ax.plot(indice, matriz.y, 'o-', label='Observado', 
             color=cor, alpha=0.6, linewidth=1.5, markersize=3)
-    ax.plot(df_prep.index, y_pred, 's-', label='Predito (GLM)', 
+    ax.plot(indice, y_pred, 's-', label='Predito (GLM)', 
             color='red', alpha=0.7, linewidth=2, markersize=2)
     
-    ax.fill_between(df_prep.index, df_prep['precip_mm'], y_pred, alpha=0.2, color='gray')
+    ax.fill_between(indice, matriz.y, y_pred, alpha=0.2, color='gray')
+    
+    if intervalo is not None:
+        nivel = intervalo.attrs.get('nivel', 0.95)
+        ax.fill_between(indice, intervalo['inferior'], intervalo['superior'], alpha=0.15, color='red',
+                        linewidth=0, label=f'IP {nivel:.0%} (bootstrap)')
     
     ax.set_xlabel('Mês')
     ax.set_ylabel('Precipitação (mm)')
@@ -225,10 +320,10 @@ def plotar_series_com_predicao(df, modelo, nome_estacao, cor, familia):
     ax.grid(True, alpha=0.3)
     
     plt.tight_layout()
-    return fig
+    salvar_figura(caminho, fig)
 
-def plotar_residuos(modelo, dados, nome_estacao, cor, familia):
-    """Plota gráficos de diagnóstico dos resíduos."""
+def plotar_residuos(modelo, dados, nome_estacao, cor, familia, caminho):
+    """Plota gráficos de diagnóstico dos resíduos e salva em `caminho`."""
     X_train, X_test, y_train, y_test = dados
     
     y_pred = modelo.predict(X_test)
@@ -265,24 +360,123 @@ def plotar_residuos(modelo, dados, nome_estacao, cor, familia):
     fig.suptitle(f'Diagnóstico de Resíduos - {nome_estacao} (GLM {familia})', 
                  fontweight='bold', fontsize=13, y=1.00)
     plt.tight_layout()
-    return fig
+    salvar_figura(caminho, fig)
 
 # ===============================
-# COMPARAÇÃO ENTRE MODELOS
+# AJUSTE DE TODOS OS MODELOS
 # ===============================
 
-def gerar_relatorio_metricas():
-    """Gera relatório comparativo de métricas."""
-    resultados = []
+FAMILIAS = ['gamma', 'gaussian']
+
+def _ajustar_tarefa(nome_estacao, familia, df, usar_salvos=True, desenho=None):
+    """Ajusta um modelo (estação, família); executado no processo principal ou num worker."""
+    with instrumentacao.medir(f"ajuste_glm:{familia}", nome_estacao):
+        return nome_estacao, familia, ajustar_modelo_glm(df, familia, usar_salvos, desenho)
+
+def ajustar_modelos(estacoes=ESTACOES, painel=None, familias=FAMILIAS, workers=1, usar_salvos=True,
+                    desenho=None):
+    """
+    Ajusta cada modelo (estação, família) uma única vez, em sequência ou num pool de processos.
+    
+    Retorna (series, ajustes):
+    - series: {nome_estacao: DataFrame mensal} das estações encontradas;
+    - ajustes: {(nome_estacao, familia): (modelo, dados, metricas)}, com
+      (None, None, None) quando o ajuste não foi possível.
+    Gráficos e relatório de métricas reutilizam esses resultados. Modelos já
+    salvos em disco são recarregados (usar_salvos=False força novo ajuste).
+    `desenho` (EspecificacaoDesenho) define as variáveis explicativas de todos os modelos.
+    """
+    series = {}
+    for nome_estacao, pasta_estacao in estacoes.items():
+        with instrumentacao.medir("leitura", nome_estacao):
+            df = carregar_dados_estacao(pasta_estacao, painel)
+        if df is not None:
+            series[nome_estacao] = df
+    
+    tarefas = [(nome_estacao, familia, df, usar_salvos, desenho)
+               for nome_estacao, df in series.items() for familia in familias]
+    
+    if workers <= 1 or len(tarefas) <= 1:
+        resultados = [_ajustar_tarefa(*tarefa) for tarefa in tarefas]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tarefas))) as pool:
+            resultados = instrumentacao.mapear(pool, _ajustar_tarefa, *zip(*tarefas))
     
-    for nome_estacao, pasta_estacao in ESTACOES.items():
-        df = carregar_dados_estacao(pasta_estacao)
-        if df is None:
+    ajustes = {(nome_estacao, familia): ajuste for nome_estacao, familia, ajuste in resultados}
+    return series, ajustes
+
+def graficos_estacao(nome_estacao, pasta_estacao, df, ajustes, intervalos=None, fila=None):
+    """
+    Gráficos GLM de uma estação (Gamma e Gaussiana) em GLM_Predicoes/<pasta_estacao>/.
+    
+    `ajustes` vem de ajustar_modelos e `intervalos` (opcional) de
+    bootstrap_glm.intervalos_modelos; com eles, a faixa do intervalo entra no
+    gráfico da série e os intervalos são gravados em CSV.
+    
+    Os gráficos passam pela fila de renderização `fila` (uma fila sequencial
+    quando não informada): os que não mudaram desde a última execução são
+    reaproveitados. Retorna (renderizados, reaproveitados).
+    """
+    intervalos = intervalos or {}
+    fila = FilaRenderizacao() if fila is None else fila
+    cor = cor_estacao(nome_estacao)
+    pasta_estacao_glm = GLM_DIR / pasta_estacao
+    pasta_estacao_glm.mkdir(parents=True, exist_ok=True)
+    
+    for familia, rotulo, descricao in [('gamma', 'Gamma', 'Gamma'), ('gaussian', 'Gaussian', 'Gaussiana')]:
+        print(f"   ► GLM (Distribuição {descricao})...")
+        modelo, dados, metricas = ajustes[(nome_estacao, familia)]
+        
+        if modelo is None:
+            print(f"      ✗ Erro ao ajustar modelo")
             continue
         
-        # Ajustar modelos
-        for familia in ['gamma', 'gaussian']:
-            modelo, dados, metricas = ajustar_modelo_glm(df, familia)
+        print(f"      R² Teste: {metricas['r2_test']:.3f} | RMSE: {metricas['rmse_test']:.2f}")
+        
+        # Gráficos (na fila, com o preditor no lugar do modelo do statsmodels)
+        preditor = PreditorGLM.de_modelo(modelo, familia)
+        caminho = pasta_estacao_glm / f"01_predicao_vs_observado_{familia}.png"
+        fila.adicionar(plotar_predicao_vs_observado, preditor, dados, nome_estacao, cor, rotulo, caminho,
+                       saidas=[caminho], estacao=nome_estacao)
+        
+        caminho = pasta_estacao_glm / f"02_serie_temporal_predicao_{familia}.png"
+        fila.adicionar(plotar_series_com_predicao, df, preditor, nome_estacao, cor, familia, caminho, dados,
+                       intervalos.get((nome_estacao, familia)), saidas=[caminho], estacao=nome_estacao)
+        
+        caminho = pasta_estacao_glm / f"03_diagnostico_residuos_{familia}.png"
+        fila.adicionar(plotar_residuos, preditor, dados, nome_estacao, cor, rotulo, caminho,
+                       saidas=[caminho], estacao=nome_estacao)
+        
+        if (nome_estacao, familia) in intervalos:
+            with instrumentacao.medir("exportacao_csv"):
+                salvar_intervalo(intervalos[(nome_estacao, familia)], df,
+                                 pasta_estacao_glm / f"intervalos_bootstrap_{familia}.csv")
+            print(f"      ✓ Intervalos de predição salvos")
+    
+    renderizados, reaproveitados = fila.executar()
+    print(f"   ✓ {renderizados} gráficos GLM criados | {reaproveitados} sem alteração (reaproveitados)")
+    return renderizados, reaproveitados
+
+# ===============================
+# COMPARAÇÃO ENTRE MODELOS
+# ===============================
+
+def gerar_relatorio_metricas(estacoes=ESTACOES, painel=None, ajustes=None, intervalos=None):
+    """
+    Gera relatório comparativo de métricas.
+    
+    Usa os modelos já ajustados em `ajustes` (de ajustar_modelos); sem eles, ajusta agora.
+    Com `intervalos` (de bootstrap_glm.intervalos_modelos), inclui a cobertura do
+    intervalo de predição nos meses de teste e quantas reamostras a sustentam.
+    """
+    if ajustes is None:
+        _, ajustes = ajustar_modelos(estacoes, painel)
+    
+    resultados = []
+    
+    for nome_estacao in estacoes:
+        for familia in FAMILIAS:
+            modelo, dados, metricas = ajustes.get((nome_estacao, familia), (None, None, None))
             if modelo is None or metricas is None:
                 continue
             
@@ -296,9 +490,14 @@ def gerar_relatorio_metricas():
                 'R² Treino': metricas['r2_train'],
                 'R² Teste': metricas['r2_test']
             })
+            if intervalos and (nome_estacao, familia) in intervalos:
+                intervalo = intervalos[(nome_estacao, familia)]
+                resultados[-1]['Cobertura IP Teste'] = cobertura(intervalo, dados[1].index)
+                resultados[-1]['Reamostras Válidas'] = intervalo.attrs['reamostras_validas']
     
     df_resultados = pd.DataFrame(resultados)
-    df_resultados.to_csv(GLM_DIR / "metricas_glm.csv", index=False)
+    with instrumentacao.medir("exportacao_csv"):
+        df_resultados.to_csv(GLM_DIR / "metricas_glm.csv", index=False)
     return df_resultados
 
 # ===============================
@@ -306,91 +505,107 @@ def gerar_relatorio_metricas():
 # ===============================
 
 if __name__ == "__main__":
-    print("\n" + "="*70)
-    print("🔬 MODELAGEM GLM - PREDIÇÃO DE PRECIPITAÇÃO")
-    print("="*70)
-    
-    print("\n📊 Carregando dados e ajustando modelos...\n")
-    
-    for nome_estacao, pasta_estacao in ESTACOES.items():
-        print(f"📈 {nome_estacao}")
+    parser = argparse.ArgumentParser(description="Modelagem GLM da precipitação mensal")
+    parser.add_argument("--preview", action="store_true",
+                        help="gráficos em baixa resolução, sem bbox justo (execução interativa)")
+    parser.add_argument("--painel", nargs="?", type=Path, const=PAINEL_DIR, default=None,
+                        help="lê as séries do painel (padrão: %(const)s) em vez das séries de main.py, com todas as estações dele")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="processos para ajustar os modelos (estação, família) em paralelo (padrão: 1)")
+    parser.add_argument("--reajustar", action="store_true",
+                        help="ignora os modelos salvos em output/cache/modelos/ e ajusta tudo de novo")
+    parser.add_argument("--sazonalidade", choices=SAZONALIDADES, default="inteiro",
+                        help="codificação do mês: inteiro 1-12, indicadoras ou harmonicos seno/cosseno (padrão: %(default)s)")
+    parser.add_argument("--harmonicos", type=int, default=1,
+                        help="pares seno/cosseno com --sazonalidade harmonicos (padrão: %(default)d)")
+    parser.add_argument("--defasagens", type=int, nargs="+", default=[1],
+                        help="defasagens da precipitação usadas como variáveis (padrão: 1)")
+    parser.add_argument("--tendencia", type=int, default=1,
+                        help="grau da tendência polinomial em t, 0 para nenhuma (padrão: %(default)d)")
+    parser.add_argument("--bootstrap", type=int, nargs="?", const=REAMOSTRAS, default=0,
+                        help=f"intervalos de predição com B reamostras (sem valor: {REAMOSTRAS})")
+    parser.add_argument("--metodo-bootstrap", choices=METODOS, default="blocos",
+                        help="reamostragem de resíduos ou de blocos de meses (padrão: %(default)s)")
+    parser.add_argument("--bloco", type=int, default=TAMANHO_BLOCO,
+                        help="meses por bloco no bootstrap de blocos (padrão: %(default)d)")
+    parser.add_argument("--semente", type=int, default=SEMENTE,
+                        help="semente do bootstrap (padrão: %(default)d)")
+    parser.add_argument("--profile", action="store_true",
+                        help="grava o cProfile do processo principal em output/execucoes/glm_predicao.prof")
+    parser.add_argument("--render-workers", type=int, default=1,
+                        help="processos para renderizar os gráficos (padrão: 1)")
+    parser.add_argument("--force-render", action="store_true",
+                        help="renderiza todos os gráficos, mesmo os que não mudaram")
+    args = parser.parse_args()
+    definir_perfil("preview" if args.preview else "publicacao")
+    
+    with instrumentacao.sessao("glm_predicao", perfil_cprofile=args.profile):
+        print("\n" + "="*70)
+        print("🔬 MODELAGEM GLM - PREDIÇÃO DE PRECIPITAÇÃO")
+        print("="*70)
         
-        # Carregar dados
-        df = carregar_dados_estacao(pasta_estacao)
-        if df is None:
-            print(f"   ✗ Dados não encontrados\n")
-            continue
+        print("\n📊 Carregando dados e ajustando modelos...\n")
         
-        cor = CORES[nome_estacao]
-        pasta_estacao_glm = GLM_DIR / pasta_estacao
-        pasta_estacao_glm.mkdir(parents=True, exist_ok=True)
+        painel = Painel.abrir(args.painel) if args.painel else None
+        estacoes = ESTACOES if painel is None else {e["nome"]: e["pasta"] for e in painel.estacoes}
         
-        # Ajustar modelos (Gamma)
-        print(f"   ► Ajustando GLM (Distribuição Gamma)...")
-        modelo_gamma, dados_gamma, metricas_gamma = ajustar_modelo_glm(df, 'gamma')
+        # Cada modelo (estação, família) é ajustado uma única vez
+        desenho = EspecificacaoDesenho(
+            defasagens=tuple(args.defasagens),
+            sazonalidade=args.sazonalidade,
+            harmonicos=args.harmonicos,
+            tendencia=args.tendencia,
+        )
+        print(f"   Variáveis: {', '.join(desenho.colunas)}")
+        series, ajustes = ajustar_modelos(estacoes, painel, workers=args.workers,
+                                          usar_salvos=not args.reajustar, desenho=desenho)
+        recarregados = sum(isinstance(modelo, GLMSalvo) for modelo, _, _ in ajustes.values())
+        print(f"   ✓ {len(ajustes)} modelos ({recarregados} recarregados de output/cache/modelos/, "
+              f"{max(1, args.workers)} processo(s))\n")
         
-        if modelo_gamma is not None:
-            print(f"      R² Teste: {metricas_gamma['r2_test']:.3f} | RMSE: {metricas_gamma['rmse_test']:.2f}")
-            
-            # Gráficos
-            fig1 = plotar_predicao_vs_observado(modelo_gamma, dados_gamma, nome_estacao, cor, 'Gamma')
-            fig1.savefig(pasta_estacao_glm / "01_predicao_vs_observado_gamma.png", dpi=300, bbox_inches='tight')
-            plt.close(fig1)
-            
-            fig2 = plotar_series_com_predicao(df, modelo_gamma, nome_estacao, cor, 'gamma')
-            fig2.savefig(pasta_estacao_glm / "02_serie_temporal_predicao_gamma.png", dpi=300, bbox_inches='tight')
-            plt.close(fig2)
-            
-            fig3 = plotar_residuos(modelo_gamma, dados_gamma, nome_estacao, cor, 'Gamma')
-            fig3.savefig(pasta_estacao_glm / "03_diagnostico_residuos_gamma.png", dpi=300, bbox_inches='tight')
-            plt.close(fig3)
-            
-            print(f"      ✓ 3 gráficos GLM Gamma salvos")
-        else:
-            print(f"      ✗ Erro ao ajustar modelo")
+        intervalos = {}
+        if args.bootstrap > 0:
+            print(f"🎲 Bootstrap ({args.metodo_bootstrap}, B={args.bootstrap}, semente {args.semente})...")
+            intervalos = intervalos_modelos(ajustes, reamostras=args.bootstrap, metodo=args.metodo_bootstrap,
+                                            tamanho_bloco=args.bloco, semente=args.semente, workers=args.workers)
+            print(f"   ✓ Intervalos de predição de {len(intervalos)} modelos\n")
         
-        # Ajustar modelos (Gaussian)
-        print(f"   ► Ajustando GLM (Distribuição Gaussiana)...")
-        modelo_gaussian, dados_gaussian, metricas_gaussian = ajustar_modelo_glm(df, 'gaussian')
+        fila = FilaRenderizacao(workers=args.render_workers, reaproveitar=not args.force_render)
+        try:
+            for nome_estacao, pasta_estacao in estacoes.items():
+                print(f"📈 {nome_estacao}")
+                
+                # Carregar dados
+                df = series.get(nome_estacao)
+                if df is None:
+                    print(f"   ✗ Dados não encontrados\n")
+                    continue
+                
+                with instrumentacao.medir("estacao", nome_estacao):
+                    graficos_estacao(nome_estacao, pasta_estacao, df, ajustes, intervalos, fila)
+                
+                print()
+        finally:
+            fila.encerrar()
         
-        if modelo_gaussian is not None:
-            print(f"      R² Teste: {metricas_gaussian['r2_test']:.3f} | RMSE: {metricas_gaussian['rmse_test']:.2f}")
-            
-            # Gráficos
-            fig1 = plotar_predicao_vs_observado(modelo_gaussian, dados_gaussian, nome_estacao, cor, 'Gaussian')
-            fig1.savefig(pasta_estacao_glm / "01_predicao_vs_observado_gaussian.png", dpi=300, bbox_inches='tight')
-            plt.close(fig1)
-            
-            fig2 = plotar_series_com_predicao(df, modelo_gaussian, nome_estacao, cor, 'gaussian')
-            fig2.savefig(pasta_estacao_glm / "02_serie_temporal_predicao_gaussian.png", dpi=300, bbox_inches='tight')
-            plt.close(fig2)
-            
-            fig3 = plotar_residuos(modelo_gaussian, dados_gaussian, nome_estacao, cor, 'Gaussian')
-            fig3.savefig(pasta_estacao_glm / "03_diagnostico_residuos_gaussian.png", dpi=300, bbox_inches='tight')
-            plt.close(fig3)
-            
-            print(f"      ✓ 3 gráficos GLM Gaussian salvos")
-        else:
-            print(f"      ✗ Erro ao ajustar modelo")
+        # Gerar relatório de métricas
+        print("📋 Gerando relatório de métricas...")
+        df_metricas = gerar_relatorio_metricas(estacoes, painel, ajustes, intervalos)
+        print("✓ Relatório salvo: metricas_glm.csv\n")
+        print(df_metricas.to_string(index=False))
         
-        print()
-    
-    # Gerar relatório de métricas
-    print("📋 Gerando relatório de métricas...")
-    df_metricas = gerar_relatorio_metricas()
-    print("✓ Relatório salvo: metricas_glm.csv\n")
-    print(df_metricas.to_string(index=False))
-    
-    print("\n" + "="*70)
-    print("✅ MODELAGEM GLM CONCLUÍDA!")
-    print("="*70)
-    print("\n📁 Arquivo: output/graficos/GLM_Predicoes/")
-    print("\n📊 Arquivos gerados por estação:")
-    print("   - 01_predicao_vs_observado_gamma.png")
-    print("   - 02_serie_temporal_predicao_gamma.png")
-    print("   - 03_diagnostico_residuos_gamma.png")
-    print("   - 01_predicao_vs_observado_gaussian.png")
-    print("   - 02_serie_temporal_predicao_gaussian.png")
-    print("   - 03_diagnostico_residuos_gaussian.png")
-    print("\n📋 Relatório: metricas_glm.csv")
-    print("="*70 + "\n")
+        print("\n" + "="*70)
+        print("✅ MODELAGEM GLM CONCLUÍDA!")
+        print("="*70)
+        print("\n📁 Arquivo: output/graficos/GLM_Predicoes/")
+        print("\n📊 Arquivos gerados por estação:")
+        print("   - 01_predicao_vs_observado_gamma.png")
+        print("   - 02_serie_temporal_predicao_gamma.png")
+        print("   - 03_diagnostico_residuos_gamma.png")
+        print("   - 01_predicao_vs_observado_gaussian.png")
+        print("   - 02_serie_temporal_predicao_gaussian.png")
+        print("   - 03_diagnostico_residuos_gaussian.png")
+        if intervalos:
+            print("   - intervalos_bootstrap_gamma.csv / intervalos_bootstrap_gaussian.csv")
+        print("\n📋 Relatório: metricas_glm.csv")
+        print("="*70 + "\n")
@@ -0,0 +1,135 @@
+"""
+Estado do modo incremental (`main.py --incremental`).
+
+Arquivos do HIDROWEB crescem por acréscimo de linhas no final. Para cada
+estação guardamos até onde o arquivo já foi lido (deslocamento em bytes, sempre
+no fim de uma linha completa), a última data lida, um hash dos bytes logo antes
+desse ponto e os acumuladores mescláveis (`agregacao.Acumuladores`).
+
+Na execução seguinte, se o trecho já lido não mudou, só os bytes novos são
+interpretados e somados aos acumuladores; caso contrário o arquivo é relido
+por inteiro.
+"""
+
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from agregacao import Acumuladores
+
+# ===============================
+# CONFIGURAÇÕES
+# ===============================
+ESTADO_DIR = Path("output/cache/incremental")
+
+# Quantidade de bytes antes do deslocamento usada para detectar reescritas do arquivo
+JANELA_VERIFICACAO = 4096
+
+
+@dataclass
+class EstadoIncremental:
+    """Ponto de leitura e somas parciais de uma estação."""
+
+    deslocamento: int
+    hash_janela: str
+    ultima_data: str
+    acumuladores: Acumuladores
+
+
+def _arquivo_estado(caminho_arquivo, pasta_estado):
+    caminho = str(Path(caminho_arquivo).resolve())
+    nome = hashlib.sha256(caminho.encode("utf-8")).hexdigest()[:16]
+    return Path(pasta_estado) / f"{nome}.npz"
+
+def hash_janela(caminho_arquivo, deslocamento):
+    """Hash dos JANELA_VERIFICACAO bytes que terminam em `deslocamento`."""
+    inicio = max(0, deslocamento - JANELA_VERIFICACAO)
+    with open(caminho_arquivo, "rb") as f:
+        f.seek(inicio)
+        return hashlib.sha256(f.read(deslocamento - inicio)).hexdigest()
+
+def fim_ultima_linha(caminho_arquivo, inicio=0, tamanho_bloco=64 * 1024):
+    """
+    Deslocamento logo após o último '\\n' do arquivo (a partir de `inicio`).
+
+    Uma linha ainda sem quebra no final (arquivo sendo escrito) fica para a próxima leitura.
+    """
+    with open(caminho_arquivo, "rb") as f:
+        fim = f.seek(0, os.SEEK_END)
+        while fim > inicio:
+            bloco_inicio = max(inicio, fim - tamanho_bloco)
+            f.seek(bloco_inicio)
+            bloco = f.read(fim - bloco_inicio)
+            pos = bloco.rfind(b"\n")
+            if pos >= 0:
+                return bloco_inicio + pos + 1
+            fim = bloco_inicio
+    return inicio
+
+def ler_estado(caminho_arquivo, pasta_estado=ESTADO_DIR):
+    """Estado salvo da estação, ou None se não houver (ou estiver ilegível)."""
+    try:
+        with np.load(_arquivo_estado(caminho_arquivo, pasta_estado), allow_pickle=False) as npz:
+            meta = json.loads(str(npz["meta"]))
+            mensal = pd.DataFrame(
+                {"n": npz["mensal_n"], "soma": npz["mensal_soma"], "m2": npz["mensal_m2"]},
+                index=pd.Index(npz["mensal_ordinal"], name="ordinal"),
+            )
+            ano_pentada = pd.DataFrame(
+                {"n": npz["pent_n"], "soma": npz["pent_soma"], "m2": npz["pent_m2"]},
+                index=pd.MultiIndex.from_arrays([npz["pent_ano"], npz["pent_pentada"]],
+                                                names=["ano", "pentada"]),
+            )
+    except (OSError, KeyError, ValueError):
+        return None
+
+    return EstadoIncremental(
+        deslocamento=meta["deslocamento"],
+        hash_janela=meta["hash_janela"],
+        ultima_data=meta["ultima_data"],
+        acumuladores=Acumuladores(mensal=mensal, ano_pentada=ano_pentada),
+    )
+
+def gravar_estado(caminho_arquivo, estado, pasta_estado=ESTADO_DIR):
+    """Grava o estado da estação (substituição atômica do arquivo anterior)."""
+    destino = _arquivo_estado(caminho_arquivo, pasta_estado)
+    destino.parent.mkdir(parents=True, exist_ok=True)
+
+    meta = {
+        "arquivo": str(Path(caminho_arquivo).resolve()),
+        "deslocamento": estado.deslocamento,
+        "hash_janela": estado.hash_janela,
+        "ultima_data": estado.ultima_data,
+    }
+    mensal = estado.acumuladores.mensal
+    pent = estado.acumuladores.ano_pentada
+
+    temporario = destino.with_name(f".{destino.name}.{os.getpid()}.tmp")
+    with open(temporario, "wb") as f:
+        np.savez(
+            f,
+            meta=np.array(json.dumps(meta)),
+            mensal_ordinal=mensal.index.to_numpy(dtype=np.int64),
+            mensal_n=mensal["n"].to_numpy(),
+            mensal_soma=mensal["soma"].to_numpy(),
+            mensal_m2=mensal["m2"].to_numpy(),
+            pent_ano=pent.index.get_level_values("ano").to_numpy(dtype=np.int64),
+            pent_pentada=pent.index.get_level_values("pentada").to_numpy(dtype=np.int64),
+            pent_n=pent["n"].to_numpy(),
+            pent_soma=pent["soma"].to_numpy(),
+            pent_m2=pent["m2"].to_numpy(),
+        )
+    os.replace(temporario, destino)
+    return destino
+
+def estado_valido(caminho_arquivo, estado):
+    """O trecho já lido continua igual (o arquivo só recebeu linhas no final)?"""
+    tamanho = Path(caminho_arquivo).stat().st_size
+    if tamanho < estado.deslocamento:
+        return False
+    return hash_janela(caminho_arquivo, estado.deslocamento) == estado.hash_janela
@@ -0,0 +1,208 @@
+"""
+Instrumentação das etapas dos scripts: tempo de relógio, tempo de CPU e pico de memória.
+
+- `medir(etapa, estacao=None)`: gerenciador de contexto que registra uma etapa
+  (leitura, agregação, cada gráfico, exportação CSV, cada ajuste de modelo...).
+  As etapas podem ser aninhadas; a estação de uma etapa vale para as internas.
+- `medido(etapa=None)`: o mesmo como decorador (etapa padrão: nome da função).
+- Pico de memória: no Linux o pico do processo (VmHWM) é zerado no início de
+  cada etapa, então o valor registrado é o pico de RSS durante a etapa; em
+  outros sistemas, o pico do processo até o fim da etapa (ru_maxrss).
+- Processos do pool registram as suas etapas localmente: cada tarefa começa
+  com `reiniciar()` (descarta o que veio do processo principal no fork) e
+  termina com `coletar()`, que devolve as etapas ao processo principal para
+  `incorporar()` (`mapear` faz tudo isso num `pool.map`).
+- `sessao(script, perfil_cprofile)`: envolve a execução de um script, grava o
+  relatório output/execucoes/<script>.json e .csv e, com `--profile`, as
+  estatísticas do cProfile em output/execucoes/<script>.prof.
+"""
+
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# ===============================
+# CONFIGURAÇÕES
+# ===============================
+EXECUCOES_DIR = Path("output/execucoes")
+COLUNAS = ["etapa", "estacao", "pai", "pid", "inicio", "tempo_s", "cpu_s", "pico_rss_mb"]
+LINHAS_CPROFILE = 25   # funções mostradas no resumo do cProfile
+
+_STATUS = Path("/proc/self/status")
+_CLEAR_REFS = Path("/proc/self/clear_refs")
+
+_registros = []
+_abertas = []   # pilha de etapas abertas: [etapa, estacao, pico]
+
+# ===============================
+# MEMÓRIA
+# ===============================
+def _pico_processo():
+    """Pico de RSS do processo em MB (VmHWM no Linux, ru_maxrss nos demais)."""
+    try:
+        with open(_STATUS, encoding="ascii") as status:
+            for linha in status:
+                if linha.startswith("VmHWM:"):
+                    return int(linha.split()[1]) / 1024
+    except OSError:
+        pass
+    if resource is None:
+        return float("nan")
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss é em KB no Linux e em bytes no macOS
+    return pico / 1024**2 if sys.platform == "darwin" else pico / 1024
+
+def _zerar_pico():
+    """Volta o pico de RSS para o RSS atual (Linux); em outros sistemas não faz nada."""
+    try:
+        _CLEAR_REFS.write_text("5")
+    except OSError:
+        pass
+
+# ===============================
+# ETAPAS
+# ===============================
+@contextmanager
+def medir(etapa, estacao=None):
+    """Registra tempo de relógio, tempo de CPU e pico de RSS do bloco `with`."""
+    pai = _abertas[-1] if _abertas else None
+    estacao = estacao if estacao is not None else (pai[1] if pai else None)
+    if pai is not None:
+        # O pico até aqui pertence à etapa externa, antes de ser zerado
+        pai[2] = max(pai[2], _pico_processo())
+    _zerar_pico()
+    aberta = [etapa, estacao, 0.0]
+    _abertas.append(aberta)
+    inicio = datetime.now().isoformat(timespec="milliseconds")
+    relogio, cpu = time.perf_counter(), time.process_time()
+    try:
+        yield
+    finally:
+        tempo, cpu = time.perf_counter() - relogio, time.process_time() - cpu
+        _abertas.pop()
+        pico = max(aberta[2], _pico_processo())
+        if pai is not None:
+            pai[2] = max(pai[2], pico)
+        _registros.append({
+            "etapa": etapa,
+            "estacao": estacao,
+            "pai": pai[0] if pai else None,
+            "pid": os.getpid(),
+            "inicio": inicio,
+            "tempo_s": tempo,
+            "cpu_s": cpu,
+            "pico_rss_mb": pico,
+        })
+
+def medido(etapa=None):
+    """Decorador: cada chamada da função é uma etapa (padrão: o nome da função)."""
+    def decorador(funcao):
+        nome = etapa or funcao.__name__
+        @functools.wraps(funcao)
+        def envolvida(*args, **kwargs):
+            with medir(nome):
+                return funcao(*args, **kwargs)
+        return envolvida
+    return decorador
+
+def reiniciar():
+    """Descarta registros e etapas abertas herdados do processo principal (workers criados por fork)."""
+    _registros.clear()
+    _abertas.clear()
+
+def coletar():
+    """Retira e retorna os registros deste processo (para enviá-los ao processo principal)."""
+    registros = list(_registros)
+    _registros.clear()
+    return registros
+
+def incorporar(registros):
+    """Junta registros vindos de outro processo aos deste."""
+    _registros.extend(registros)
+
+def _coletando(funcao, *args):
+    reiniciar()
+    resultado = funcao(*args)
+    return resultado, coletar()
+
+def mapear(pool, funcao, *iteraveis):
+    """`pool.map(funcao, *iteraveis)` que traz de volta as etapas registradas nos workers."""
+    resultados = []
+    for resultado, registros in pool.map(functools.partial(_coletando, funcao), *iteraveis):
+        incorporar(registros)
+        resultados.append(resultado)
+    return resultados
+
+def tabela():
+    """Registros como DataFrame (uma linha por etapa, na ordem em que terminaram)."""
+    return pd.DataFrame(_registros, columns=COLUNAS)
+
+# ===============================
+# RELATÓRIO DA EXECUÇÃO
+# ===============================
+def resumo(registros):
+    """Totais por etapa: chamadas, tempo, CPU e maior pico de RSS."""
+    return (registros.groupby("etapa", sort=False)
+            .agg(chamadas=("etapa", "size"), tempo_s=("tempo_s", "sum"),
+                 cpu_s=("cpu_s", "sum"), pico_rss_mb=("pico_rss_mb", "max"))
+            .sort_values("tempo_s", ascending=False))
+
+def gravar_relatorio(script, pasta=EXECUCOES_DIR):
+    """Grava <script>.csv (uma linha por etapa) e <script>.json (com o resumo); retorna os caminhos."""
+    pasta = Path(pasta)
+    pasta.mkdir(parents=True, exist_ok=True)
+    registros = tabela()
+    caminho_csv = pasta / f"{script}.csv"
+    caminho_json = pasta / f"{script}.json"
+    registros.to_csv(caminho_csv, index=False)
+
+    relatorio = {
+        "script": script,
+        "argumentos": sys.argv[1:],
+        "gerado_em": datetime.now().isoformat(timespec="seconds"),
+        "resumo": resumo(registros).reset_index().to_dict(orient="records"),
+        "etapas": json.loads(registros.to_json(orient="records")),
+    }
+    caminho_json.write_text(json.dumps(relatorio, indent=1, ensure_ascii=False), encoding="utf-8")
+    return caminho_csv, caminho_json
+
+@contextmanager
+def sessao(script, perfil_cprofile=False, pasta=EXECUCOES_DIR):
+    """
+    Execução instrumentada de um script: etapa "total", relatório ao final e,
+    com perfil_cprofile=True, o cProfile do processo principal.
+    """
+    perfilador = cProfile.Profile() if perfil_cprofile else None
+    if perfilador is not None:
+        perfilador.enable()
+    try:
+        with medir("total"):
+            yield
+    finally:
+        if perfilador is not None:
+            perfilador.disable()
+        caminho_csv, _ = gravar_relatorio(script, pasta)
+        print(f"\n⏱️  Tempo por etapa ({caminho_csv.with_suffix('.json')}):")
+        print(resumo(tabela()).round(2).to_string())
+        if perfilador is not None:
+            caminho_prof = Path(pasta) / f"{script}.prof"
+            perfilador.dump_stats(caminho_prof)
+            saida = io.StringIO()
+            pstats.Stats(perfilador, stream=saida).sort_stats("cumulative").print_stats(LINHAS_CPROFILE)
+            print(f"\n🔬 cProfile ({caminho_prof}, processo principal):")
+            print(saida.getvalue())
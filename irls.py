@@ -0,0 +1,236 @@
+"""
+Ajuste de muitos GLM pequenos de uma vez por IRLS em NumPy puro.
+
+Os GLM mensais têm poucas centenas de linhas e 4 colunas: no statsmodels quase
+todo o tempo de `sm.GLM(...).fit()` é overhead de Python. Aqui B modelos são
+ajustados juntos: em cada iteração do IRLS as B matrizes X'WX são montadas
+com uma única multiplicação de matrizes e resolvidas com um único
+`np.linalg.solve` em lote.
+
+- Famílias: Gamma (ligação inversa, o padrão do statsmodels, ou log) e
+  Gaussiana (identidade), as de glm_predicao.py.
+- X pode ser comum a todos os modelos (n x k) ou próprio de cada um (B x n x k).
+- `pesos` (B x n) são pesos de frequência: 0 exclui a linha (estações de
+  tamanhos diferentes, janelas do backtest, meses sem chuva no Gamma) e a
+  contagem de reamostragem de um bootstrap entra direto como peso, sem copiar X.
+
+O algoritmo é o de statsmodels (`GLM.fit()` com IRLS): mesmo ponto de partida,
+mesma atualização e o mesmo critério de parada pela variação do desvio, então os
+coeficientes coincidem com os do statsmodels dentro da tolerância numérica.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+# ===============================
+# CONFIGURAÇÕES
+# ===============================
+MAX_ITERACOES = 100
+TOLERANCIA = 1e-8
+# Limite inferior de y/mu no log do desvio Gamma (o mesmo do statsmodels)
+FLOAT_EPS = np.finfo(float).eps
+
+# Ligação: (g(mu), g^-1(eta), g'(mu))
+LIGACOES = {
+    "inversa": (lambda mu: 1.0 / mu, lambda eta: 1.0 / eta, lambda mu: -1.0 / mu ** 2),
+    "log": (np.log, np.exp, lambda mu: 1.0 / mu),
+    "identidade": (lambda mu: mu, lambda eta: eta, np.ones_like),
+}
+
+def _desvio_gamma(y, mu, pesos):
+    """
+    Desvio Gamma ponderado de cada modelo: 2 * sum w (y/mu - 1 - log(y/mu)).
+
+    Como no statsmodels, y/mu é limitado a FLOAT_EPS dentro do log: com a ligação
+    inversa uma iteração intermediária pode ter mu <= 0 numa linha usada, e o
+    desvio continua finito para o IRLS seguir até a solução.
+    """
+    razao = y / mu
+    soma = np.einsum("bn,bn->b", pesos, razao) - pesos.sum(axis=1)
+    np.clip(razao, FLOAT_EPS, np.inf, out=razao)
+    np.log(razao, out=razao)
+    return 2.0 * (soma - np.einsum("bn,bn->b", pesos, razao))
+
+def _desvio_gaussiana(y, mu, pesos):
+    """Soma ponderada dos quadrados dos resíduos de cada modelo."""
+    residuo = y - mu
+    return np.einsum("bn,bn,bn->b", pesos, residuo, residuo)
+
+# Família: (variância V(mu), desvio ponderado D(y, mu, pesos), ligação padrão);
+# a variância Gamma mu * mu é |mu|^2, como no statsmodels, também com mu < 0
+FAMILIAS = {
+    "gamma": (lambda mu: mu * mu, _desvio_gamma, "inversa"),
+    "gaussian": (np.ones_like, _desvio_gaussiana, "identidade"),
+}
+
+
+@dataclass
+class ResultadoIRLS:
+    """Resultado de B ajustes (uma linha por modelo)."""
+
+    params: np.ndarray      # (B, k)
+    convergiu: np.ndarray   # (B,) bool
+    iteracoes: np.ndarray   # (B,)
+    desvio: np.ndarray      # (B,)
+    escala: np.ndarray      # (B,) dispersão de Pearson: chi² / (n - k)
+    familia: str
+    ligacao: str
+
+    def prever(self, X):
+        """Média prevista mu = g^-1(X @ params) para X (m x k) ou (B x m x k); retorna (B, m)."""
+        inversa = LIGACOES[self.ligacao][1]
+        eta = _preditor(np.asarray(X, dtype=float), self.params)
+        with np.errstate(divide="ignore", over="ignore", invalid="ignore"):
+            return inversa(eta)
+
+
+def _produtos(X, XX, peso, z):
+    """
+    X'WX (B, k, k) e X'Wz (B, k), com X comum (n, k) ou por modelo (B, n, k).
+
+    Com X comum, XX (n, k*k) são os produtos x_i x_j de cada linha e X'WX de
+    todos os modelos sai de uma única multiplicação de matrizes.
+    """
+    k = X.shape[-1]
+    if X.ndim == 2:
+        return (peso @ XX).reshape(-1, k, k), (peso * z) @ X
+    Xp = X * peso[:, :, None]
+    return np.matmul(Xp.transpose(0, 2, 1), X), np.einsum("bni,bn->bi", Xp, z)
+
+def _preditor(X, params):
+    """eta = X @ params de cada modelo: (B, n)."""
+    return params @ X.T if X.ndim == 2 else np.einsum("bnk,bk->bn", X, params)
+
+def _media_valida(mu, y, fora):
+    """
+    mu = y nas linhas fora do ajuste (`fora`, ou None se não houver): contribuições
+    nulas e nenhum NaN, como o log de mu < 0 da ligação inversa.
+    """
+    if fora is not None:
+        np.copyto(mu, y, where=fora)
+    return mu
+
+def _escala(y, mu, pesos, gl, variancia):
+    """Dispersão de Pearson de cada modelo: sum w (y - mu)^2 / V(mu) / (n - k)."""
+    residuo = y - mu
+    residuo *= residuo
+    residuo /= variancia(mu)
+    return np.einsum("bn,bn->b", pesos, residuo) / gl
+
+def _resolver(A, b):
+    """Resolve os B sistemas A x = b com equilíbrio das colunas; sistemas singulares dão NaN."""
+    diagonal = np.sqrt(np.abs(np.diagonal(A, axis1=1, axis2=2)))
+    escala = np.where(diagonal > 0, 1.0 / np.where(diagonal > 0, diagonal, 1.0), 1.0)
+    A = A * escala[:, :, None] * escala[:, None, :]
+    b = b * escala
+    x = np.full(b.shape, np.nan)
+    regulares = np.isfinite(A).all(axis=(1, 2)) & np.isfinite(b).all(axis=1)
+    try:
+        x[regulares] = np.linalg.solve(A[regulares], b[regulares][..., None])[..., 0]
+    except np.linalg.LinAlgError:
+        # Algum sistema singular no lote: pseudo-inversa sistema a sistema
+        for i in np.flatnonzero(regulares):
+            x[i] = np.linalg.pinv(A[i]) @ b[i]
+    return x * escala
+
+def ajustar_irls(X, y, pesos=None, familia="gamma", ligacao=None, inicio=None,
+                 max_iteracoes=MAX_ITERACOES, tolerancia=TOLERANCIA):
+    """
+    Ajusta B GLM por IRLS em lote.
+
+    X: (n, k) comum ou (B, n, k); y: (n,) ou (B, n); pesos: None, (n,) ou (B, n).
+    B vem do maior entre y, pesos e X. `inicio` (B, k) são parâmetros iniciais
+    (por exemplo, de um ajuste anterior); sem ele, parte de mu = (y + média)/2
+    como o statsmodels. Cada modelo para quando a variação do desvio (dividido pela
+    escala da iteração anterior, como no statsmodels) fica <= tolerancia.
+    """
+    if familia not in FAMILIAS:
+        raise ValueError(f"Família inválida: {familia!r} (use {', '.join(FAMILIAS)})")
+    variancia, desvio_ponderado, ligacao_padrao = FAMILIAS[familia]
+    ligacao = ligacao or ligacao_padrao
+    if ligacao not in LIGACOES:
+        raise ValueError(f"Ligação inválida: {ligacao!r} (use {', '.join(LIGACOES)})")
+    g, g_inversa, g_derivada = LIGACOES[ligacao]
+
+    X = np.asarray(X, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n, k = X.shape[-2:]
+    XX = (X[:, :, None] * X[:, None, :]).reshape(n, k * k) if X.ndim == 2 else None
+    pesos = np.ones(n) if pesos is None else np.asarray(pesos, dtype=float)
+    B = max(y.shape[0] if y.ndim == 2 else 1,
+            X.shape[0] if X.ndim == 3 else 1,
+            pesos.shape[0] if pesos.ndim == 2 else 1)
+    y = np.broadcast_to(y, (B, n))
+    pesos = np.broadcast_to(pesos, (B, n))
+    usado = pesos > 0
+    # Linhas fora do ajuste recebem um y válido qualquer (peso zero) para não gerar NaN;
+    # com ligação log ou identidade, mu é sempre válido e elas nem precisam ser corrigidas
+    fora = ~usado if not usado.all() else None
+    if fora is not None:
+        y = np.where(usado, y, 1.0)
+    corrigir = fora if ligacao == "inversa" else None
+
+    with np.errstate(divide="ignore", over="ignore", invalid="ignore"):
+        if inicio is None:
+            media = np.sum(np.where(usado, y, 0.0), axis=1) / usado.sum(axis=1)
+            mu = (y + media[:, None]) / 2.0
+            eta = g(mu)
+            params = np.zeros((B, k))
+        else:
+            params = np.array(np.broadcast_to(inicio, (B, k)), dtype=float)
+            eta = _preditor(X, params)
+            mu = _media_valida(g_inversa(eta), y, corrigir)
+        gl = pesos.sum(axis=1) - k
+        desvio = desvio_ponderado(y, mu, pesos)
+        escala = _escala(y, mu, pesos, gl, variancia)
+        # Critério de parada do statsmodels: desvio dividido pela escala da iteração anterior
+        criterio = desvio / escala
+
+        convergiu = np.zeros(B, dtype=bool)
+        iteracoes = np.zeros(B, dtype=int)
+        # Conjunto ativo: os modelos que já pararam saem dos arrays de trabalho
+        ativos = np.arange(B)
+        X_ativo, y_ativo, pesos_ativo, gl_ativo, corrigir_ativo = X, y, pesos, gl, corrigir
+        escala_ativo, criterio_ativo = escala.copy(), criterio
+        for _ in range(max_iteracoes):
+            # Peso w = pesos / (g'(mu)^2 V(mu)) e resposta z = eta + g'(mu) (y - mu), sem temporários extras
+            derivada = g_derivada(mu)
+            peso_irls = variancia(mu)
+            peso_irls *= derivada
+            peso_irls *= derivada
+            np.divide(pesos_ativo, peso_irls, out=peso_irls)
+            z = y_ativo - mu
+            z *= derivada
+            z += eta
+            A, b = _produtos(X_ativo, XX, peso_irls, z)
+
+            novos = _resolver(A, b)
+            eta = _preditor(X_ativo, novos)
+            mu = _media_valida(g_inversa(eta), y_ativo, corrigir_ativo)
+            desvio_novo = desvio_ponderado(y_ativo, mu, pesos_ativo)
+            criterio_novo = desvio_novo / escala_ativo
+            escala_ativo = _escala(y_ativo, mu, pesos_ativo, gl_ativo, variancia)
+
+            params[ativos] = novos
+            desvio[ativos] = desvio_novo
+            escala[ativos] = escala_ativo
+            iteracoes[ativos] += 1
+            parou = np.abs(criterio_novo - criterio_ativo) <= tolerancia
+            convergiu[ativos[parou]] = True
+            # Critério não finito só sobra com parâmetros NaN (sistema singular): esse modelo para
+            continua = ~parou & np.isfinite(criterio_novo)
+            if not continua.any():
+                break
+            if not continua.all():
+                ativos = ativos[continua]
+                eta, mu = eta[continua], mu[continua]
+                y_ativo, pesos_ativo, gl_ativo = y_ativo[continua], pesos_ativo[continua], gl_ativo[continua]
+                escala_ativo, criterio_novo = escala_ativo[continua], criterio_novo[continua]
+                if corrigir is not None:
+                    corrigir_ativo = corrigir_ativo[continua]
+                if X.ndim == 3:
+                    X_ativo = X_ativo[continua]
+            criterio_ativo = criterio_novo
+
+    return ResultadoIRLS(params, convergiu, iteracoes, desvio, escala, familia, ligacao)
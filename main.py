@@ -3,8 +3,22 @@ import numpy as np
 import matplotlib.pyplot as plt
 from scipy.stats import linregress
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import csv
+import io
+import itertools
+import re
 import warnings
 
+import cache_estacoes
+import incremental
+import instrumentacao
+import serie_mensal
+from agregacao import Acumuladores, calcular_agregados, como_agregados
+from renderizacao import FilaRenderizacao, definir_perfil, salvar_figura
+from serie_diaria import SerieDiaria
+
 warnings.filterwarnings('ignore')
 
 # ===============================
@@ -46,54 +60,220 @@ plt.rcParams.update({
 # ===============================
 # FUNÇÃO DE LEITURA DOS TXT
 # ===============================
-def carregar_dados(caminho_arquivo):
+def _posicionar_apos_cabecalho(arquivo, caminho_arquivo):
     """
-    Lê arquivo de estação pluviométrica em formato .txt (padrão HIDROWEB).
-    Identifica início da tabela pela linha "Data", extrai data e precipitação.
-    Trata encoding latin1 e valores decimais em formato brasileiro (vírgula).
+    Avança o arquivo aberto até logo depois da linha "Data" (cabeçalho da tabela).
+    Lê apenas o preâmbulo, linha a linha, sem carregar o restante do arquivo.
     """
-    linhas = open(caminho_arquivo, encoding="latin1").readlines()
-
-    # Encontrar onde começa a tabela (linha com "Data" no início)
-    inicio = None
-    for i, linha in enumerate(linhas):
+    for linha in iter(arquivo.readline, ""):
         if linha.strip().startswith("Data"):
-            inicio = i + 1
-            break
+            return
+    raise ValueError(f"Não foi encontrada linha 'Data' em {caminho_arquivo}")
+
+# Opções do parser C do pandas para o corpo da tabela (data e precipitação)
+_OPCOES_TABELA = dict(
+    sep=r"\s+",
+    header=None,
+    names=["data", "precip"],
+    usecols=[0, 1],
+    index_col=False,
+    dtype={"data": object},
+    decimal=",",
+    float_precision="round_trip",
+    keep_default_na=False,
+    na_values={"precip": [""]},
+    quoting=csv.QUOTE_NONE,
+    engine="c",
+)
+
+# Linhas por bloco na leitura em blocos (a memória de pico acompanha este valor)
+LINHAS_POR_BLOCO = 250_000
+
+# Caracteres que o laço original (str.split) trata como separador e o parser C não
+# (ele só separa em espaço e tabulação); o arquivo é lido em latin1
+_ESPACOS_SO_NO_LACO = re.compile("[\x0b\x0c\x1c-\x1f\x85\xa0]")
+
+def _filtrar_tabela(tabela):
+    """
+    Mantém as linhas que o laço original aceitava e converte a precipitação para float.
     
-    if inicio is None:
-        raise ValueError(f"Não foi encontrada linha 'Data' em {caminho_arquivo}")
-
-    # Processar linhas de dados
-    dados = []
-    for linha in linhas[inicio:]:
-        linha_limpa = linha.strip()
-        
-        # Pular linhas vazias
-        if not linha_limpa:
+    Descarta:
+    - linhas vazias ou com menos de 2 campos;
+    - precipitação que não pode ser convertida para float.
+    
+    As linhas que o parser C não converteu (valores como "nan", "1_0", "1e3"
+    que o float() aceita) e as que têm separadores que ele não reconhece (NBSP,
+    form feed...) passam pelo laço original (_converter_linha), para que o
+    resultado seja o mesmo de engine="python".
+    """
+    bruto = tabela["precip"]
+    
+    if pd.api.types.is_numeric_dtype(bruto):
+        # Caminho rápido: toda a coluna foi convertida pelo parser C,
+        # NaN aqui só pode ser campo ausente (linha com menos de 2 campos)
+        prec = bruto
+    else:
+        # Há valores não numéricos: converter em bloco, aceitando também "." como decimal
+        # (campos ausentes chegam como NaN e continuam inválidos)
+        prec_str = np.array(
+            [v.replace(",", ".") if isinstance(v, str) else "" for v in bruto], dtype=object
+        )
+        prec = pd.Series(pd.to_numeric(prec_str, errors="coerce"), index=tabela.index)
+    valido = prec.notna().to_numpy().copy()
+    
+    revisar = ~valido
+    if _ESPACOS_SO_NO_LACO.search("".join(tabela["data"])):
+        revisar |= tabela["data"].str.contains(_ESPACOS_SO_NO_LACO).to_numpy()
+    if not revisar.any():
+        return pd.DataFrame({
+            "data": tabela["data"][valido].to_numpy(),
+            "precip": prec[valido].to_numpy(dtype=float),
+        })
+    
+    # Remontar a linha (os dois primeiros campos contêm os dois primeiros campos
+    # do laço original) e convertê-la como o laço
+    datas = tabela["data"].to_numpy(dtype=object).copy()
+    valores = prec.to_numpy(dtype=float).copy()
+    for i in np.flatnonzero(revisar):
+        campo = bruto.iat[i]
+        if not isinstance(campo, str):
+            campo = "" if pd.isna(campo) else repr(float(campo))
+        convertida = _converter_linha(f"{datas[i]} {campo}")
+        valido[i] = convertida is not None
+        if convertida is not None:
+            datas[i], valores[i] = convertida
+    
+    return pd.DataFrame({"data": datas[valido], "precip": valores[valido]})
+
+def _ler_tabela_vetorizada(arquivo):
+    """Lê o corpo da tabela com uma única chamada ao parser C do pandas."""
+    inicio = arquivo.tell()
+    try:
+        tabela = pd.read_csv(arquivo, **_OPCOES_TABELA)
+    except pd.errors.EmptyDataError:
+        return pd.DataFrame({"data": [], "precip": []})
+    except pd.errors.ParserError:
+        # Nenhuma linha com dois campos para o parser C (ex.: tudo separado por NBSP):
+        # o laço original decide linha a linha
+        arquivo.seek(inicio)
+        return _ler_tabela_linha_a_linha(arquivo)
+    
+    return _filtrar_tabela(tabela)
+
+def _ler_tabela_em_blocos(arquivo, linhas_por_bloco=LINHAS_POR_BLOCO):
+    """
+    Gerador com o corpo da tabela em blocos de até `linhas_por_bloco` linhas.
+    
+    Cada bloco passa pelo mesmo filtro de _ler_tabela_vetorizada; nenhum bloco
+    anterior é mantido em memória.
+    """
+    while True:
+        texto = "".join(itertools.islice(arquivo, linhas_por_bloco))
+        if not texto:
+            return
+        try:
+            tabela = pd.read_csv(io.StringIO(texto), **_OPCOES_TABELA)
+        except pd.errors.EmptyDataError:
             continue
-        
-        # Separar por espaços múltiplos
-        partes = linha_limpa.split()
-        
-        # Precisa de pelo menos data (partes[0]) e precipitação (partes[1])
-        if len(partes) < 2:
+        except pd.errors.ParserError:
+            # Bloco sem nenhuma linha com dois campos para o parser C
+            yield _ler_tabela_linha_a_linha(texto.splitlines())
             continue
+        yield _filtrar_tabela(tabela)
+
+def _converter_linha(linha):
+    """(data, precipitação) de uma linha da tabela, como o laço original; None se a linha é descartada."""
+    linha_limpa = linha.strip()
+    
+    # Pular linhas vazias
+    if not linha_limpa:
+        return None
+    
+    # Separar por espaços múltiplos
+    partes = linha_limpa.split()
+    
+    # Precisa de pelo menos data (partes[0]) e precipitação (partes[1])
+    if len(partes) < 2:
+        return None
+    
+    try:
+        prec_str = partes[1].replace(",", ".")
+        return partes[0], float(prec_str)
+    except ValueError:
+        # Pular linhas com formato inválido
+        return None
+
+def _ler_tabela_linha_a_linha(arquivo):
+    """Leitura de referência (laço em Python puro), mantida para conferência do parser C."""
+    dados = []
+    for linha in arquivo:
+        convertida = _converter_linha(linha)
+        if convertida is not None:
+            dados.append(convertida)
+    
+    return pd.DataFrame(dados, columns=["data", "precip"])
+
+def _converter_datas(datas):
+    """
+    Converte datas "dd/mm/aaaa" para datetime64 operando direto sobre os bytes.
+    
+    Qualquer valor fora desse formato exato (ou data inexistente) cai no
+    pd.to_datetime com formato explícito, que produz a mesma mensagem de erro de antes.
+    """
+    try:
+        brutos = np.asarray(datas, dtype="S11")
+    except UnicodeEncodeError:
+        return pd.to_datetime(datas, format="%d/%m/%Y")
+    
+    bytes_ = brutos.view(np.uint8).reshape(len(brutos), 11)
+    digitos = bytes_[:, [0, 1, 3, 4, 6, 7, 8, 9]] - ord("0")
+    formato_ok = (
+        (bytes_[:, 2] == ord("/")) & (bytes_[:, 5] == ord("/"))
+        & (bytes_[:, 10] == 0) & (digitos <= 9).all(axis=1)
+    )
+    
+    if formato_ok.all():
+        d = digitos.astype(np.int64)
+        dia = d[:, 0] * 10 + d[:, 1]
+        mes = d[:, 2] * 10 + d[:, 3]
+        ano = d[:, 4] * 1000 + d[:, 5] * 100 + d[:, 6] * 10 + d[:, 7]
         
-        try:
-            data = partes[0]
-            prec_str = partes[1].replace(",", ".")
-            prec = float(prec_str)
-            dados.append([data, prec])
-        except (ValueError, IndexError):
-            # Pular linhas com formato inválido
-            continue
+        meses = ((ano - 1970) * 12 + mes - 1).astype("datetime64[M]")
+        dias = meses.astype("datetime64[D]") + (dia - 1)
+        # Rejeitar mês fora de 1-12 e dias inexistentes (ex.: 31/04, 29/02 fora de ano bissexto)
+        if ((mes >= 1) & (mes <= 12) & (dia >= 1) & (dias.astype("datetime64[M]") == meses)).all():
+            return pd.Series(dias.astype("datetime64[ns]"))
+    
+    return pd.to_datetime(datas, format="%d/%m/%Y")
 
-    if not dados:
+def carregar_dados(caminho_arquivo, engine="c"):
+    """
+    Lê arquivo de estação pluviométrica em formato .txt (padrão HIDROWEB).
+    Identifica início da tabela pela linha "Data", extrai data e precipitação.
+    Trata encoding latin1 e valores decimais em formato brasileiro (vírgula).
+    
+    engine="c" (padrão) lê a tabela numa única passada vetorizada;
+    engine="python" usa o laço linha a linha original (referência). Os dois
+    aceitam as mesmas linhas e produzem os mesmos valores: as linhas que o
+    parser C não converte ou não separa ("nan", "1_0", NBSP entre os campos...)
+    são refeitas pelo laço (_filtrar_tabela).
+    """
+    leitores = {"c": _ler_tabela_vetorizada, "python": _ler_tabela_linha_a_linha}
+    if engine not in leitores:
+        raise ValueError(f"engine inválido: {engine!r} (use 'c' ou 'python')")
+    
+    with open(caminho_arquivo, encoding="latin1") as arquivo:
+        _posicionar_apos_cabecalho(arquivo, caminho_arquivo)
+        df = leitores[engine](arquivo)
+
+    if df.empty:
         raise ValueError(f"Nenhum dado foi extraído de {caminho_arquivo}")
 
-    df = pd.DataFrame(dados, columns=["data", "precip"])
-    df["data"] = pd.to_datetime(df["data"], format="%d/%m/%Y")
+    return _adicionar_colunas_temporais(df)
+
+def _adicionar_colunas_temporais(df):
+    """Converte as datas, ordena e acrescenta ano, mês, dia, período mensal e pentada."""
+    df["data"] = _converter_datas(df["data"])
     df = df.sort_values("data").reset_index(drop=True)
     
     # Colunas temporais
@@ -108,11 +288,156 @@ def carregar_dados(caminho_arquivo):
 
     return df
 
+def carregar_dados_em_cache(caminho_arquivo, pasta_cache=cache_estacoes.CACHE_DIR,
+                            tamanho_maximo=cache_estacoes.TAMANHO_MAXIMO_CACHE):
+    """
+    Igual a carregar_dados, mas reaproveita o DataFrame já lido em output/cache/.
+    
+    O arquivo só é lido de novo quando muda (tamanho, data de modificação ou conteúdo).
+    """
+    chave = cache_estacoes.chave_arquivo(caminho_arquivo)
+    df = cache_estacoes.ler_cache(chave, pasta_cache)
+    
+    if df is None:
+        df = carregar_dados(caminho_arquivo)
+        cache_estacoes.gravar_cache(chave, df, pasta_cache, tamanho_maximo)
+    
+    return df
+
+class _TrechoArquivo(io.RawIOBase):
+    """Leitura binária restrita aos bytes [inicio, fim) de um arquivo."""
+
+    def __init__(self, caminho_arquivo, inicio, fim):
+        self._arquivo = open(caminho_arquivo, "rb")
+        self._arquivo.seek(inicio)
+        self._restante = fim - inicio
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        n = min(len(buffer), self._restante)
+        if n <= 0:
+            return 0
+        lidos = self._arquivo.readinto(memoryview(buffer)[:n])
+        self._restante -= lidos
+        return lidos
+
+    def close(self):
+        self._arquivo.close()
+        super().close()
+
+def _abrir_trecho(caminho_arquivo, inicio, fim):
+    """Abre os bytes [inicio, fim) do arquivo como texto latin1 (sem carregá-los de uma vez)."""
+    return io.TextIOWrapper(io.BufferedReader(_TrechoArquivo(caminho_arquivo, inicio, fim)),
+                            encoding="latin1")
+
+def acumular_em_blocos(arquivo, linhas_por_bloco=LINHAS_POR_BLOCO):
+    """
+    Lê a tabela do arquivo aberto (já posicionado após o cabeçalho) em blocos,
+    somando cada bloco aos acumuladores mensais e de ano x pentada.
+    
+    A memória de pico depende de `linhas_por_bloco`, não do tamanho do arquivo.
+    Retorna (acumuladores ou None se não houver dados, linhas lidas, última data "aaaa-mm-dd").
+    """
+    acumuladores = None
+    linhas = 0
+    ultima_data = None
+    
+    for bloco in _ler_tabela_em_blocos(arquivo, linhas_por_bloco):
+        if bloco.empty:
+            continue
+        bloco = _adicionar_colunas_temporais(bloco)
+        parcial = Acumuladores.de_dataframe(bloco)
+        acumuladores = parcial if acumuladores is None else acumuladores.mesclar(parcial)
+        linhas += len(bloco)
+        data_bloco = str(bloco["data"].iloc[-1].date())
+        ultima_data = data_bloco if ultima_data is None else max(ultima_data, data_bloco)
+    
+    return acumuladores, linhas, ultima_data
+
+def carregar_acumuladores(caminho_arquivo, linhas_por_bloco=LINHAS_POR_BLOCO):
+    """
+    Acumuladores da estação lidos em blocos (para arquivos muito longos, ex.: telemetria sub-diária).
+    
+    Equivale a Acumuladores.de_dataframe(carregar_dados(caminho_arquivo)) sem
+    montar o DataFrame diário completo.
+    """
+    with open(caminho_arquivo, encoding="latin1") as arquivo:
+        _posicionar_apos_cabecalho(arquivo, caminho_arquivo)
+        acumuladores, _, _ = acumular_em_blocos(arquivo, linhas_por_bloco)
+    
+    if acumuladores is None:
+        raise ValueError(f"Nenhum dado foi extraído de {caminho_arquivo}")
+    return acumuladores
+
+def carregar_serie_diaria(caminho_arquivo, linhas_por_bloco=LINHAS_POR_BLOCO):
+    """
+    Série diária compacta da estação (SerieDiaria: float32 sobre o calendário contínuo).
+    
+    A tabela é lida em blocos e só as datas e os valores de cada bloco são
+    guardados até a montagem da série.
+    """
+    datas, valores = [], []
+    with open(caminho_arquivo, encoding="latin1") as arquivo:
+        _posicionar_apos_cabecalho(arquivo, caminho_arquivo)
+        for bloco in _ler_tabela_em_blocos(arquivo, linhas_por_bloco):
+            if bloco.empty:
+                continue
+            datas.append(_converter_datas(bloco["data"]).to_numpy().astype("datetime64[D]"))
+            valores.append(bloco["precip"].to_numpy(dtype=np.float32))
+    
+    if not datas:
+        raise ValueError(f"Nenhum dado foi extraído de {caminho_arquivo}")
+    return SerieDiaria.de_datas(np.concatenate(datas), np.concatenate(valores))
+
+def carregar_acumuladores_incremental(caminho_arquivo, pasta_estado=incremental.ESTADO_DIR,
+                                      linhas_por_bloco=LINHAS_POR_BLOCO):
+    """
+    Acumuladores da estação lendo apenas as linhas acrescentadas desde a última execução.
+    
+    Se não há estado salvo, ou se o trecho já lido foi alterado (arquivo
+    reescrito ou truncado), o arquivo é lido por inteiro. A última linha só entra
+    quando termina com quebra de linha. A leitura é feita em blocos.
+    
+    Retorna (acumuladores, linhas_novas, releitura_completa).
+    """
+    estado = incremental.ler_estado(caminho_arquivo, pasta_estado)
+    releitura = estado is None or not incremental.estado_valido(caminho_arquivo, estado)
+    inicio = 0 if releitura else estado.deslocamento
+    fim = incremental.fim_ultima_linha(caminho_arquivo, inicio)
+    
+    with _abrir_trecho(caminho_arquivo, inicio, fim) as trecho:
+        if releitura:
+            _posicionar_apos_cabecalho(trecho, caminho_arquivo)
+        novos, linhas, ultima_data = acumular_em_blocos(trecho, linhas_por_bloco)
+    
+    if releitura and novos is None:
+        raise ValueError(f"Nenhum dado foi extraído de {caminho_arquivo}")
+    
+    if releitura:
+        acumuladores = novos
+    elif novos is None:
+        acumuladores, ultima_data = estado.acumuladores, estado.ultima_data
+    else:
+        acumuladores = estado.acumuladores.mesclar(novos)
+        ultima_data = max(ultima_data, estado.ultima_data)
+    
+    if releitura or fim != inicio:
+        incremental.gravar_estado(caminho_arquivo, incremental.EstadoIncremental(
+            deslocamento=fim,
+            hash_janela=incremental.hash_janela(caminho_arquivo, fim),
+            ultima_data=ultima_data,
+            acumuladores=acumuladores,
+        ), pasta_estado)
+    
+    return acumuladores, linhas, releitura
+
 # ===============================
 # GRÁFICOS
 # ===============================
 
-def serie_temporal_mensal(df, nome, pasta):
+def serie_temporal_mensal(agregados, nome, pasta):
     """
     Série temporal mensal com tendência linear e média histórica.
     
@@ -121,18 +446,11 @@ def serie_temporal_mensal(df, nome, pasta):
     
     Retorna também o dataframe mensal indexado por período.
     """
-    # Agregar por período mensal
-    mensal_agg = df.groupby("ano_mes")["precip"].agg(
-        ["sum", "count", "mean", "std"]
-    ).reset_index()
-    
-    mensal_agg.columns = ["ano_mes", "precip_total", "n_dias", "media_diaria", "std_diaria"]
-    
-    # Converter para série temporal com índice de data
-    mensal_agg["data"] = pd.to_datetime(mensal_agg["ano_mes"].astype(str) + "-01")
-    mensal = mensal_agg.sort_values("data").reset_index(drop=True)
+    mensal = como_agregados(agregados).mensal
     
-    x = np.arange(len(mensal))
+    # Posição do mês no calendário contínuo (meses ausentes não encurtam o eixo)
+    ordinais = mensal["ano_mes"].array.asi8
+    x = ordinais - ordinais[0]
     y = mensal["precip_total"].values
     
     # Calcular tendência linear
@@ -162,12 +480,11 @@ def serie_temporal_mensal(df, nome, pasta):
     plt.xticks(rotation=45)
     
     plt.tight_layout()
-    plt.savefig(pasta / "01_serie_temporal_mensal.png", dpi=300, bbox_inches='tight')
-    plt.close()
+    salvar_figura(pasta / "01_serie_temporal_mensal.png")
     
     return mensal
 
-def serie_pentadal(df, nome, pasta):
+def serie_pentadal(agregados, nome, pasta):
     """
     Análise pentadal: acúmulo de precipitação em períodos de 5 dias.
     
@@ -182,16 +499,8 @@ def serie_pentadal(df, nome, pasta):
     - P5: dias 21-25
     - P6: dias 26-30 (note: pode incluir dia 31 em alguns meses)
     """
-    # Agregar por pentada (média dos 31 anos)
-    # Limitar a pentadas 1-6
-    df_pentadas = df[df["pentada"] <= 6].copy()
-    
-    pentadal_agg = df_pentadas.groupby("pentada")["precip"].agg(
-        ["sum", "mean", "std", "count"]
-    ).reset_index()
-    
-    pentadal_agg.columns = ["pentada", "precip_total", "media_diaria", "std_diaria", "n_dias"]
-    pentadal_media = pentadal_agg.copy()
+    # Agregado por pentada (pentadas 1-6, todos os anos)
+    pentadal_media = como_agregados(agregados).pentadal
     
     # Nomes descritivos das pentadas
     pentadas_nomes = [
@@ -234,17 +543,16 @@ def serie_pentadal(df, nome, pasta):
     ax2.grid(True, alpha=0.3, axis='y')
     
     plt.tight_layout()
-    plt.savefig(pasta / "02_analise_pentadal.png", dpi=300, bbox_inches='tight')
-    plt.close()
+    salvar_figura(pasta / "02_analise_pentadal.png")
 
-def serie_pentadal_temporal(df, nome, pasta):
+def serie_pentadal_temporal(agregados, nome, pasta):
     """
     Série temporal pentadal: precip acumulada em períodos de 5 dias ao longo do tempo.
     
     Mostra como a distribuição pentadal varia ao longo dos anos.
     """
-    # Agregar por ano e pentada
-    pentadal_anual = df.groupby(["ano", "pentada"])["precip"].sum().reset_index()
+    # Agregado por ano e pentada
+    pentadal_anual = como_agregados(agregados).pentadal_anual
     
     fig, ax = plt.subplots(figsize=(13, 6))
     
@@ -266,15 +574,14 @@ def serie_pentadal_temporal(df, nome, pasta):
     ax.grid(True, alpha=0.3)
     
     plt.tight_layout()
-    plt.savefig(pasta / "02b_serie_pentadal_temporal.png", dpi=300, bbox_inches='tight')
-    plt.close()
+    salvar_figura(pasta / "02b_serie_pentadal_temporal.png")
 
-def grafico_anual(df, nome, pasta):
+def grafico_anual(agregados, nome, pasta):
     """Série temporal de precipitação anual com tendência linear e média histórica.
     
     NOTA: Mantido como análise complementar. A série PRINCIPAL é a mensal.
     """
-    anual = df.groupby("ano")["precip"].sum()
+    anual = como_agregados(agregados).anual
 
     x = anual.index.values.astype(float)
     y = anual.values
@@ -295,15 +602,14 @@ def grafico_anual(df, nome, pasta):
     ax.grid(True, alpha=0.3)
     
     plt.tight_layout()
-    plt.savefig(pasta / "03_precipitacao_anual_complementar.png", dpi=300, bbox_inches='tight')
-    plt.close()
+    salvar_figura(pasta / "03_precipitacao_anual_complementar.png")
 
-def grafico_mensal(df, nome, pasta):
+def grafico_mensal(agregados, nome, pasta):
     """Precipitação média mensal com barra de desvio padrão.
     
     Análise climatológica (média de todos os anos) por mês do ano.
     """
-    mensal = df.groupby("mes")["precip"].agg(["mean", "std"])
+    mensal = como_agregados(agregados).climatologia
 
     fig, ax = plt.subplots(figsize=(11, 6))
     cores = plt.cm.RdYlBu_r(np.linspace(0.2, 0.8, 12))
@@ -321,21 +627,22 @@ def grafico_mensal(df, nome, pasta):
     ax.grid(True, alpha=0.3, axis='y')
     
     plt.tight_layout()
-    plt.savefig(pasta / "04_climatologia_mensal.png", dpi=300, bbox_inches='tight')
-    plt.close()
+    salvar_figura(pasta / "04_climatologia_mensal.png")
 
-def histograma_mensal(df, nome, pasta):
+def histograma_mensal(agregados, nome, pasta):
     """Histograma de distribuição de precipitação diária."""
     fig, ax = plt.subplots(figsize=(10, 6))
     
     # Remover zeros para melhor visualização
-    precip_nao_zero = df[df["precip"] > 0]["precip"]
+    precip_nao_zero = como_agregados(agregados).dias_com_chuva
+    media = precip_nao_zero.mean()
+    mediana = np.median(precip_nao_zero)
     
     ax.hist(precip_nao_zero, bins=35, color='steelblue', edgecolor='black', 
             alpha=0.7, label=f'Dias com chuva (n={len(precip_nao_zero)})')
     
-    ax.axvline(precip_nao_zero.mean(), color='red', linestyle='--', linewidth=2, label=f'Média={precip_nao_zero.mean():.1f} mm')
-    ax.axvline(precip_nao_zero.median(), color='green', linestyle='--', linewidth=2, label=f'Mediana={precip_nao_zero.median():.1f} mm')
+    ax.axvline(media, color='red', linestyle='--', linewidth=2, label=f'Média={media:.1f} mm')
+    ax.axvline(mediana, color='green', linestyle='--', linewidth=2, label=f'Mediana={mediana:.1f} mm')
     
     ax.set_title(f'Distribuição de Precipitação Diária - {nome}', fontweight='bold', fontsize=13)
     ax.set_xlabel('Precipitação (mm)')
@@ -344,12 +651,11 @@ def histograma_mensal(df, nome, pasta):
     ax.grid(True, alpha=0.3, axis='y')
     
     plt.tight_layout()
-    plt.savefig(pasta / "05_histograma_precipitacao_diaria.png", dpi=300, bbox_inches='tight')
-    plt.close()
+    salvar_figura(pasta / "05_histograma_precipitacao_diaria.png")
 
-def histograma_anual(df, nome, pasta):
+def histograma_anual(agregados, nome, pasta):
     """Histograma de distribuição de precipitação anual (complementar)."""
-    anual = df.groupby("ano")["precip"].sum()
+    anual = como_agregados(agregados).anual
 
     fig, ax = plt.subplots(figsize=(10, 6))
     ax.hist(anual, bins=15, color='coral', edgecolor='black', alpha=0.7)
@@ -364,12 +670,11 @@ def histograma_anual(df, nome, pasta):
     ax.grid(True, alpha=0.3, axis='y')
     
     plt.tight_layout()
-    plt.savefig(pasta / "06_histograma_anual.png", dpi=300, bbox_inches='tight')
-    plt.close()
+    salvar_figura(pasta / "06_histograma_anual.png")
 
-def boxplot_mensal(df, nome, pasta):
+def boxplot_mensal(agregados, nome, pasta):
     """Boxplot de precipitação por mês do ano."""
-    dados = [df[df["mes"] == m]["precip"] for m in range(1, 13)]
+    dados = como_agregados(agregados).por_mes
 
     fig, ax = plt.subplots(figsize=(11, 6))
     bp = ax.boxplot(dados, labels=MESES, patch_artist=True, 
@@ -388,12 +693,11 @@ def boxplot_mensal(df, nome, pasta):
     ax.grid(True, alpha=0.3, axis='y')
     
     plt.tight_layout()
-    plt.savefig(pasta / "07_boxplot_mensal.png", dpi=300, bbox_inches='tight')
-    plt.close()
+    salvar_figura(pasta / "07_boxplot_mensal.png")
 
-def boxplot_anual(df, nome, pasta):
+def boxplot_anual(agregados, nome, pasta):
     """Boxplot de precipitação anual (complementar)."""
-    anual = df.groupby("ano")["precip"].sum()
+    anual = como_agregados(agregados).anual
 
     fig, ax = plt.subplots(figsize=(8, 6))
     bp = ax.boxplot(anual, patch_artist=True, notch=True, showmeans=True,
@@ -408,100 +712,270 @@ def boxplot_anual(df, nome, pasta):
     ax.grid(True, alpha=0.3, axis='y')
     
     plt.tight_layout()
-    plt.savefig(pasta / "08_boxplot_anual.png", dpi=300, bbox_inches='tight')
-    plt.close()
+    salvar_figura(pasta / "08_boxplot_anual.png")
 
 # ===============================
 # FUNÇÕES AUXILIARES
 # ===============================
 
-def exportar_serie_arima(mensal_df, nome_estacao, pasta):
+def identificar_estacao(arquivo):
     """
-    Exporta a série temporal mensal em formato CSV para futuro uso com ARIMA.
+    Nome da estação a partir do nome do arquivo (ex.: "goianesia33 (1).txt").
     
-    A série é:
-    - Indexada por período (YYYY-MM)
-    - Sem lacunas temporais (todos os meses estão presentes)
-    - Com valores de precipitação total mensal em mm
+    Retorna (nome, nome_corrigido): o primeiro dá o nome da pasta de saída
+    (minúsculo, "_" no lugar de espaços) e o segundo é o nome próprio com acentuação.
+    """
+    # Extrair nome da estação
+    nome_estacao = Path(arquivo).stem.split("33")[0].strip()
+    nome_estacao = nome_estacao.replace("_", " ").title()
     
-    Estrutura do CSV:
-    periodo,precip_total,n_dias,media_diaria,std_diaria
+    # Aplicar correção de acentuação e português correto
+    return nome_estacao, NOMES_CORRECAO.get(nome_estacao, nome_estacao)
+
+def exportar_serie_arima(mensal_df, nome_estacao, pasta, csv=False, metadados=None):
     """
-    mensal_df_arima = mensal_df[["ano_mes", "precip_total"]].copy()
-    mensal_df_arima.columns = ["periodo", "precip_mm"]
+    Exporta a série temporal mensal para os demais scripts (e para uso com ARIMA).
+    
+    A série é:
+    - Indexada por período (mês), no calendário mensal contínuo (calendario.py):
+      meses sem nenhum dado entram com precipitação NaN e n_dias = 0
+    - Com valores de precipitação total mensal em mm e os dias com dado de cada mês
+    
+    Formato principal: serie_mensal_<pasta>.npy + .json (serie_mensal.py), lido
+    por memmap com as datas já tipadas. Com csv=True também grava o CSV
+    serie_temporal_mensal_arima_<pasta>.csv (periodo AAAA-MM, precip_mm).
     
-    arquivo_csv = pasta / f"serie_temporal_mensal_arima_{nome_estacao.lower().replace(' ', '_')}.csv"
-    mensal_df_arima.to_csv(arquivo_csv, index=False, sep=",")
+    Retorna a lista de arquivos gravados.
+    """
+    pasta_estacao = nome_estacao.lower().replace(' ', '_')
+    arquivos = list(serie_mensal.gravar_serie_mensal(mensal_df, pasta, pasta_estacao, metadados))
+    if csv:
+        arquivos.append(serie_mensal.exportar_csv(mensal_df, pasta, pasta_estacao))
     
-    return arquivo_csv
+    return arquivos
 
 # ===============================
-# EXECUÇÃO PRINCIPAL
+# PROCESSAMENTO POR ESTAÇÃO
 # ===============================
-if __name__ == "__main__":
-    arquivos = list(DATA_DIR.glob("*.txt"))
+
+# Gráficos por estação: função de gráfico e arquivos PNG que ela grava
+GRAFICOS_ESTACAO = [
+    (serie_temporal_mensal, ["01_serie_temporal_mensal.png"]),
+    (serie_pentadal, ["02_analise_pentadal.png"]),
+    (serie_pentadal_temporal, ["02b_serie_pentadal_temporal.png"]),
+    (grafico_anual, ["03_precipitacao_anual_complementar.png"]),
+    (grafico_mensal, ["04_climatologia_mensal.png"]),
+    (histograma_mensal, ["05_histograma_precipitacao_diaria.png"]),
+    (histograma_anual, ["06_histograma_anual.png"]),
+    (boxplot_mensal, ["07_boxplot_mensal.png"]),
+    (boxplot_anual, ["08_boxplot_anual.png"]),
+]
+
+# Gráficos que precisam dos valores diários (não disponíveis no modo incremental)
+GRAFICOS_DIARIOS = {histograma_mensal, boxplot_mensal}
+
+def processar_estacao(arquivo, usar_cache=True, tamanho_cache=cache_estacoes.TAMANHO_MAXIMO_CACHE,
+                      log=print, fila=None, modo_incremental=False, exportar_csv=False):
+    """
+    Executa o fluxo completo de uma estação: leitura, série mensal, gráficos e CSV.
     
-    if not arquivos:
-        print(f"⚠️  Nenhum arquivo .txt encontrado em {DATA_DIR}")
-    else:
-        print(f"📊 Processando {len(arquivos)} estação(ões)...\n")
-        print("=" * 70)
+    Os gráficos passam pela fila de renderização `fila` (uma fila sequencial
+    é criada se nenhuma for informada); figuras cujos dados não mudaram desde a
+    última execução são reaproveitadas.
+    
+    Com modo_incremental=True só as linhas novas do arquivo são lidas e somadas aos
+    acumuladores salvos; os gráficos de valores diários (GRAFICOS_DIARIOS) são pulados.
+    
+    A série mensal é gravada no formato binário de serie_mensal.py; com
+    exportar_csv=True, também em CSV.
+    
+    As mensagens de progresso são enviadas para `log` (print por padrão).
+    Erros ficam restritos à estação: são registrados no log e a função retorna False.
+    """
+    fila = FilaRenderizacao() if fila is None else fila
+    try:
+        nome_estacao, nome_estacao_corrigido = identificar_estacao(arquivo)
+        pasta_saida = OUTPUT_DIR / nome_estacao.lower().replace(" ", "_")
+        pasta_saida.mkdir(parents=True, exist_ok=True)
+
+        log(f"\n📈 Estação: {nome_estacao_corrigido}")
+        log(f"   Arquivo: {arquivo.name}")
         
-        for arquivo in arquivos:
+        graficos = GRAFICOS_ESTACAO
+        if modo_incremental:
+            # Somente as linhas acrescentadas desde a última execução
+            with instrumentacao.medir("leitura", nome_estacao_corrigido):
+                acumuladores, novos, releitura = carregar_acumuladores_incremental(arquivo)
+            with instrumentacao.medir("agregacao", nome_estacao_corrigido):
+                agregados = acumuladores.agregados()
+            anos = agregados.anual.index
+            leitura = "leitura completa" if releitura else "leitura incremental"
+            log(f"   ✓ Dados carregados ({leitura}): {novos} registros novos | Anos: {anos.min():.0f}-{anos.max():.0f}")
+            graficos = [(funcao, saidas) for funcao, saidas in GRAFICOS_ESTACAO
+                        if funcao not in GRAFICOS_DIARIOS]
+        else:
+            # Carregar dados
+            with instrumentacao.medir("leitura", nome_estacao_corrigido):
+                if usar_cache:
+                    df = carregar_dados_em_cache(arquivo, tamanho_maximo=tamanho_cache)
+                else:
+                    df = carregar_dados(arquivo)
+            log(f"   ✓ Dados carregados: {len(df)} registros | Anos: {df['ano'].min():.0f}-{df['ano'].max():.0f}")
+            
+            # Agregações calculadas uma única vez e compartilhadas pelos gráficos
+            with instrumentacao.medir("agregacao", nome_estacao_corrigido):
+                agregados = calcular_agregados(df)
+        mensal_df = agregados.mensal
+        log(f"   ✓ {len(mensal_df)} meses agregados (série principal, base ARIMA)")
+        
+        # Gráficos: série mensal, pentadais e complementares
+        log(f"   ► Gerando gráficos...")
+        if len(graficos) < len(GRAFICOS_ESTACAO):
+            log(f"      (modo incremental: histograma diário e boxplot mensal não são gerados)")
+        for funcao, saidas in graficos:
+            fila.adicionar(funcao, agregados, nome_estacao_corrigido, pasta_saida,
+                           saidas=[pasta_saida / saida for saida in saidas], estacao=nome_estacao_corrigido)
+        renderizados, reaproveitados = fila.executar()
+        log(f"      ✓ {renderizados} gráficos criados | {reaproveitados} sem alteração (reaproveitados)")
+        
+        # Exportar série mensal (GLM, comparação e ARIMA)
+        log(f"   ► Exportando série mensal...")
+        with instrumentacao.medir("exportacao_serie", nome_estacao_corrigido):
+            arquivos_serie = exportar_serie_arima(mensal_df, nome_estacao, pasta_saida, csv=exportar_csv,
+                                                  metadados={"nome": nome_estacao_corrigido,
+                                                             "arquivo": Path(arquivo).name})
+        log(f"      ✓ Série mensal: {', '.join(caminho.name for caminho in arquivos_serie)}")
+        
+        log(f"   ✅ Total: {len(graficos)} gráficos + série mensal | Pasta: {pasta_saida}")
+        return True
+        
+    except Exception as e:
+        log(f"   ❌ Erro: {str(e)}")
+        return False
+
+def _inicializar_worker(perfil):
+    """Inicializa cada processo do pool: backend não interativo e perfil de saída."""
+    plt.switch_backend("Agg")
+    definir_perfil(perfil)
+
+def _processar_estacao_em_worker(arquivo, usar_cache, tamanho_cache, reaproveitar, modo_incremental,
+                                 exportar_csv):
+    """
+    Roda processar_estacao num worker, guardando as mensagens para impressão posterior.
+    
+    Retorna também as etapas medidas no worker (instrumentacao).
+    """
+    instrumentacao.reiniciar()
+    mensagens = []
+    fila = FilaRenderizacao(reaproveitar=reaproveitar)
+    ok = processar_estacao(arquivo, usar_cache, tamanho_cache, log=mensagens.append, fila=fila,
+                           modo_incremental=modo_incremental, exportar_csv=exportar_csv)
+    return ok, mensagens, instrumentacao.coletar()
+
+def processar_estacoes(arquivos, workers=1, usar_cache=True,
+                       tamanho_cache=cache_estacoes.TAMANHO_MAXIMO_CACHE,
+                       workers_graficos=1, reaproveitar=True, perfil="publicacao",
+                       modo_incremental=False, exportar_csv=False):
+    """
+    Processa as estações em sequência (workers=1) ou num pool de processos.
+    
+    No modo paralelo cada estação roda isolada em um processo (e renderiza os seus
+    gráficos nesse mesmo processo); as mensagens são impressas por estação, na mesma
+    ordem de `arquivos`, independentemente da ordem de conclusão.
+    No modo sequencial os gráficos podem ser distribuídos em `workers_graficos` processos.
+    
+    Retorna a lista de estações (arquivos) que falharam.
+    """
+    falhas = []
+    definir_perfil(perfil)
+    
+    if workers <= 1:
+        fila = FilaRenderizacao(workers=workers_graficos, reaproveitar=reaproveitar)
+        try:
+            for arquivo in arquivos:
+                if not processar_estacao(arquivo, usar_cache, tamanho_cache, fila=fila,
+                                         modo_incremental=modo_incremental, exportar_csv=exportar_csv):
+                    falhas.append(arquivo)
+        finally:
+            fila.encerrar()
+        return falhas
+    
+    with ProcessPoolExecutor(max_workers=workers, initializer=_inicializar_worker,
+                             initargs=(perfil,)) as pool:
+        futuros = [
+            pool.submit(_processar_estacao_em_worker, arquivo, usar_cache, tamanho_cache,
+                        reaproveitar, modo_incremental, exportar_csv)
+            for arquivo in arquivos
+        ]
+        for arquivo, futuro in zip(arquivos, futuros):
             try:
-                # Extrair nome da estação
-                nome_arquivo = arquivo.stem
-                nome_estacao = nome_arquivo.split("33")[0].strip()
-                nome_estacao = nome_estacao.replace("_", " ").title()
-                
-                # Aplicar correção de acentuação e português correto
-                nome_estacao_corrigido = NOMES_CORRECAO.get(nome_estacao, nome_estacao)
-                
-                pasta_saida = OUTPUT_DIR / nome_estacao.lower().replace(" ", "_")
-                pasta_saida.mkdir(parents=True, exist_ok=True)
-
-                print(f"\n📈 Estação: {nome_estacao_corrigido}")
-                print(f"   Arquivo: {arquivo.name}")
-                
-                # Carregar dados
-                df = carregar_dados(arquivo)
-                print(f"   ✓ Dados carregados: {len(df)} registros | Anos: {df['ano'].min():.0f}-{df['ano'].max():.0f}")
-                
-                # Gerar série mensal (SÉRIE PRINCIPAL)
-                print(f"   ► Gerando série temporal mensal (base ARIMA)...")
-                mensal_df = serie_temporal_mensal(df, nome_estacao_corrigido, pasta_saida)
-                print(f"      ✓ {len(mensal_df)} meses agregados")
-                
-                # Análise pentadal
-                print(f"   ► Gerando análise pentadal...")
-                serie_pentadal(df, nome_estacao_corrigido, pasta_saida)
-                serie_pentadal_temporal(df, nome_estacao_corrigido, pasta_saida)
-                print(f"      ✓ 2 gráficos pentadais criados")
-                
-                # Gráficos complementares
-                print(f"   ► Gerando gráficos complementares...")
-                grafico_anual(df, nome_estacao_corrigido, pasta_saida)
-                grafico_mensal(df, nome_estacao_corrigido, pasta_saida)
-                histograma_mensal(df, nome_estacao_corrigido, pasta_saida)
-                histograma_anual(df, nome_estacao_corrigido, pasta_saida)
-                boxplot_mensal(df, nome_estacao_corrigido, pasta_saida)
-                boxplot_anual(df, nome_estacao_corrigido, pasta_saida)
-                print(f"      ✓ 6 gráficos complementares criados")
-                
-                # Exportar série para ARIMA
-                print(f"   ► Exportando série mensal para ARIMA...")
-                arquivo_csv = exportar_serie_arima(mensal_df, nome_estacao, pasta_saida)
-                print(f"      ✓ Arquivo CSV: {arquivo_csv.name}")
-                
-                print(f"   ✅ Total: 8 gráficos + 1 arquivo CSV | Pasta: {pasta_saida}")
-                
+                ok, mensagens, registros = futuro.result()
+                instrumentacao.incorporar(registros)
             except Exception as e:
-                print(f"   ❌ Erro: {str(e)}")
-                continue
+                # Falha do próprio processo (ex.: worker encerrado), não da análise
+                ok, mensagens = False, [f"\n📈 Arquivo: {arquivo.name}", f"   ❌ Erro no worker: {str(e)}"]
+            for mensagem in mensagens:
+                print(mensagem)
+            if not ok:
+                falhas.append(arquivo)
+    
+    return falhas
+
+# ===============================
+# EXECUÇÃO PRINCIPAL
+# ===============================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera gráficos e séries mensais das estações em data/*.txt")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="número de processos para processar estações em paralelo (padrão: 1)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="ignora o cache em output/cache/ e relê todos os arquivos")
+    parser.add_argument("--cache-max-mb", type=float,
+                        default=cache_estacoes.TAMANHO_MAXIMO_CACHE / 1024**2,
+                        help="tamanho máximo do cache em MB (padrão: %(default).0f)")
+    parser.add_argument("--preview", action="store_true",
+                        help="gráficos em baixa resolução, sem bbox justo (execução interativa)")
+    parser.add_argument("--render-workers", type=int, default=1,
+                        help="processos para renderizar gráficos quando --workers=1 (padrão: 1)")
+    parser.add_argument("--force-render", action="store_true",
+                        help="renderiza todos os gráficos, mesmo os que não mudaram")
+    parser.add_argument("--incremental", action="store_true",
+                        help="lê só as linhas acrescentadas aos arquivos desde a última execução")
+    parser.add_argument("--csv", action="store_true",
+                        help="também exporta a série mensal em CSV (serie_temporal_mensal_arima_*.csv)")
+    parser.add_argument("--profile", action="store_true",
+                        help="grava o cProfile do processo principal em output/execucoes/main.prof")
+    args = parser.parse_args()
+    
+    with instrumentacao.sessao("main", perfil_cprofile=args.profile):
+        arquivos = sorted(DATA_DIR.glob("*.txt"))
+        
+        if not arquivos:
+            print(f"⚠️  Nenhum arquivo .txt encontrado em {DATA_DIR}")
+        else:
+            workers = max(1, min(args.workers, len(arquivos)))
+            print(f"📊 Processando {len(arquivos)} estação(ões)...\n")
+            if workers > 1:
+                print(f"   ({workers} processos em paralelo)")
+            print("=" * 70)
+        
+            falhas = processar_estacoes(
+                arquivos,
+                workers=workers,
+                usar_cache=not args.no_cache,
+                tamanho_cache=args.cache_max_mb * 1024**2,
+                workers_graficos=args.render_workers,
+                reaproveitar=not args.force_render,
+                perfil="preview" if args.preview else "publicacao",
+                modo_incremental=args.incremental,
+                exportar_csv=args.csv,
+            )
         
-        print("\n" + "=" * 70)
-        print("✅ Processamento concluído!")
-        print("\n📌 NOTA IMPORTANTE:")
-        print("   - Série PRINCIPAL: Série temporal mensal (01_serie_temporal_mensal.png)")
-        print("   - Use para: Análise de tendência, ARIMA, previsões")
-        print("   - Arquivos CSV (serie_temporal_mensal_arima_*.csv) estão prontos para modelagem")
+            print("\n" + "=" * 70)
+            if falhas:
+                print(f"⚠️  {len(falhas)} estação(ões) com erro: {', '.join(a.name for a in falhas)}")
+            print("✅ Processamento concluído!")
+            print("\n📌 NOTA IMPORTANTE:")
+            print("   - Série PRINCIPAL: Série temporal mensal (01_serie_temporal_mensal.png)")
+            print("   - Use para: Análise de tendência, ARIMA, previsões")
+            print("   - Séries mensais (serie_mensal_*.npy) prontas para modelagem (CSV com --csv)")
@@ -0,0 +1,193 @@
+"""
+Matriz de desenho dos GLM mensais, montada uma única vez por estação.
+
+Em vez de montar as variáveis com operações de coluna do pandas e `shift`, e de
+chamar `sm.add_constant` separadamente no treino, no teste e na série inteira,
+a matriz X (float64, contígua) é preenchida coluna a coluna a partir do vetor
+de precipitação:
+
+- constante e tendência polinomial em t (posição do mês na série);
+- sazonalidade: mês como inteiro 1..12 (o GLM original), indicadoras de mês
+  ou pares seno/cosseno (harmônicos anuais);
+- defasagens configuráveis da própria precipitação (1, 2, 12, ...).
+
+A divisão treino/teste reordena as linhas uma vez (treino e depois teste) e
+entrega as duas partes como visões dessa matriz, sem novas cópias.
+
+`construir_futuro` monta as linhas dos meses seguintes ao fim da série, com as
+defasagens que dependem de previsões em aberto (previsao_glm.py).
+
+A especificação padrão reproduz o GLM de glm_predicao.py: const, t, mes, precip_lag1.
+"""
+
+from dataclasses import asdict, dataclass
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+
+# ===============================
+# CONFIGURAÇÕES
+# ===============================
+SAZONALIDADES = ("inteiro", "indicadoras", "harmonicos")
+MAX_HARMONICOS = 5  # o 6º par tem seno identicamente nulo nos meses inteiros
+
+
+@dataclass(frozen=True)
+class EspecificacaoDesenho:
+    """Variáveis explicativas do GLM."""
+
+    defasagens: tuple = (1,)
+    sazonalidade: str = "inteiro"
+    harmonicos: int = 1
+    tendencia: int = 1
+    constante: bool = True
+
+    def __post_init__(self):
+        if self.sazonalidade not in SAZONALIDADES:
+            raise ValueError(f"Sazonalidade inválida: {self.sazonalidade!r} (use {', '.join(SAZONALIDADES)})")
+        if not 1 <= self.harmonicos <= MAX_HARMONICOS:
+            raise ValueError(f"harmonicos deve estar entre 1 e {MAX_HARMONICOS}")
+        if self.tendencia < 0 or any(k < 1 for k in self.defasagens):
+            raise ValueError("tendencia deve ser >= 0 e as defasagens >= 1")
+        object.__setattr__(self, "defasagens", tuple(sorted(set(int(k) for k in self.defasagens))))
+
+    @property
+    def colunas(self):
+        """Nomes das colunas de X, na ordem."""
+        colunas = ["const"] if self.constante else []
+        colunas += ["t" if grau == 1 else f"t{grau}" for grau in range(1, self.tendencia + 1)]
+        if self.sazonalidade == "inteiro":
+            colunas.append("mes")
+        elif self.sazonalidade == "indicadoras":
+            # Com constante, janeiro é a referência
+            colunas += [f"mes_{m:02d}" for m in range(2 if self.constante else 1, 13)]
+        else:
+            for h in range(1, self.harmonicos + 1):
+                colunas += [f"sen{h}", f"cos{h}"]
+        colunas += [f"precip_lag{k}" for k in self.defasagens]
+        return colunas
+
+    def como_dict(self):
+        """Especificação serializável (entra na chave dos modelos salvos)."""
+        return {**asdict(self), "defasagens": list(self.defasagens)}
+
+
+class DivisaoTreinoTeste(tuple):
+    """
+    (X_treino, X_teste, y_treino, y_teste): DataFrames/Series que são visões de
+    uma única matriz reordenada. A matriz completa, na ordem da série, fica em `.matriz`.
+    """
+
+    def __new__(cls, partes, matriz):
+        divisao = super().__new__(cls, partes)
+        divisao.matriz = matriz
+        return divisao
+
+    def __getnewargs__(self):
+        return tuple(self), self.matriz
+
+
+@dataclass
+class MatrizDesenho:
+    """Matriz de desenho de uma estação, só com as linhas utilizáveis (defasagens disponíveis)."""
+
+    X: np.ndarray          # (n, k) float64, contígua
+    y: np.ndarray          # (n,) float64
+    colunas: list
+    posicao: np.ndarray    # linha de origem no DataFrame mensal
+
+    def __len__(self):
+        return len(self.y)
+
+    def como_dataframe(self, X=None, posicao=None):
+        """X (ou uma visão dele) como DataFrame, sem cópia."""
+        X = self.X if X is None else X
+        posicao = self.posicao if posicao is None else posicao
+        return pd.DataFrame(X, columns=self.colunas, index=posicao, copy=False)
+
+    def dividir(self, test_size=0.2, random_state=42):
+        """
+        Divisão treino/teste com as mesmas linhas de `train_test_split` (mesmo sorteio).
+
+        As linhas são reordenadas uma única vez; treino e teste são visões dessa cópia.
+        """
+        treino, teste = train_test_split(np.arange(len(self)), test_size=test_size, random_state=random_state)
+        ordem = np.concatenate([treino, teste])
+        X = self.X[ordem]
+        y = self.y[ordem]
+        posicao = self.posicao[ordem]
+        n = len(treino)
+        partes = (
+            self.como_dataframe(X[:n], posicao[:n]),
+            self.como_dataframe(X[n:], posicao[n:]),
+            pd.Series(y[:n], index=posicao[:n], name="precip_mm", copy=False),
+            pd.Series(y[n:], index=posicao[n:], name="precip_mm", copy=False),
+        )
+        return DivisaoTreinoTeste(partes, self)
+
+
+def _preencher(especificacao, y, mes, t):
+    """X (n, k) com todas as colunas; defasagens sem valor anterior ficam NaN."""
+    X = np.empty((len(y), len(especificacao.colunas)))
+    j = 0
+    if especificacao.constante:
+        X[:, j] = 1.0
+        j += 1
+    for grau in range(1, especificacao.tendencia + 1):
+        X[:, j] = t ** grau
+        j += 1
+
+    if especificacao.sazonalidade == "inteiro":
+        X[:, j] = mes
+        j += 1
+    elif especificacao.sazonalidade == "indicadoras":
+        primeiro = 2 if especificacao.constante else 1
+        X[:, j:j + 13 - primeiro] = mes[:, None] == np.arange(primeiro, 13)
+        j += 13 - primeiro
+    else:
+        angulo = 2 * np.pi * mes / 12
+        for h in range(1, especificacao.harmonicos + 1):
+            X[:, j] = np.sin(h * angulo)
+            X[:, j + 1] = np.cos(h * angulo)
+            j += 2
+
+    for k in especificacao.defasagens:
+        X[:k, j] = np.nan
+        X[k:, j] = y[:-k]
+        j += 1
+    return X
+
+def construir_matriz(df, especificacao=None, apenas_positivos=False, coluna="precip_mm"):
+    """
+    Monta a matriz de desenho a partir da série mensal (colunas 'periodo' e `coluna`).
+
+    Ficam só as linhas com todas as defasagens disponíveis e, com
+    apenas_positivos=True (GLM Gamma), só os meses com precipitação > 0.
+    """
+    especificacao = especificacao or EspecificacaoDesenho()
+    y = df[coluna].to_numpy(dtype=float)
+    mes = df["periodo"].dt.month.to_numpy(dtype=float)
+    X = _preencher(especificacao, y, mes, np.arange(len(y), dtype=float))
+
+    utilizavel = np.isfinite(X).all(axis=1) & np.isfinite(y)
+    if apenas_positivos:
+        utilizavel &= y > 0
+    posicao = np.flatnonzero(utilizavel)
+    return MatrizDesenho(np.ascontiguousarray(X[posicao]), y[posicao], especificacao.colunas, posicao)
+
+def construir_futuro(df, horizonte, especificacao=None, coluna="precip_mm"):
+    """
+    Linhas de X dos `horizonte` meses seguintes ao fim da série.
+
+    Constante, tendência e sazonalidade continuam a série; a defasagem k do passo
+    j (0, 1, ...) vem da série observada quando j < k e fica NaN quando depende
+    de uma previsão (a preencher passo a passo). Retorna (X (horizonte, k), periodos).
+    """
+    especificacao = especificacao or EspecificacaoDesenho()
+    n = len(df)
+    periodos = pd.date_range(df["periodo"].iloc[-1] + pd.offsets.MonthBegin(), periods=horizonte, freq="MS")
+    y = np.r_[df[coluna].to_numpy(dtype=float), np.full(horizonte, np.nan)]
+    mes = np.r_[df["periodo"].dt.month.to_numpy(dtype=float), periodos.month.to_numpy(dtype=float)]
+    X = _preencher(especificacao, y, mes, np.arange(n + horizonte, dtype=float))
+    return np.ascontiguousarray(X[n:]), periodos
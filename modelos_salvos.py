@@ -0,0 +1,100 @@
+"""
+Armazenamento em disco de modelos ajustados (GLM e ARIMA).
+
+Cada modelo é identificado por uma chave que combina o conteúdo dos dados de
+entrada (série mensal e variáveis explicativas), a especificação do modelo
+(família, ordem, variáveis, divisão treino/teste...) e as versões do
+statsmodels e do NumPy. Para cada chave guardamos só os parâmetros ajustados,
+as métricas e alguns valores auxiliares, num .npz em output/cache/modelos/.
+
+Num acerto, quem chama reconstrói o modelo (sem ajuste) e usa os parâmetros
+salvos para prever: `GLM.predict(params, exog)` ou `ARIMA.filter(params)`.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# ===============================
+# CONFIGURAÇÕES
+# ===============================
+MODELOS_DIR = Path("output/cache/modelos")
+
+# Incrementar quando o conteúdo das entradas mudar
+VERSAO_FORMATO = 1
+
+
+def versoes_bibliotecas():
+    """Versões que influenciam o ajuste (um ajuste salvo com outra versão não é reaproveitado)."""
+    import statsmodels
+    return {"statsmodels": statsmodels.__version__, "numpy": np.__version__}
+
+def _atualizar_hash(h, obj):
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        colunas = list(obj.columns) if isinstance(obj, pd.DataFrame) else [obj.name]
+        h.update(repr([str(c) for c in colunas]).encode("utf-8"))
+        h.update(pd.util.hash_pandas_object(obj, index=True).to_numpy().tobytes())
+    else:
+        arr = np.ascontiguousarray(obj)
+        h.update(repr((arr.dtype.str, arr.shape)).encode("utf-8"))
+        h.update(arr.tobytes())
+
+def chave_modelo(dados, especificacao):
+    """
+    Chave do modelo: hash dos `dados` (DataFrame, Series, array ou lista deles),
+    da `especificacao` (dict serializável em JSON) e das versões das bibliotecas.
+    """
+    h = hashlib.sha256()
+    cabecalho = {
+        "versao": VERSAO_FORMATO,
+        "bibliotecas": versoes_bibliotecas(),
+        "especificacao": especificacao,
+    }
+    h.update(json.dumps(cabecalho, sort_keys=True, default=str).encode("utf-8"))
+    for obj in (dados if isinstance(dados, (list, tuple)) else [dados]):
+        _atualizar_hash(h, obj)
+    return h.hexdigest()[:32]
+
+def ler_modelo(chave, pasta=MODELOS_DIR):
+    """
+    Modelo salvo sob `chave`, ou None.
+
+    Retorna dict com params (Series indexada pelos nomes dos parâmetros),
+    metricas (dict) e os arrays extras gravados junto.
+    """
+    try:
+        with np.load(Path(pasta) / f"{chave}.npz", allow_pickle=False) as npz:
+            meta = json.loads(str(npz["__meta__"]))
+            params = pd.Series(npz["__params__"], index=[str(n) for n in npz["__nomes__"]])
+            extras = {nome: npz[nome] for nome in npz.files if not nome.startswith("__")}
+    except (OSError, KeyError, ValueError):
+        return None
+    return {"params": params, "metricas": meta["metricas"], **extras}
+
+def gravar_modelo(chave, params, metricas=None, especificacao=None, pasta=MODELOS_DIR, **extras):
+    """Grava os parâmetros (Series ou array), as métricas e arrays extras do modelo."""
+    pasta = Path(pasta)
+    pasta.mkdir(parents=True, exist_ok=True)
+
+    params = pd.Series(params)
+    meta = {
+        "metricas": {k: float(v) for k, v in (metricas or {}).items()},
+        "especificacao": especificacao,
+        "bibliotecas": versoes_bibliotecas(),
+    }
+    destino = pasta / f"{chave}.npz"
+    temporario = pasta / f".{chave}.{os.getpid()}.tmp"
+    with open(temporario, "wb") as f:
+        np.savez(
+            f,
+            __meta__=np.array(json.dumps(meta, default=str)),
+            __params__=params.to_numpy(dtype=float),
+            __nomes__=np.array([str(n) for n in params.index]),
+            **{nome: np.asarray(valor) for nome, valor in extras.items()},
+        )
+    os.replace(temporario, destino)
+    return destino
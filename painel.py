@@ -0,0 +1,206 @@
+"""
+Painel da rede de estações: matrizes data x estação em disco, lidas por memmap.
+
+Em vez de cada script reler o CSV mensal de cada estação, o painel guarda
+numa pasta (output/painel/ por padrão):
+
+- diario.npy: precipitação diária (float32), calendário diário contínuo x estações;
+- mensal.npy: precipitação total mensal (float64), calendário mensal contínuo x estações;
+- dias_mensal.npy: dias com dado de cada mês (int16), mesmo formato de mensal.npy;
+- estacoes.json: índice com o calendário, a ordem das colunas e os metadados de
+  cada estação (nome, pasta de saída, arquivo de origem, período com dados).
+
+NaN indica ausência de dado. As matrizes são gravadas em ordem Fortran (cada
+estação contígua), então `painel.mensal[:, j]` é uma fatia sem cópia do memmap.
+O calendário diário e o mensal são os de calendario.py: todas as estações são
+alinhadas de uma vez e os totais e dias com dado de cada mês saem da matriz
+diária com um único np.add.reduceat.
+
+Construção:
+    python painel.py [--dados data] [--saida output/painel]
+"""
+
+import argparse
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import cache_estacoes
+from calendario import LIMIAR_COMPLETUDE, alinhar_diario, completude, contagem_mensal
+
+# ===============================
+# CONFIGURAÇÕES
+# ===============================
+PAINEL_DIR = Path("output/painel")
+NOME_INDICE = "estacoes.json"
+NOME_DIARIO = "diario.npy"
+NOME_MENSAL = "mensal.npy"
+NOME_DIAS_MENSAL = "dias_mensal.npy"
+
+# Incrementar quando o layout do painel mudar
+VERSAO_PAINEL = 2
+
+
+class Painel:
+    """Painel aberto: matrizes (memmap somente leitura) e índice das estações."""
+
+    def __init__(self, pasta, indice, diario, mensal, dias_mensal):
+        self.pasta = Path(pasta)
+        self.estacoes = indice["estacoes"]
+        self.datas = np.datetime64(indice["inicio_diario"], "D") + np.arange(diario.shape[0])
+        self.periodos = np.datetime64(indice["inicio_mensal"], "M") + np.arange(mensal.shape[0])
+        self.diario = diario
+        self.mensal = mensal
+        self.dias_mensal = dias_mensal
+        self._colunas = {}
+        for j, estacao in enumerate(self.estacoes):
+            self._colunas[estacao["nome"]] = j
+            self._colunas[estacao["pasta"]] = j
+
+    @classmethod
+    def abrir(cls, pasta=PAINEL_DIR):
+        """Abre um painel gravado por construir_painel (as matrizes não são copiadas para a memória)."""
+        pasta = Path(pasta)
+        indice = json.loads((pasta / NOME_INDICE).read_text(encoding="utf-8"))
+        if indice.get("versao") != VERSAO_PAINEL:
+            raise ValueError(f"Painel em {pasta} tem versão {indice.get('versao')} (esperada {VERSAO_PAINEL})")
+        diario = np.load(pasta / NOME_DIARIO, mmap_mode="r")
+        mensal = np.load(pasta / NOME_MENSAL, mmap_mode="r")
+        dias_mensal = np.load(pasta / NOME_DIAS_MENSAL, mmap_mode="r")
+        return cls(pasta, indice, diario, mensal, dias_mensal)
+
+    @property
+    def nomes(self):
+        return [estacao["nome"] for estacao in self.estacoes]
+
+    def coluna(self, estacao):
+        """Posição da estação (nome próprio ou nome da pasta de saída) nas matrizes."""
+        try:
+            return self._colunas[estacao]
+        except KeyError:
+            raise KeyError(f"Estação {estacao!r} não está no painel") from None
+
+    def completude(self, limiar=None):
+        """Fração de dias com dado de cada mês (meses x estações); com `limiar`, a máscara completude >= limiar."""
+        fracao = completude(self.dias_mensal, self.periodos)
+        return fracao if limiar is None else fracao >= limiar
+
+    def serie_mensal(self, estacao, limiar=LIMIAR_COMPLETUDE):
+        """
+        Série mensal da estação no formato de serie_mensal.ler_serie_mensal.
+
+        Vai do primeiro ao último mês com dado da estação, no calendário
+        contínuo (meses sem dado em NaN), com n_dias, completude e completo.
+        """
+        j = self.coluna(estacao)
+        n_dias = np.asarray(self.dias_mensal[:, j])
+        com_dado = np.flatnonzero(n_dias)
+        trecho = slice(com_dado[0], com_dado[-1] + 1) if len(com_dado) else slice(0, 0)
+        df = pd.DataFrame({
+            "periodo": self.periodos[trecho].astype("datetime64[ns]"),
+            "precip_mm": np.asarray(self.mensal[trecho, j]),
+            "n_dias": n_dias[trecho],
+            "completude": completude(n_dias[trecho], self.periodos[trecho]),
+        })
+        df["completo"] = df["completude"] >= limiar
+        return df
+
+
+def gravar_matriz(destino, matriz):
+    """Grava a matriz num .npy em ordem Fortran (cada estação contígua), de forma atômica."""
+    temporario = destino.with_name(f".{destino.name}.{os.getpid()}.tmp")
+    saida = np.lib.format.open_memmap(temporario, mode="w+", dtype=matriz.dtype,
+                                      shape=matriz.shape, fortran_order=True)
+    saida[:] = matriz
+    saida.flush()
+    del saida
+    os.replace(temporario, destino)
+
+def construir_painel(arquivos, pasta=PAINEL_DIR, log=print):
+    """
+    Lê as estações e grava o painel em `pasta`.
+
+    Se o índice existente foi construído a partir dos mesmos arquivos (mesmo
+    conteúdo), nada é refeito. Retorna o Painel aberto.
+    """
+    # Importado aqui para que abrir o painel não dependa de main.py
+    from main import carregar_serie_diaria, identificar_estacao
+
+    pasta = Path(pasta)
+    arquivos = sorted(Path(a) for a in arquivos)
+    chaves = [cache_estacoes.chave_arquivo(a) for a in arquivos]
+
+    try:
+        indice = json.loads((pasta / NOME_INDICE).read_text(encoding="utf-8"))
+        if indice.get("versao") == VERSAO_PAINEL and [e["chave"] for e in indice["estacoes"]] == chaves:
+            log(f"✓ Painel atualizado ({len(arquivos)} estações): {pasta}")
+            return Painel.abrir(pasta)
+    except (OSError, ValueError, KeyError):
+        pass
+
+    estacoes, diarias = [], []
+    for arquivo, chave in zip(arquivos, chaves):
+        serie = carregar_serie_diaria(arquivo)
+        nome, nome_corrigido = identificar_estacao(arquivo)
+        estacoes.append({
+            "nome": nome_corrigido,
+            "pasta": nome.lower().replace(" ", "_"),
+            "arquivo": str(arquivo),
+            "chave": chave,
+            "inicio": str(serie.inicio),
+            "fim": str(serie.inicio + len(serie) - 1),
+            "dias_com_dado": int(np.count_nonzero(~np.isnan(serie.precip))),
+        })
+        diarias.append((serie.precip, serie.inicio))
+
+    if not estacoes:
+        raise ValueError("Nenhuma estação para montar o painel")
+
+    # Todas as estações no calendário diário comum; os meses saem da matriz diária de uma vez
+    inicio_diario, diario = alinhar_diario(diarias)
+    periodos, mensal, dias_mensal = contagem_mensal(diario, inicio_diario)
+    for estacao, meses in zip(estacoes, np.count_nonzero(dias_mensal, axis=0)):
+        estacao["meses_com_dado"] = int(meses)
+        log(f"✓ {estacao['nome']}: {estacao['dias_com_dado']} dias | {estacao['meses_com_dado']} meses")
+
+    pasta.mkdir(parents=True, exist_ok=True)
+    gravar_matriz(pasta / NOME_DIARIO, diario)
+    gravar_matriz(pasta / NOME_MENSAL, mensal)
+    gravar_matriz(pasta / NOME_DIAS_MENSAL, dias_mensal.astype(np.int16))
+
+    indice = {
+        "versao": VERSAO_PAINEL,
+        "inicio_diario": str(inicio_diario),
+        "inicio_mensal": str(periodos[0]),
+        "estacoes": estacoes,
+    }
+    # O índice é gravado por último: um painel incompleto nunca parece atualizado
+    temporario = pasta / f".{NOME_INDICE}.{os.getpid()}.tmp"
+    temporario.write_text(json.dumps(indice, ensure_ascii=False, indent=1), encoding="utf-8")
+    os.replace(temporario, pasta / NOME_INDICE)
+
+    log(f"✓ Painel gravado: {len(estacoes)} estações | {pasta}")
+    return Painel.abrir(pasta)
+
+# ===============================
+# EXECUÇÃO PRINCIPAL
+# ===============================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Monta o painel data x estação a partir de data/*.txt")
+    parser.add_argument("--dados", type=Path, default=Path("data"),
+                        help="pasta com os .txt das estações (padrão: %(default)s)")
+    parser.add_argument("--saida", type=Path, default=PAINEL_DIR,
+                        help="pasta do painel (padrão: %(default)s)")
+    args = parser.parse_args()
+
+    arquivos = sorted(args.dados.glob("*.txt"))
+    if not arquivos:
+        print(f"⚠️  Nenhum arquivo .txt encontrado em {args.dados}")
+    else:
+        print(f"📦 Montando painel com {len(arquivos)} estação(ões)...\n")
+        painel = construir_painel(arquivos, args.saida)
+        print(f"\n   Diário: {painel.diario.shape[0]} dias x {painel.diario.shape[1]} estações")
+        print(f"   Mensal: {painel.mensal.shape[0]} meses x {painel.mensal.shape[1]} estações")
@@ -0,0 +1,438 @@
+"""
+Execução de todo o fluxo como um grafo de tarefas, refazendo só o que mudou.
+
+Sem o pipeline, main.py precisa rodar antes de comparacao.py, glm_predicao.py e
+busca_arima.py, que só se comunicam pelas séries mensais gravadas em
+output/graficos/<estação>/, e nenhum script sabe o que está desatualizado.
+Aqui cada etapa é uma tarefa:
+
+- serie_mensal:<estação>  leitura do .txt, agregação e série mensal (serie_mensal.py);
+- graficos:<estação>      os 8 gráficos de main.py (lê o .txt, independente da série);
+- comparacao              gráficos e tabelas de comparacao.py (todas as séries mensais);
+- glm:<estação>           ajuste e gráficos GLM da estação;
+- glm_metricas            metricas_glm.csv (depois dos glm:<estação>);
+- arima:<estação>         busca de ordens ARIMA (busca_arima.py).
+
+Cada tarefa tem uma chave SHA-256 formada pelo nome, pelos argumentos, pelo
+código dos módulos que ela usa (o script e tudo o que ele importa do projeto,
+dependencias_codigo) e pelo conteúdo dos arquivos que ela lê (o .txt ou as
+séries mensais produzidas pelas tarefas anteriores). A tarefa é pulada
+quando a chave é a da última execução bem-sucedida e todas as saídas existem.
+Como a chave usa o conteúdo da série mensal, uma correção no .txt que não muda
+a série não refaz GLM, ARIMA nem comparação; corrigir uma estação refaz só as
+tarefas dessa estação e as que juntam a rede.
+
+As chaves ficam em output/pipeline/estado.json (com o hash de cada arquivo,
+reaproveitado enquanto tamanho e data de modificação não mudam). Tarefas cujas
+dependências terminaram rodam em paralelo num pool de processos.
+
+Uso:
+    python pipeline.py [--workers 4] [--listar] [--forcar] [--sem-arima] [--preview]
+"""
+
+import argparse
+import ast
+import hashlib
+import io
+import json
+import os
+import time
+import traceback
+import warnings
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import redirect_stdout
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import matplotlib.pyplot as plt
+
+import busca_arima
+import comparacao
+import glm_predicao
+import instrumentacao
+import main
+import serie_mensal
+from agregacao import calcular_agregados
+from renderizacao import FilaRenderizacao, definir_perfil
+
+warnings.filterwarnings('ignore')
+
+# ===============================
+# CONFIGURAÇÕES
+# ===============================
+PIPELINE_DIR = Path("output/pipeline")
+ARQUIVO_ESTADO = PIPELINE_DIR / "estado.json"
+
+def dependencias_codigo(*scripts):
+    """
+    Módulos do projeto usados pelos `scripts`: eles e tudo o que importam
+    (direta ou indiretamente, também imports dentro de funções), pelos nomes
+    de arquivo. Lidos dos próprios imports, para a lista não ficar desatualizada.
+    """
+    pasta = Path(__file__).resolve().parent
+    encontrados, pendentes = set(), list(scripts)
+    while pendentes:
+        script = pendentes.pop()
+        if script in encontrados:
+            continue
+        encontrados.add(script)
+        arvore = ast.parse((pasta / script).read_text(encoding="utf-8"))
+        for no in ast.walk(arvore):
+            if isinstance(no, ast.Import):
+                nomes = [alias.name for alias in no.names]
+            elif isinstance(no, ast.ImportFrom) and no.level == 0 and no.module:
+                nomes = [no.module]
+            else:
+                continue
+            for nome in nomes:
+                arquivo = f"{nome.split('.')[0]}.py"
+                if (pasta / arquivo).exists():
+                    pendentes.append(arquivo)
+    return sorted(encontrados)
+
+# Código de que cada tipo de tarefa depende (mudou o arquivo, a tarefa é refeita)
+CODIGO_SERIE = dependencias_codigo("main.py")
+CODIGO_GRAFICOS = dependencias_codigo("main.py")
+CODIGO_COMPARACAO = dependencias_codigo("comparacao.py")
+CODIGO_GLM = dependencias_codigo("glm_predicao.py")
+CODIGO_ARIMA = dependencias_codigo("busca_arima.py")
+
+ARQUIVOS_COMPARACAO = [saida for _, saidas in comparacao.GRAFICOS_COMPARACAO for saida in saidas]
+ARQUIVOS_GLM = [
+    f"{prefixo}_{familia}.png"
+    for familia in glm_predicao.FAMILIAS
+    for prefixo in ("01_predicao_vs_observado", "02_serie_temporal_predicao", "03_diagnostico_residuos")
+]
+
+
+@dataclass
+class Tarefa:
+    """
+    Uma tarefa do pipeline: `funcao(*args)` grava os arquivos de `saidas`.
+
+    `dependencias` são nomes de tarefas que precisam terminar antes; `entradas`
+    são os arquivos lidos (entram na chave pelo conteúdo) e `codigo` os
+    módulos cujo código entra na chave.
+    """
+    nome: str
+    funcao: object
+    args: tuple
+    saidas: list
+    entradas: list = field(default_factory=list)
+    dependencias: list = field(default_factory=list)
+    codigo: list = field(default_factory=list)
+    estacao: str = None
+
+# ===============================
+# FUNÇÕES DAS TAREFAS
+# ===============================
+def tarefa_serie_mensal(arquivo, nome_estacao, nome_corrigido):
+    """Lê o .txt (com o cache de leitura), agrega e exporta a série mensal."""
+    pasta_saida = main.OUTPUT_DIR / nome_estacao.lower().replace(" ", "_")
+    pasta_saida.mkdir(parents=True, exist_ok=True)
+    df = main.carregar_dados_em_cache(arquivo)
+    main.exportar_serie_arima(calcular_agregados(df).mensal, nome_estacao, pasta_saida,
+                              metadados={"nome": nome_corrigido, "arquivo": Path(arquivo).name})
+
+def tarefa_graficos(arquivo, nome_estacao, nome_corrigido, perfil):
+    """Gráficos de main.py de uma estação (a fila ainda pula os PNG sem alteração)."""
+    definir_perfil(perfil)
+    pasta_saida = main.OUTPUT_DIR / nome_estacao.lower().replace(" ", "_")
+    pasta_saida.mkdir(parents=True, exist_ok=True)
+    agregados = calcular_agregados(main.carregar_dados_em_cache(arquivo))
+    fila = FilaRenderizacao()
+    for funcao, saidas in main.GRAFICOS_ESTACAO:
+        fila.adicionar(funcao, agregados, nome_corrigido, pasta_saida,
+                       saidas=[pasta_saida / saida for saida in saidas], estacao=nome_corrigido)
+    fila.executar()
+
+def tarefa_comparacao(estacoes, perfil):
+    """Gráficos e tabelas de comparacao.py para as `estacoes` ({nome: pasta}), pela fila de renderização."""
+    definir_perfil(perfil)
+    comparacao.COMPARACAO_DIR.mkdir(parents=True, exist_ok=True)
+    dados = comparacao.carregar_series_mensais(estacoes=estacoes)
+    comparacao.graficos_comparacao(dados)
+
+def tarefa_glm(nome_estacao, pasta_estacao, perfil):
+    """Ajuste (ou modelos salvos) e gráficos GLM de uma estação (a fila pula os PNG sem alteração)."""
+    definir_perfil(perfil)
+    series, ajustes = glm_predicao.ajustar_modelos({nome_estacao: pasta_estacao})
+    if nome_estacao not in series:
+        raise FileNotFoundError(f"Série mensal de {nome_estacao} não encontrada")
+    glm_predicao.graficos_estacao(nome_estacao, pasta_estacao, series[nome_estacao], ajustes)
+
+def tarefa_glm_metricas(estacoes):
+    """metricas_glm.csv de todas as estações (os modelos já estão salvos pelas tarefas glm)."""
+    _, ajustes = glm_predicao.ajustar_modelos(estacoes)
+    glm_predicao.gerar_relatorio_metricas(estacoes, ajustes=ajustes)
+
+def tarefa_arima(nome_estacao, pasta_estacao):
+    """Busca stepwise de ordens ARIMA de uma estação, gravada em busca_arima.csv."""
+    df = glm_predicao.carregar_dados_estacao(pasta_estacao)
+    if df is None:
+        raise FileNotFoundError(f"Série mensal de {nome_estacao} não encontrada")
+    tabela = busca_arima.buscar_ordens({nome_estacao: df["precip_mm"]})[nome_estacao]
+    tabela.to_csv(busca_arima.OUTPUT_DIR / pasta_estacao / "busca_arima.csv", index=False)
+
+# ===============================
+# GRAFO DE TAREFAS
+# ===============================
+def montar_tarefas(arquivos, perfil="publicacao", arima=True):
+    """Tarefas do pipeline para os arquivos .txt de `arquivos`, na ordem de execução sugerida."""
+    tarefas = []
+    estacoes = {}
+    for arquivo in arquivos:
+        nome_estacao, nome_corrigido = main.identificar_estacao(arquivo)
+        pasta = nome_estacao.lower().replace(" ", "_")
+        pasta_saida = main.OUTPUT_DIR / pasta
+        arquivo_serie = serie_mensal.caminho_serie(pasta_saida, pasta)
+        estacoes[nome_corrigido] = (pasta, arquivo_serie)
+
+        tarefas.append(Tarefa(f"serie_mensal:{pasta}", tarefa_serie_mensal,
+                              (str(arquivo), nome_estacao, nome_corrigido),
+                              saidas=[arquivo_serie, arquivo_serie.with_suffix(".json")],
+                              entradas=[arquivo], codigo=CODIGO_SERIE,
+                              estacao=nome_corrigido))
+        tarefas.append(Tarefa(f"graficos:{pasta}", tarefa_graficos,
+                              (str(arquivo), nome_estacao, nome_corrigido, perfil),
+                              saidas=[pasta_saida / saida for _, saidas in main.GRAFICOS_ESTACAO for saida in saidas],
+                              entradas=[arquivo], codigo=CODIGO_GRAFICOS, estacao=nome_corrigido))
+
+    for nome_corrigido, (pasta, arquivo_serie) in estacoes.items():
+        tarefas.append(Tarefa(f"glm:{pasta}", tarefa_glm, (nome_corrigido, pasta, perfil),
+                              saidas=[glm_predicao.GLM_DIR / pasta / saida for saida in ARQUIVOS_GLM],
+                              entradas=[arquivo_serie], dependencias=[f"serie_mensal:{pasta}"],
+                              codigo=CODIGO_GLM, estacao=nome_corrigido))
+        if arima:
+            tarefas.append(Tarefa(f"arima:{pasta}", tarefa_arima, (nome_corrigido, pasta),
+                                  saidas=[busca_arima.OUTPUT_DIR / pasta / "busca_arima.csv"],
+                                  entradas=[arquivo_serie], dependencias=[f"serie_mensal:{pasta}"],
+                                  codigo=CODIGO_ARIMA, estacao=nome_corrigido))
+
+    pastas = {nome: pasta for nome, (pasta, _) in estacoes.items()}
+    series = [arquivo_serie for _, arquivo_serie in estacoes.values()]
+    if pastas:
+        tarefas.append(Tarefa("glm_metricas", tarefa_glm_metricas, (pastas,),
+                              saidas=[glm_predicao.GLM_DIR / "metricas_glm.csv"], entradas=series,
+                              dependencias=[f"glm:{pasta}" for pasta in pastas.values()],
+                              codigo=CODIGO_GLM))
+    if len(pastas) >= 2:
+        tarefas.append(Tarefa("comparacao", tarefa_comparacao, (pastas, perfil),
+                              saidas=[comparacao.COMPARACAO_DIR / saida for saida in ARQUIVOS_COMPARACAO],
+                              entradas=series, dependencias=[f"serie_mensal:{pasta}" for pasta in pastas.values()],
+                              codigo=CODIGO_COMPARACAO))
+    return tarefas
+
+# ===============================
+# ESTADO E CHAVES
+# ===============================
+class Estado:
+    """Chaves da última execução bem-sucedida de cada tarefa e hashes dos arquivos."""
+
+    def __init__(self, caminho=ARQUIVO_ESTADO):
+        self.caminho = Path(caminho)
+        try:
+            dados = json.loads(self.caminho.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            dados = {}
+        self.arquivos = dados.get("arquivos", {})
+        self.tarefas = dados.get("tarefas", {})
+
+    def hash_arquivo(self, caminho):
+        """SHA-256 do conteúdo, recalculado só quando tamanho ou data de modificação mudam."""
+        info = os.stat(caminho)
+        assinatura = [info.st_size, info.st_mtime_ns]
+        memo = self.arquivos.get(str(caminho))
+        if memo is not None and memo[:2] == assinatura:
+            return memo[2]
+        h = hashlib.sha256()
+        with open(caminho, "rb") as f:
+            for bloco in iter(lambda: f.read(1024 * 1024), b""):
+                h.update(bloco)
+        self.arquivos[str(caminho)] = assinatura + [h.hexdigest()]
+        return h.hexdigest()
+
+    def chave(self, tarefa):
+        """Chave da tarefa: nome, argumentos, código e conteúdo das entradas (None se falta alguma entrada)."""
+        h = hashlib.sha256(tarefa.nome.encode("utf-8"))
+        h.update(repr(tarefa.args).encode("utf-8"))
+        for caminho in [*tarefa.codigo, *tarefa.entradas]:
+            if not Path(caminho).exists():
+                return None
+            h.update(str(caminho).encode("utf-8"))
+            h.update(self.hash_arquivo(caminho).encode("ascii"))
+        return h.hexdigest()
+
+    def atualizada(self, tarefa, chave):
+        return (chave is not None and self.tarefas.get(tarefa.nome) == chave
+                and all(Path(saida).exists() for saida in tarefa.saidas))
+
+    def gravar(self):
+        """Grava o estado de forma atômica (arquivo temporário + os.replace)."""
+        self.caminho.parent.mkdir(parents=True, exist_ok=True)
+        temporario = self.caminho.with_name(f"{self.caminho.name}.{os.getpid()}.tmp")
+        dados = {"arquivos": self.arquivos, "tarefas": self.tarefas}
+        temporario.write_text(json.dumps(dados, indent=1, sort_keys=True), encoding="utf-8")
+        os.replace(temporario, self.caminho)
+
+# ===============================
+# EXECUÇÃO DAS TAREFAS
+# ===============================
+def _executar_tarefa(nome, funcao, args, estacao=None):
+    """
+    Executa uma tarefa guardando o que ela imprime.
+
+    Retorna (ok, saida, tempo_s): em caso de erro, `saida` termina com o traceback.
+    """
+    saida = io.StringIO()
+    inicio = time.perf_counter()
+    try:
+        with redirect_stdout(saida), instrumentacao.medir(f"tarefa:{nome.split(':')[0]}", estacao):
+            funcao(*args)
+        ok = True
+    except Exception:
+        saida.write(traceback.format_exc())
+        ok = False
+    finally:
+        plt.close("all")
+    return ok, saida.getvalue(), time.perf_counter() - inicio
+
+def _executar_tarefa_em_worker(nome, funcao, args, estacao=None):
+    """_executar_tarefa num worker, devolvendo também as etapas medidas."""
+    instrumentacao.reiniciar()
+    return (*_executar_tarefa(nome, funcao, args, estacao), instrumentacao.coletar())
+
+def _inicializar_worker(perfil):
+    plt.switch_backend("Agg")
+    definir_perfil(perfil)
+
+def situacao(tarefas, estado, forcar=False):
+    """
+    {nome: "atualizada" | "desatualizada" | "aguardando"} sem executar nada.
+
+    "aguardando": alguma dependência está desatualizada, então a chave só é
+    conhecida depois que ela rodar.
+    """
+    resultado = {}
+    for tarefa in tarefas:
+        if any(resultado.get(dependencia) != "atualizada" for dependencia in tarefa.dependencias):
+            resultado[tarefa.nome] = "aguardando"
+        elif not forcar and estado.atualizada(tarefa, estado.chave(tarefa)):
+            resultado[tarefa.nome] = "atualizada"
+        else:
+            resultado[tarefa.nome] = "desatualizada"
+    return resultado
+
+def executar_pipeline(tarefas, estado, workers=1, forcar=False, perfil="publicacao", log=print):
+    """
+    Executa as tarefas respeitando as dependências; pula as atualizadas.
+
+    Uma tarefa só é liberada quando todas as suas dependências terminaram (a
+    chave depende das saídas delas). Se uma dependência falhou, a tarefa não é
+    executada. Retorna (executadas, puladas, falhas), listas de nomes.
+    """
+    pendentes = {tarefa.nome: tarefa for tarefa in tarefas}
+    concluidas, executadas, puladas, falhas = set(), [], [], []
+    chaves = {}
+    em_execucao = {}
+    pool = None
+    if workers > 1:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_inicializar_worker, initargs=(perfil,))
+
+    def concluir(tarefa, ok, saida, tempo):
+        if ok:
+            estado.tarefas[tarefa.nome] = chaves[tarefa.nome]
+            concluidas.add(tarefa.nome)
+            executadas.append(tarefa.nome)
+            log(f"   ✓ {tarefa.nome} ({tempo:.1f} s)")
+        else:
+            estado.tarefas.pop(tarefa.nome, None)
+            falhas.append(tarefa.nome)
+            log(f"   ❌ {tarefa.nome}:")
+            log("      " + saida.rstrip().replace("\n", "\n      "))
+        estado.gravar()
+
+    try:
+        while pendentes or em_execucao:
+            for nome, tarefa in list(pendentes.items()):
+                if any(dependencia in falhas for dependencia in tarefa.dependencias):
+                    del pendentes[nome]
+                    falhas.append(nome)
+                    log(f"   ⏭️  {nome}: dependência falhou")
+                    continue
+                if not all(dependencia in concluidas for dependencia in tarefa.dependencias):
+                    continue
+                del pendentes[nome]
+                chaves[nome] = estado.chave(tarefa)
+                if not forcar and estado.atualizada(tarefa, chaves[nome]):
+                    concluidas.add(nome)
+                    puladas.append(nome)
+                elif pool is None:
+                    concluir(tarefa, *_executar_tarefa(nome, tarefa.funcao, tarefa.args, tarefa.estacao))
+                else:
+                    futuro = pool.submit(_executar_tarefa_em_worker, nome, tarefa.funcao, tarefa.args,
+                                         tarefa.estacao)
+                    em_execucao[futuro] = tarefa
+
+            if not em_execucao:
+                # Sem tarefas rodando: as liberadas nesta volta já terminaram (ou foram puladas)
+                if pendentes and not any(all(d in concluidas or d in falhas for d in t.dependencias)
+                                         for t in pendentes.values()):
+                    raise ValueError(f"Dependências inexistentes ou circulares: {', '.join(pendentes)}")
+                continue
+
+            prontos, _ = wait(em_execucao, return_when=FIRST_COMPLETED)
+            for futuro in prontos:
+                tarefa = em_execucao.pop(futuro)
+                try:
+                    ok, saida, tempo, registros = futuro.result()
+                    instrumentacao.incorporar(registros)
+                except Exception as e:
+                    # Falha do próprio processo (ex.: worker encerrado), não da tarefa
+                    ok, saida, tempo = False, f"Erro no worker: {e}", 0.0
+                concluir(tarefa, ok, saida, tempo)
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    return executadas, puladas, falhas
+
+# ===============================
+# EXECUÇÃO PRINCIPAL
+# ===============================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Executa o fluxo completo, refazendo só as tarefas desatualizadas")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="processos para tarefas independentes em paralelo (padrão: 1)")
+    parser.add_argument("--listar", action="store_true",
+                        help="só mostra a situação de cada tarefa, sem executar")
+    parser.add_argument("--forcar", action="store_true",
+                        help="executa todas as tarefas, mesmo as atualizadas")
+    parser.add_argument("--sem-arima", action="store_true",
+                        help="não inclui a busca de ordens ARIMA")
+    parser.add_argument("--preview", action="store_true",
+                        help="gráficos em baixa resolução, sem bbox justo (execução interativa)")
+    parser.add_argument("--profile", action="store_true",
+                        help="grava o cProfile do processo principal em output/execucoes/pipeline.prof")
+    args = parser.parse_args()
+    perfil = "preview" if args.preview else "publicacao"
+    definir_perfil(perfil)
+
+    arquivos = sorted(main.DATA_DIR.glob("*.txt"))
+    tarefas = montar_tarefas(arquivos, perfil, arima=not args.sem_arima)
+    estado = Estado()
+
+    if args.listar:
+        for nome, valor in situacao(tarefas, estado, args.forcar).items():
+            marcador = {"atualizada": "✓", "desatualizada": "►", "aguardando": "…"}[valor]
+            print(f"   {marcador} {nome:<30} {valor}")
+    elif not arquivos:
+        print(f"⚠️  Nenhum arquivo .txt encontrado em {main.DATA_DIR}")
+    else:
+        with instrumentacao.sessao("pipeline", perfil_cprofile=args.profile):
+            workers = max(1, args.workers)
+            print(f"🔗 Pipeline: {len(arquivos)} estação(ões), {len(tarefas)} tarefas, {workers} processo(s)\n")
+            executadas, puladas, falhas = executar_pipeline(tarefas, estado, workers, args.forcar, perfil)
+            print(f"\n✅ {len(executadas)} executadas | {len(puladas)} atualizadas (puladas) | {len(falhas)} com falha")
+        if falhas:
+            exit(1)
@@ -0,0 +1,444 @@
+"""
+Preenchimento de falhas das estações a partir das estações vizinhas.
+
+Trabalha sobre o painel (painel.py), na escala diária ou mensal, com todas as
+estações de uma vez:
+
+1. climatologia de cada estação (média por mês do ano) e, sobre as anomalias
+   (valor - climatologia do mês), as estatísticas de cada par de estações
+   (sobreposição, correlação e regressão linear), calculadas só nos dias/meses
+   em que as duas têm dado, com alguns produtos de matrizes por bloco de
+   linhas. Sem tirar o ciclo sazonal, que é comum a toda a região, estações sem
+   relação pareceriam correlacionadas. Ficam guardadas em
+   <painel>/vizinhos_<escala>.npz e só são refeitas quando o painel muda;
+2. para cada estação, os N_VIZINHOS mais correlacionados que passam por
+   R_MINIMO e SOBREPOSICAO_MINIMA;
+3. a estimativa de cada falha é a climatologia da estação naquele mês mais a
+   média ponderada das anomalias estimadas pelos vizinhos com dado naquela
+   linha, calculada para a matriz inteira, um vizinho por vez:
+   - media_regional: anomalia do vizinho, pesos iguais;
+   - idw: anomalia do vizinho com peso 1 / distância^POTENCIA_IDW. Sem
+     coordenadas, a distância é a de correlação, sqrt(2 (1 - r));
+   - regressao: a + b x anomalia do vizinho (regressão das anomalias da
+     estação nas do vizinho), com peso r².
+
+Só as falhas dentro do período da estação (do primeiro ao último dado) são
+preenchidas; na escala mensal, os meses incompletos (calendario.py) também são
+tratados como falha. A máscara `bandeira` indica a origem de cada valor
+(BANDEIRA_*).
+
+Saída (na pasta do painel): preenchido_<escala>.npy, bandeira_<escala>.npy e
+preenchimento_<escala>.json (método, parâmetros, vizinhos e contagens por estação).
+
+Uso:
+    python preenchimento.py [--painel output/painel] [--escala mensal] [--metodo regressao]
+                            [--coordenadas coordenadas.json]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+import instrumentacao
+from calendario import LIMIAR_COMPLETUDE
+from painel import PAINEL_DIR, Painel, gravar_matriz
+
+# ===============================
+# CONFIGURAÇÕES
+# ===============================
+ESCALAS = ["diario", "mensal"]
+METODOS = ["media_regional", "idw", "regressao"]
+
+N_VIZINHOS = 5
+# Correlação e linhas em comum mínimas para um vizinho ser usado
+R_MINIMO = {"diario": 0.3, "mensal": 0.6}
+SOBREPOSICAO_MINIMA = {"diario": 365, "mensal": 36}
+POTENCIA_IDW = 2.0
+DISTANCIA_MINIMA = 1e-6
+
+# Linhas do painel processadas por vez (limita a memória com muitas estações)
+LINHAS_POR_BLOCO = 8192
+
+# Origem de cada valor da matriz preenchida
+BANDEIRA_OBSERVADO = 0
+BANDEIRA_PREENCHIDO = 1
+BANDEIRA_SEM_VIZINHO = 2     # falha sem nenhum vizinho com dado
+BANDEIRA_FORA_PERIODO = 3    # antes do primeiro ou depois do último dado da estação
+
+RAIO_TERRA_KM = 6371.0
+
+# Incrementar quando o conteúdo de vizinhos_<escala>.npz mudar
+VERSAO_VIZINHOS = 2
+
+
+@dataclass
+class Preenchimento:
+    """Resultado de `preencher`: matrizes linhas x estações do painel na escala escolhida."""
+    escala: str
+    metodo: str
+    valores: np.ndarray      # observados + preenchidos (NaN onde não foi possível)
+    bandeira: np.ndarray     # int8, BANDEIRA_*
+    vizinhos: np.ndarray     # estações x N_VIZINHOS (índices das colunas; -1 = sem vizinho)
+    pesos: np.ndarray        # peso de cada vizinho (0 = não usado)
+
+    def contagem(self):
+        """Número de linhas de cada bandeira por estação: matriz estações x 4."""
+        return np.stack([(self.bandeira == b).sum(axis=0) for b in range(4)], axis=1)
+
+# ===============================
+# MATRIZ DA ESCALA
+# ===============================
+def _matriz_escala(painel, escala, limiar):
+    """
+    Matriz (memmap) da escala, mês do ano (0-11) de cada linha e função que dá
+    a máscara de linhas válidas de um bloco.
+    """
+    if escala == "diario":
+        meses = painel.datas.astype("datetime64[M]").astype(np.int64) % 12
+        return painel.diario, meses, lambda inicio, fim, bloco: ~np.isnan(bloco)
+    completo = painel.completude(limiar)
+    meses = painel.periodos.astype(np.int64) % 12
+    return painel.mensal, meses, lambda inicio, fim, bloco: ~np.isnan(bloco) & completo[inicio:fim]
+
+def _blocos(n_linhas, linhas_por_bloco=LINHAS_POR_BLOCO):
+    for inicio in range(0, n_linhas, linhas_por_bloco):
+        yield inicio, min(inicio + linhas_por_bloco, n_linhas)
+
+# ===============================
+# ESTATÍSTICAS DOS PARES DE ESTAÇÕES
+# ===============================
+def climatologia(matriz, meses, validos, linhas_por_bloco=LINHAS_POR_BLOCO):
+    """Média de cada coluna por mês do ano (12 x estações; NaN nos meses sem dado)."""
+    soma = np.zeros((12, matriz.shape[1]))
+    contagem = np.zeros_like(soma)
+    for inicio, fim in _blocos(matriz.shape[0], linhas_por_bloco):
+        bloco = np.asarray(matriz[inicio:fim], dtype=np.float64)
+        presente = validos(inicio, fim, bloco)
+        mes = (meses[inicio:fim, None] == np.arange(12)).astype(np.float64)
+        soma += mes.T @ np.where(presente, bloco, 0.0)
+        contagem += mes.T @ presente
+    with np.errstate(invalid="ignore"):
+        return soma / contagem
+
+def estatisticas_pares(matriz, meses, validos, linhas_por_bloco=LINHAS_POR_BLOCO):
+    """
+    Estatísticas de cada par (i, j) de colunas sobre as anomalias, nas linhas em que as duas têm dado.
+
+    `meses` é o mês do ano (0-11) de cada linha e `validos(inicio, fim, bloco)`
+    dá a máscara das linhas válidas do bloco. A anomalia é o valor menos a
+    climatologia da coluna no mês. Retorna dict com climatologia (12 x
+    estações) e matrizes estações x estações: n (linhas em comum), r
+    (correlação) e a e b (regressão z_i = a + b z_j das anomalias). As somas vêm
+    de produtos de matrizes, acumulados bloco a bloco.
+    """
+    normais = climatologia(matriz, meses, validos, linhas_por_bloco)
+    n_estacoes = matriz.shape[1]
+    n = np.zeros((n_estacoes, n_estacoes))
+    soma = np.zeros_like(n)        # soma[i, j] = soma de z_i nas linhas em comum com j
+    soma_quad = np.zeros_like(n)
+    soma_prod = np.zeros_like(n)
+
+    for inicio, fim in _blocos(matriz.shape[0], linhas_por_bloco):
+        bloco = np.asarray(matriz[inicio:fim], dtype=np.float64)
+        presente = validos(inicio, fim, bloco)
+        z = np.where(presente, bloco - normais[meses[inicio:fim]], 0.0)
+        presente = presente.astype(np.float64)
+        n += presente.T @ presente
+        soma += z.T @ presente
+        soma_quad += (z * z).T @ presente
+        soma_prod += z.T @ z
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        media_i = soma / n
+        media_j = media_i.T
+        covariancia = soma_prod / n - media_i * media_j
+        variancia_i = soma_quad / n - media_i ** 2
+        variancia_j = variancia_i.T
+        r = covariancia / np.sqrt(variancia_i * variancia_j)
+        b = covariancia / variancia_j
+        a = media_i - b * media_j
+
+    return {"climatologia": normais, "n": n, "r": r, "a": a, "b": b}
+
+def _chave_vizinhos(painel, escala, limiar):
+    cabecalho = {
+        "versao": VERSAO_VIZINHOS,
+        "escala": escala,
+        "limiar": limiar if escala == "mensal" else None,
+        "estacoes": [e["chave"] for e in painel.estacoes],
+    }
+    return hashlib.sha256(json.dumps(cabecalho, sort_keys=True).encode("utf-8")).hexdigest()[:32]
+
+def estatisticas_vizinhos(painel, escala="mensal", limiar=LIMIAR_COMPLETUDE):
+    """
+    estatisticas_pares da escala, lidas de <painel>/vizinhos_<escala>.npz quando o
+    painel (e o limiar de completude) não mudou; senão calculadas e gravadas.
+    """
+    arquivo = painel.pasta / f"vizinhos_{escala}.npz"
+    chave = _chave_vizinhos(painel, escala, limiar)
+    try:
+        with np.load(arquivo) as salvo:
+            if str(salvo["chave"]) == chave:
+                return {nome: salvo[nome] for nome in ("climatologia", "n", "r", "a", "b")}
+    except (OSError, KeyError, ValueError):
+        pass
+
+    matriz, meses, validos = _matriz_escala(painel, escala, limiar)
+    with instrumentacao.medir("estatisticas_pares"):
+        estatisticas = estatisticas_pares(matriz, meses, validos)
+    temporario = arquivo.with_name(f".{arquivo.name}.{os.getpid()}.tmp")
+    with open(temporario, "wb") as f:
+        np.savez(f, chave=chave, **estatisticas)
+    os.replace(temporario, arquivo)
+    return estatisticas
+
+# ===============================
+# VIZINHOS E PESOS
+# ===============================
+def selecionar_vizinhos(estatisticas, n_vizinhos=N_VIZINHOS, r_minimo=0.0, sobreposicao_minima=0):
+    """
+    Os `n_vizinhos` mais correlacionados de cada estação (estações x n_vizinhos).
+
+    Retorna (vizinhos, usar): índices das colunas e máscara dos que passam por
+    r_minimo e sobreposicao_minima (onde usar é False o índice é -1).
+    """
+    r = estatisticas["r"]
+    candidato = (estatisticas["n"] >= sobreposicao_minima) & (r >= r_minimo)
+    np.fill_diagonal(candidato, False)
+    ordem_r = np.where(candidato, r, -np.inf)
+    n_vizinhos = min(n_vizinhos, max(r.shape[0] - 1, 0))
+    vizinhos = np.argsort(-ordem_r, axis=1, kind="stable")[:, :n_vizinhos]
+    usar = np.take_along_axis(candidato, vizinhos, axis=1)
+    return np.where(usar, vizinhos, -1), usar
+
+def distancias_km(coordenadas):
+    """Distâncias (km) entre todas as estações pela fórmula de haversine; coordenadas: estações x (lat, lon) em graus."""
+    lat, lon = np.radians(np.asarray(coordenadas, dtype=float)).T
+    dlat = lat[:, None] - lat[None, :]
+    dlon = lon[:, None] - lon[None, :]
+    h = np.sin(dlat / 2) ** 2 + np.cos(lat[:, None]) * np.cos(lat[None, :]) * np.sin(dlon / 2) ** 2
+    return 2 * RAIO_TERRA_KM * np.arcsin(np.sqrt(np.clip(h, 0.0, 1.0)))
+
+def ler_coordenadas(arquivo, painel):
+    """
+    Coordenadas das estações do painel, na ordem das colunas, de um JSON
+    {estação ou pasta: [lat, lon]}.
+    """
+    dados = json.loads(Path(arquivo).read_text(encoding="utf-8"))
+    coordenadas, faltando = [], []
+    for estacao in painel.estacoes:
+        valor = dados.get(estacao["nome"], dados.get(estacao["pasta"]))
+        if valor is None:
+            faltando.append(estacao["nome"])
+        coordenadas.append(valor)
+    if faltando:
+        raise ValueError(f"Sem coordenadas em {arquivo}: {', '.join(faltando)}")
+    return np.array(coordenadas, dtype=float)
+
+def pesos_vizinhos(metodo, estatisticas, vizinhos, usar, distancias=None, potencia=POTENCIA_IDW):
+    """Peso de cada vizinho (estações x n_vizinhos); 0 onde o vizinho não é usado."""
+    linhas = np.arange(len(vizinhos))[:, None]
+    colunas = np.maximum(vizinhos, 0)
+    if metodo == "media_regional":
+        pesos = np.ones(vizinhos.shape)
+    elif metodo == "idw":
+        if distancias is None:
+            # Distância de correlação: 0 para r = 1, sqrt(2) para r = 0
+            distancias = np.sqrt(2.0 * np.clip(1.0 - estatisticas["r"], 0.0, None))
+        pesos = 1.0 / np.maximum(distancias[linhas, colunas], DISTANCIA_MINIMA) ** potencia
+    elif metodo == "regressao":
+        pesos = estatisticas["r"][linhas, colunas] ** 2
+    else:
+        raise ValueError(f"Método inválido: {metodo!r} (use {', '.join(METODOS)})")
+    return np.where(usar, pesos, 0.0)
+
+# ===============================
+# PREENCHIMENTO
+# ===============================
+def _anomalias_estimadas(metodo, anomalia_vizinho, a, b):
+    """Anomalia da estação estimada a partir da anomalia do vizinho (colunas alinhadas às estações)."""
+    if metodo == "regressao":
+        return a + b * anomalia_vizinho
+    return anomalia_vizinho
+
+def _periodos_estacoes(matriz, validos, linhas_por_bloco=LINHAS_POR_BLOCO):
+    """Primeira e última linha com dado de cada coluna (-1 e -2 se não há nenhuma)."""
+    primeira = np.full(matriz.shape[1], -1)
+    ultima = np.full(matriz.shape[1], -2)
+    for inicio, fim in _blocos(matriz.shape[0], linhas_por_bloco):
+        bloco = np.asarray(matriz[inicio:fim])
+        presente = validos(inicio, fim, bloco)
+        tem = presente.any(axis=0)
+        primeira = np.where((primeira < 0) & tem, inicio + presente.argmax(axis=0), primeira)
+        ultima = np.where(tem, fim - 1 - presente[::-1].argmax(axis=0), ultima)
+    return primeira, ultima
+
+def preencher(painel, escala="mensal", metodo="regressao", n_vizinhos=N_VIZINHOS, r_minimo=None,
+              sobreposicao_minima=None, coordenadas=None, limiar=LIMIAR_COMPLETUDE,
+              linhas_por_bloco=LINHAS_POR_BLOCO):
+    """
+    Preenche as falhas de todas as estações do painel na `escala` com o `metodo` escolhido.
+
+    `coordenadas` (estações x (lat, lon)) só é usado por idw. r_minimo e
+    sobreposicao_minima têm padrão por escala (R_MINIMO, SOBREPOSICAO_MINIMA).
+    """
+    if escala not in ESCALAS:
+        raise ValueError(f"Escala inválida: {escala!r} (use {', '.join(ESCALAS)})")
+    if metodo not in METODOS:
+        raise ValueError(f"Método inválido: {metodo!r} (use {', '.join(METODOS)})")
+    r_minimo = R_MINIMO[escala] if r_minimo is None else r_minimo
+    sobreposicao_minima = SOBREPOSICAO_MINIMA[escala] if sobreposicao_minima is None else sobreposicao_minima
+
+    estatisticas = estatisticas_vizinhos(painel, escala, limiar)
+    vizinhos, usar = selecionar_vizinhos(estatisticas, n_vizinhos, r_minimo, sobreposicao_minima)
+    distancias = distancias_km(coordenadas) if coordenadas is not None and metodo == "idw" else None
+    pesos = pesos_vizinhos(metodo, estatisticas, vizinhos, usar, distancias)
+
+    matriz, meses, validos = _matriz_escala(painel, escala, limiar)
+    primeira, ultima = _periodos_estacoes(matriz, validos, linhas_por_bloco)
+    estacoes = np.arange(matriz.shape[1])
+    colunas = np.maximum(vizinhos, 0)
+    a, b = (estatisticas[nome][estacoes[:, None], colunas] for nome in ("a", "b"))
+    normais = estatisticas["climatologia"]
+
+    preenchido = np.full(matriz.shape, np.nan, dtype=matriz.dtype)
+    bandeira = np.full(matriz.shape, BANDEIRA_FORA_PERIODO, dtype=np.int8)
+    with instrumentacao.medir("preenchimento"):
+        for inicio, fim in _blocos(matriz.shape[0], linhas_por_bloco):
+            bloco = np.asarray(matriz[inicio:fim], dtype=np.float64)
+            presente = validos(inicio, fim, bloco)
+
+            normal = normais[meses[inicio:fim]]
+            anomalia = bloco - normal
+
+            # Média ponderada das anomalias estimadas pelos vizinhos, um vizinho (k) por vez para todas as estações
+            soma = np.zeros(bloco.shape)
+            soma_pesos = np.zeros(bloco.shape)
+            for k in range(vizinhos.shape[1]):
+                usado = presente[:, colunas[:, k]] & usar[:, k]
+                estimativa = _anomalias_estimadas(metodo, anomalia[:, colunas[:, k]], a[:, k], b[:, k])
+                soma += np.where(usado, pesos[:, k] * estimativa, 0.0)
+                soma_pesos += np.where(usado, pesos[:, k], 0.0)
+
+            linhas = np.arange(inicio, fim)[:, None]
+            dentro = (linhas >= primeira) & (linhas <= ultima)
+            falha = dentro & ~presente
+            # Sem climatologia da estação no mês não há a que somar a anomalia
+            com_vizinho = falha & (soma_pesos > 0) & ~np.isnan(normal)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                # Climatologia da estação de volta (precipitação não é negativa)
+                estimado = np.maximum(normal + soma / soma_pesos, 0.0)
+            preenchido[inicio:fim] = np.where(presente, bloco, np.where(com_vizinho, estimado, np.nan))
+            bandeira[inicio:fim][presente] = BANDEIRA_OBSERVADO
+            bandeira[inicio:fim][com_vizinho] = BANDEIRA_PREENCHIDO
+            bandeira[inicio:fim][falha & ~com_vizinho] = BANDEIRA_SEM_VIZINHO
+
+    return Preenchimento(escala, metodo, preenchido, bandeira, vizinhos, pesos)
+
+# ===============================
+# GRAVAÇÃO E LEITURA
+# ===============================
+def gravar_preenchimento(preenchimento, painel, parametros=None):
+    """Grava preenchido_<escala>.npy, bandeira_<escala>.npy e preenchimento_<escala>.json na pasta do painel."""
+    escala = preenchimento.escala
+    gravar_matriz(painel.pasta / f"preenchido_{escala}.npy", preenchimento.valores)
+    gravar_matriz(painel.pasta / f"bandeira_{escala}.npy", preenchimento.bandeira)
+
+    contagem = preenchimento.contagem()
+    estacoes = []
+    for j, estacao in enumerate(painel.estacoes):
+        usados = preenchimento.vizinhos[j][preenchimento.vizinhos[j] >= 0]
+        estacoes.append({
+            "nome": estacao["nome"],
+            "pasta": estacao["pasta"],
+            "vizinhos": [painel.estacoes[v]["nome"] for v in usados],
+            "pesos": [float(p) for p in preenchimento.pesos[j][preenchimento.vizinhos[j] >= 0]],
+            "observados": int(contagem[j, BANDEIRA_OBSERVADO]),
+            "preenchidos": int(contagem[j, BANDEIRA_PREENCHIDO]),
+            "sem_vizinho": int(contagem[j, BANDEIRA_SEM_VIZINHO]),
+        })
+    indice = {
+        "escala": escala,
+        "metodo": preenchimento.metodo,
+        "parametros": parametros or {},
+        "chave_painel": [e["chave"] for e in painel.estacoes],
+        "estacoes": estacoes,
+    }
+    destino = painel.pasta / f"preenchimento_{escala}.json"
+    temporario = destino.with_name(f".{destino.name}.{os.getpid()}.tmp")
+    temporario.write_text(json.dumps(indice, ensure_ascii=False, indent=1), encoding="utf-8")
+    os.replace(temporario, destino)
+    return destino
+
+def abrir_preenchimento(painel, escala="mensal"):
+    """
+    (valores, bandeira, índice) gravados por gravar_preenchimento (matrizes em
+    memmap); None se não existem ou se o painel mudou desde então.
+    """
+    destino = painel.pasta / f"preenchimento_{escala}.json"
+    if not destino.exists():
+        return None
+    indice = json.loads(destino.read_text(encoding="utf-8"))
+    if indice["chave_painel"] != [e["chave"] for e in painel.estacoes]:
+        return None
+    valores = np.load(painel.pasta / f"preenchido_{escala}.npy", mmap_mode="r")
+    bandeira = np.load(painel.pasta / f"bandeira_{escala}.npy", mmap_mode="r")
+    return valores, bandeira, indice
+
+# ===============================
+# EXECUÇÃO PRINCIPAL
+# ===============================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Preenche as falhas das estações do painel com as estações vizinhas")
+    parser.add_argument("--painel", type=Path, default=PAINEL_DIR,
+                        help="pasta do painel, montado por painel.py (padrão: %(default)s)")
+    parser.add_argument("--escala", choices=ESCALAS, default="mensal",
+                        help="escala preenchida (padrão: %(default)s)")
+    parser.add_argument("--metodo", choices=METODOS, default="regressao",
+                        help="método de estimativa (padrão: %(default)s)")
+    parser.add_argument("--vizinhos", type=int, default=N_VIZINHOS,
+                        help="vizinhos por estação (padrão: %(default)d)")
+    parser.add_argument("--r-minimo", type=float, default=None,
+                        help="correlação mínima com o vizinho (padrão: %s)" %
+                             ", ".join(f"{e} {r}" for e, r in R_MINIMO.items()))
+    parser.add_argument("--coordenadas", type=Path, default=None,
+                        help="JSON {estação: [lat, lon]} para o idw (sem ele, distância de correlação)")
+    parser.add_argument("--limiar", type=float, default=LIMIAR_COMPLETUDE,
+                        help="completude mínima de um mês observado, na escala mensal (padrão: %(default)s)")
+    parser.add_argument("--profile", action="store_true",
+                        help="grava o cProfile do processo em output/execucoes/preenchimento.prof")
+    args = parser.parse_args()
+
+    print("\n" + "="*70)
+    print("🧩 PREENCHIMENTO DE FALHAS COM ESTAÇÕES VIZINHAS")
+    print("="*70)
+
+    with instrumentacao.sessao("preenchimento", perfil_cprofile=args.profile):
+        painel = Painel.abrir(args.painel)
+        coordenadas = ler_coordenadas(args.coordenadas, painel) if args.coordenadas else None
+        if args.metodo == "idw" and coordenadas is None:
+            print("ℹ️  Sem --coordenadas: o idw usa a distância de correlação entre as estações")
+
+        resultado = preencher(painel, args.escala, args.metodo, n_vizinhos=args.vizinhos,
+                              r_minimo=args.r_minimo, coordenadas=coordenadas, limiar=args.limiar)
+        with instrumentacao.medir("gravacao"):
+            destino = gravar_preenchimento(resultado, painel, {
+                "vizinhos": args.vizinhos,
+                "r_minimo": args.r_minimo if args.r_minimo is not None else R_MINIMO[args.escala],
+                "limiar": args.limiar,
+                "coordenadas": str(args.coordenadas) if args.coordenadas else None,
+            })
+
+        contagem = resultado.contagem()
+        print(f"\n📊 {len(painel.estacoes)} estação(ões) | escala {args.escala} | método {args.metodo}\n")
+        for j, nome in enumerate(painel.nomes):
+            falhas = contagem[j, BANDEIRA_PREENCHIDO] + contagem[j, BANDEIRA_SEM_VIZINHO]
+            print(f"✓ {nome}: {contagem[j, BANDEIRA_PREENCHIDO]} de {falhas} falhas preenchidas "
+                  f"({np.count_nonzero(resultado.vizinhos[j] >= 0)} vizinhos)")
+        print(f"\n✓ Resultado salvo: {destino}")
+        print("="*70)
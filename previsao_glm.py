@@ -0,0 +1,212 @@
+"""
+Previsão dos próximos meses com os GLM de glm_predicao.py.
+
+O GLM usa a precipitação defasada (precip_lag1, ...) como variável, então só
+prevê meses cuja defasagem já foi observada. Aqui a previsão avança de forma
+recursiva: no passo j, a defasagem que cai dentro do horizonte é a previsão do
+passo anterior.
+
+- Todas as estações de uma família avançam juntas: X dos meses futuros é um
+  array (estações x horizonte x k) e cada passo é um único produto em lote.
+- Sem simulação, a defasagem recebe a média prevista (previsão pontual).
+- Com `simulacoes` > 0, cada estação tem `simulacoes` trajetórias: em cada passo
+  sorteia-se o valor do mês (ruído Gamma com a dispersão do ajuste, ou normal na
+  Gaussiana) e ele entra como defasagem do passo seguinte. As trajetórias dão a
+  distribuição preditiva de cada mês. Na Gamma, uma trajetória cuja média
+  prevista chega a <= 0 é interrompida; a coluna `invalidas` conta essas
+  trajetórias em cada horizonte e as estatísticas usam só as demais.
+
+Saída: tabela longa (uma linha por estação, distribuição e horizonte) em
+output/graficos/GLM_Predicoes/previsoes_glm.csv, pronta para o planejamento
+dos reservatórios.
+
+Uso:
+    python previsao_glm.py [--painel] [--horizonte 12] [--simulacoes 1000] [--workers 4]
+"""
+
+import argparse
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from glm_predicao import ESTACOES, FAMILIAS, GLM_DIR, ajustar_modelos
+from irls import FAMILIAS as FAMILIAS_IRLS
+from irls import LIGACOES
+from matriz_desenho import SAZONALIDADES, EspecificacaoDesenho, construir_futuro
+from painel import PAINEL_DIR, Painel
+
+warnings.filterwarnings('ignore')
+
+# ===============================
+# CONFIGURAÇÕES
+# ===============================
+HORIZONTE = 12                  # meses à frente
+SIMULACOES = 1000               # trajetórias com --simulacoes sem valor
+QUANTIS = (0.05, 0.5, 0.95)
+SEMENTE = 42
+
+ARQUIVO_PREVISOES = GLM_DIR / "previsoes_glm.csv"
+
+
+def escala_pearson(dados, params, familia):
+    """Dispersão de Pearson do ajuste no treino: sum (y - mu)^2 / V(mu) / (n - k)."""
+    X_treino, _, y_treino, _ = dados
+    variancia = FAMILIAS_IRLS[familia][0]
+    inversa = LIGACOES[FAMILIAS_IRLS[familia][2]][1]
+    mu = inversa(X_treino.to_numpy() @ params)
+    y = y_treino.to_numpy()
+    return float(np.sum((y - mu) ** 2 / variancia(mu)) / (len(y) - len(params)))
+
+def trajetorias(X_futuro, params, familia, defasagens, colunas_defasagem, simulacoes=0, escala=None, rng=None):
+    """
+    Previsão recursiva de S modelos da mesma família: retorna (S, P, horizonte).
+
+    X_futuro (S, horizonte, k) vem de construir_futuro (defasagens a prever em
+    NaN), params (S, k) e `colunas_defasagem` é a coluna de cada defasagem em X.
+    Com simulacoes=0, P = 1 e a trajetória é a das médias previstas; senão P =
+    simulacoes trajetórias com ruído da família, de dispersão `escala` (S,).
+    """
+    S, horizonte, _ = X_futuro.shape
+    inversa = LIGACOES[FAMILIAS_IRLS[familia][2]][1]
+    P = max(1, simulacoes)
+    valores = np.full((S, P, horizonte), np.nan)
+    if simulacoes:
+        rng = rng if rng is not None else np.random.default_rng(SEMENTE)
+        escala = np.asarray(escala, dtype=float)[:, None]
+
+    for j in range(horizonte):
+        x = np.repeat(X_futuro[:, None, j, :], P, axis=1)
+        for k, coluna in zip(defasagens, colunas_defasagem):
+            if j >= k:
+                x[:, :, coluna] = valores[:, :, j - k]
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            mu = inversa(np.einsum("spk,sk->sp", x, params))
+        if not simulacoes:
+            valores[:, :, j] = mu
+        elif familia == 'gamma':
+            # Gamma de média mu e variância escala * mu^2; média inválida (<= 0) interrompe a trajetória
+            valida = mu > 0
+            forma = np.broadcast_to(1.0 / escala, mu.shape)
+            valores[:, :, j] = np.where(valida, rng.gamma(forma, np.where(valida, mu, 1.0) * escala), np.nan)
+        else:
+            # Precipitação não é negativa
+            valores[:, :, j] = np.maximum(mu + rng.standard_normal(mu.shape) * np.sqrt(escala), 0.0)
+
+    return valores
+
+def prever_modelos(series, ajustes, horizonte=HORIZONTE, desenho=None, simulacoes=0, quantis=QUANTIS,
+                   semente=SEMENTE, log=print):
+    """
+    Previsões dos `horizonte` meses seguintes de todos os modelos de `ajustes`.
+
+    `series` e `ajustes` são os de glm_predicao.ajustar_modelos, ajustados com a
+    mesma especificação `desenho`. Retorna a tabela longa com Estação,
+    Distribuição, horizonte, periodo e previsto (recursão das médias) e, com
+    simulações, invalidas (trajetórias interrompidas até o horizonte), media,
+    desvio e os `quantis` das trajetórias válidas (colunas q5, q50, ...).
+    Estações com trajetórias inválidas são avisadas por `log`.
+    """
+    desenho = desenho or EspecificacaoDesenho()
+    colunas_defasagem = [desenho.colunas.index(f"precip_lag{k}") for k in desenho.defasagens]
+    rng = np.random.default_rng(semente)
+    partes = []
+
+    for familia in FAMILIAS:
+        nomes = [nome for nome in series if ajustes.get((nome, familia), (None,))[0] is not None]
+        if not nomes:
+            continue
+        params = np.array([np.asarray(ajustes[(nome, familia)][0].params, dtype=float) for nome in nomes])
+        futuros = [construir_futuro(series[nome], horizonte, desenho) for nome in nomes]
+        X_futuro = np.stack([X for X, _ in futuros])
+
+        previsto = trajetorias(X_futuro, params, familia, desenho.defasagens, colunas_defasagem)[:, 0, :]
+        tabela = pd.DataFrame({
+            "Estação": np.repeat(nomes, horizonte),
+            "Distribuição": familia.capitalize(),
+            "horizonte": np.tile(np.arange(1, horizonte + 1), len(nomes)),
+            "periodo": np.concatenate([periodos for _, periodos in futuros]),
+            "previsto": previsto.ravel(),
+        })
+
+        if simulacoes:
+            escala = [escala_pearson(ajustes[(nome, familia)][1], linha, familia) for nome, linha in zip(nomes, params)]
+            simulado = trajetorias(X_futuro, params, familia, desenho.defasagens, colunas_defasagem,
+                                   simulacoes, escala, rng)
+            invalidas = np.isnan(simulado).sum(axis=1)
+            tabela["invalidas"] = invalidas.ravel()
+            for nome, contagem in zip(nomes, invalidas):
+                if contagem.any():
+                    h = int(np.argmax(contagem > 0)) + 1
+                    log(f"⚠️  {nome} ({familia.capitalize()}): {contagem[-1]} de {simulacoes} trajetórias "
+                        f"inválidas (média <= 0) a partir do horizonte {h}; media, desvio e quantis "
+                        f"usam só as válidas")
+            tabela["media"] = np.nanmean(simulado, axis=1).ravel()
+            tabela["desvio"] = np.nanstd(simulado, axis=1).ravel()
+            for q, valores in zip(quantis, np.nanquantile(simulado, quantis, axis=1)):
+                tabela[f"q{100 * q:g}"] = valores.ravel()
+        partes.append(tabela)
+
+    if not partes:
+        raise ValueError("Nenhum modelo ajustado para prever")
+    return pd.concat(partes, ignore_index=True)
+
+# ===============================
+# EXECUÇÃO PRINCIPAL
+# ===============================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Previsão recursiva dos próximos meses com os GLM")
+    parser.add_argument("--painel", nargs="?", type=Path, const=PAINEL_DIR, default=None,
+                        help="lê as séries do painel (padrão: %(const)s) em vez das séries de main.py")
+    parser.add_argument("--horizonte", type=int, default=HORIZONTE,
+                        help="meses à frente (padrão: %(default)d)")
+    parser.add_argument("--simulacoes", type=int, nargs="?", const=SIMULACOES, default=0,
+                        help=f"trajetórias de Monte Carlo por estação (sem valor: {SIMULACOES})")
+    parser.add_argument("--quantis", type=float, nargs="+", default=list(QUANTIS),
+                        help="quantis das trajetórias simuladas (padrão: 0.05 0.5 0.95)")
+    parser.add_argument("--semente", type=int, default=SEMENTE,
+                        help="semente da simulação (padrão: %(default)d)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="processos em paralelo no ajuste dos modelos (padrão: 1)")
+    parser.add_argument("--reajustar", action="store_true",
+                        help="ignora os modelos salvos em output/cache/modelos/ e ajusta tudo de novo")
+    parser.add_argument("--sazonalidade", choices=SAZONALIDADES, default="inteiro",
+                        help="codificação do mês, como em glm_predicao.py (padrão: %(default)s)")
+    parser.add_argument("--harmonicos", type=int, default=1,
+                        help="pares seno/cosseno com --sazonalidade harmonicos (padrão: %(default)d)")
+    parser.add_argument("--defasagens", type=int, nargs="+", default=[1],
+                        help="defasagens da precipitação usadas como variáveis (padrão: 1)")
+    parser.add_argument("--tendencia", type=int, default=1,
+                        help="grau da tendência polinomial em t (padrão: %(default)d)")
+    args = parser.parse_args()
+
+    print("\n" + "="*70)
+    print("🔮 PREVISÃO RECURSIVA - GLM MENSAL")
+    print("="*70)
+
+    painel = Painel.abrir(args.painel) if args.painel else None
+    estacoes = ESTACOES if painel is None else {e["nome"]: e["pasta"] for e in painel.estacoes}
+    desenho = EspecificacaoDesenho(
+        defasagens=tuple(args.defasagens),
+        sazonalidade=args.sazonalidade,
+        harmonicos=args.harmonicos,
+        tendencia=args.tendencia,
+    )
+    print(f"\n📊 Variáveis: {', '.join(desenho.colunas)}")
+    series, ajustes = ajustar_modelos(estacoes, painel, workers=args.workers,
+                                      usar_salvos=not args.reajustar, desenho=desenho)
+    print(f"   ✓ {len(series)} estação(ões), {len(ajustes)} modelos\n")
+
+    previsoes = prever_modelos(series, ajustes, horizonte=args.horizonte, desenho=desenho,
+                               simulacoes=args.simulacoes, quantis=args.quantis, semente=args.semente)
+    GLM_DIR.mkdir(parents=True, exist_ok=True)
+    previsoes.to_csv(ARQUIVO_PREVISOES, index=False)
+
+    simulacao = f", {args.simulacoes} trajetórias por estação" if args.simulacoes else ""
+    print(f"✓ {args.horizonte} meses à frente{simulacao}")
+    print(f"✓ Tabela salva: {ARQUIVO_PREVISOES}\n")
+    coluna = "media" if args.simulacoes else "previsto"
+    print(previsoes.pivot_table(index=["Estação", "Distribuição"], columns="horizonte", values=coluna,
+                                sort=False).round(1).to_string())
+    print("\n" + "="*70)
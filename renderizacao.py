@@ -0,0 +1,226 @@
+"""
+Renderização de figuras: perfis de saída, fila de tarefas e reaproveitamento de PNG.
+
+- Perfis: "publicacao" (padrão, 300 dpi com bbox justo) e "preview" (baixa
+  resolução, sem bbox justo) para execuções interativas.
+- Fila: as funções de gráfico são enfileiradas como tarefas e executadas em
+  sequência ou num pool de processos.
+- Cada gráfico renderizado é uma etapa "grafico:<função>" da instrumentação,
+  também quando roda num worker.
+- Reaproveitamento: cada tarefa tem um hash dos dados de entrada, do código da
+  função, do perfil e do estilo (rcParams). Se os PNG de saída existem e o hash
+  é o mesmo da última execução, a tarefa é pulada.
+"""
+
+import hashlib
+import inspect
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import fields, is_dataclass
+from pathlib import Path
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+import instrumentacao
+
+# ===============================
+# PERFIS DE SAÍDA
+# ===============================
+PERFIS = {
+    "publicacao": {"dpi": 300, "bbox_inches": "tight"},
+    "preview": {"dpi": 72, "bbox_inches": None},
+}
+
+# Manifesto com o hash de cada PNG, um por pasta de saída
+NOME_MANIFESTO = ".renderizacao.json"
+
+_perfil_atual = "publicacao"
+
+def definir_perfil(nome):
+    """Seleciona o perfil de saída usado por salvar_figura (e pelo dpi das figuras)."""
+    global _perfil_atual
+    if nome not in PERFIS:
+        raise ValueError(f"Perfil inválido: {nome!r} (use {', '.join(PERFIS)})")
+    _perfil_atual = nome
+    plt.rcParams["figure.dpi"] = PERFIS[nome]["dpi"]
+    plt.rcParams["savefig.dpi"] = PERFIS[nome]["dpi"]
+
+def perfil_atual():
+    """Nome do perfil de saída em uso."""
+    return _perfil_atual
+
+@instrumentacao.medido()
+def salvar_figura(caminho, fig=None):
+    """Salva a figura (ou a figura corrente) com o perfil atual e a fecha."""
+    fig = plt.gcf() if fig is None else fig
+    fig.savefig(caminho, **PERFIS[_perfil_atual])
+    plt.close(fig)
+
+# ===============================
+# FILA DE RENDERIZAÇÃO
+# ===============================
+def _atualizar_hash(h, obj):
+    """
+    Acrescenta ao hash o conteúdo de `obj` de forma canônica.
+
+    DataFrames, Series e arrays entram pelo conteúdo e tipos (não pelo pickle,
+    que varia com detalhes internos de layout); contêineres são percorridos.
+    """
+    if isinstance(obj, pd.DataFrame):
+        h.update(repr(([str(n) for n in obj.columns], [str(t) for t in obj.dtypes])).encode("utf-8"))
+        h.update(pd.util.hash_pandas_object(obj, index=True).to_numpy().tobytes())
+    elif isinstance(obj, pd.Series):
+        h.update(repr((str(obj.name), str(obj.dtype))).encode("utf-8"))
+        h.update(pd.util.hash_pandas_object(obj, index=True).to_numpy().tobytes())
+    elif isinstance(obj, np.ndarray):
+        h.update(repr((obj.dtype.str, obj.shape)).encode("utf-8"))
+        h.update(np.ascontiguousarray(obj).tobytes())
+    elif is_dataclass(obj) and not isinstance(obj, type):
+        h.update(type(obj).__qualname__.encode("utf-8"))
+        for campo in fields(obj):
+            h.update(campo.name.encode("utf-8"))
+            _atualizar_hash(h, getattr(obj, campo.name))
+    elif isinstance(obj, (list, tuple)):
+        h.update(f"{type(obj).__name__}[{len(obj)}]".encode("utf-8"))
+        for item in obj:
+            _atualizar_hash(h, item)
+    elif isinstance(obj, dict):
+        h.update(f"dict[{len(obj)}]".encode("utf-8"))
+        for chave in sorted(obj, key=repr):
+            _atualizar_hash(h, chave)
+            _atualizar_hash(h, obj[chave])
+    else:
+        h.update(repr(obj).encode("utf-8"))
+
+def _hash_tarefa(funcao, args, perfil):
+    """Hash dos dados de entrada, do código da função, do perfil e do estilo."""
+    h = hashlib.sha256()
+    h.update(f"{funcao.__module__}.{funcao.__qualname__}".encode("utf-8"))
+    try:
+        h.update(inspect.getsource(funcao).encode("utf-8"))
+    except (OSError, TypeError):
+        pass
+    _atualizar_hash(h, args)
+    h.update(perfil.encode("utf-8"))
+    # O backend não altera o PNG gerado (e difere entre o processo principal e os workers)
+    estilo = sorted((chave, repr(valor)) for chave, valor in plt.rcParams.items()
+                    if not chave.startswith("backend"))
+    h.update(repr(estilo).encode("utf-8"))
+    return h.hexdigest()
+
+def _ler_manifesto(pasta):
+    try:
+        return json.loads((Path(pasta) / NOME_MANIFESTO).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+def _gravar_manifesto(pasta, manifesto):
+    destino = Path(pasta) / NOME_MANIFESTO
+    temporario = destino.with_name(f"{NOME_MANIFESTO}.{os.getpid()}.tmp")
+    temporario.write_text(json.dumps(manifesto, indent=1, sort_keys=True), encoding="utf-8")
+    os.replace(temporario, destino)
+
+def _executar_tarefa(funcao, args, perfil, estacao=None):
+    """Executa uma tarefa de gráfico (também usada dentro dos workers)."""
+    if perfil != _perfil_atual:
+        definir_perfil(perfil)
+    with instrumentacao.medir(f"grafico:{funcao.__name__}", estacao):
+        funcao(*args)
+        plt.close("all")
+
+def _executar_tarefa_em_worker(funcao, args, perfil, estacao=None):
+    """_executar_tarefa num worker, devolvendo as etapas medidas ao processo principal."""
+    instrumentacao.reiniciar()
+    _executar_tarefa(funcao, args, perfil, estacao)
+    return instrumentacao.coletar()
+
+def _inicializar_worker(perfil):
+    plt.switch_backend("Agg")
+    definir_perfil(perfil)
+
+class FilaRenderizacao:
+    """
+    Fila de tarefas de gráfico.
+
+    Cada tarefa é uma função de gráfico, seus argumentos (que precisam ser
+    serializáveis com pickle no modo paralelo) e os PNG que ela produz.
+    """
+
+    def __init__(self, workers=1, reaproveitar=True):
+        self.workers = workers
+        self.reaproveitar = reaproveitar
+        self._tarefas = []
+        self._pool = None
+
+    def adicionar(self, funcao, *args, saidas, estacao=None):
+        """
+        Enfileira `funcao(*args)`, que grava os arquivos listados em `saidas`.
+
+        `estacao` identifica a tarefa no relatório de instrumentação.
+        """
+        self._tarefas.append((funcao, args, [Path(s) for s in saidas], estacao))
+
+    def _obter_pool(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_inicializar_worker,
+                initargs=(_perfil_atual,),
+            )
+        return self._pool
+
+    def executar(self):
+        """
+        Executa as tarefas pendentes e esvazia a fila.
+
+        Retorna (renderizadas, reaproveitadas).
+        """
+        tarefas, self._tarefas = self._tarefas, []
+        manifestos = {}
+        pendentes = []
+        reaproveitadas = 0
+
+        for funcao, args, saidas, estacao in tarefas:
+            chave = _hash_tarefa(funcao, args, _perfil_atual)
+            for saida in saidas:
+                if saida.parent not in manifestos:
+                    manifestos[saida.parent] = _ler_manifesto(saida.parent)
+
+            atualizada = self.reaproveitar and all(
+                saida.exists() and manifestos[saida.parent].get(saida.name) == chave
+                for saida in saidas
+            )
+            if atualizada:
+                reaproveitadas += 1
+            else:
+                pendentes.append((funcao, args, saidas, chave, estacao))
+
+        if self.workers > 1 and len(pendentes) > 1:
+            pool = self._obter_pool()
+            futuros = [pool.submit(_executar_tarefa_em_worker, funcao, args, _perfil_atual, estacao)
+                       for funcao, args, _, _, estacao in pendentes]
+            for futuro in futuros:
+                instrumentacao.incorporar(futuro.result())
+        else:
+            for funcao, args, _, _, estacao in pendentes:
+                _executar_tarefa(funcao, args, _perfil_atual, estacao)
+
+        # Registrar os hashes só depois que todas as figuras foram gravadas
+        alteradas = set()
+        for _, _, saidas, chave, _ in pendentes:
+            for saida in saidas:
+                manifestos[saida.parent][saida.name] = chave
+                alteradas.add(saida.parent)
+        for pasta in alteradas:
+            _gravar_manifesto(pasta, manifestos[pasta])
+
+        return len(pendentes), reaproveitadas
+
+    def encerrar(self):
+        """Encerra o pool de processos, se houver."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
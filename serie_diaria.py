@@ -0,0 +1,203 @@
+"""
+Representação compacta da série diária de uma estação.
+
+Em vez do DataFrame de `carregar_dados` (data, precip, ano, mes, dia_mes,
+ano_mes como Period e pentada, uma linha por registro), a estação é guardada
+como um único vetor float32 sobre o calendário diário contínuo, com NaN nos dias
+sem dado, mais a data inicial. Ano, mês, dia e pentada são calculados sob demanda
+como inteiros pequenos, e as agregações usam np.add.reduceat / np.bincount.
+
+São ~4 bytes por dia (~160 KB para 110 anos), o que permite manter a rede
+inteira de estações em memória.
+
+Observação: os totais são somados em float64 a partir dos valores float32, então
+diferem dos de `calcular_agregados` na ordem de 1e-6 relativo.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from agregacao import AgregadosEstacao
+
+
+def _estatisticas(grupos, valores, n_grupos):
+    """Contagem, soma, média e desvio padrão (ddof=1) de `valores` por grupo (0..n_grupos-1)."""
+    n = np.bincount(grupos, minlength=n_grupos)
+    soma = np.bincount(grupos, weights=valores, minlength=n_grupos)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        media = soma / n
+        desvio_quad = (valores - media[grupos]) ** 2
+        m2 = np.bincount(grupos, weights=desvio_quad, minlength=n_grupos)
+        desvio = np.where(n > 1, np.sqrt(m2 / (n - 1)), np.nan)
+    return n, soma, np.where(n > 0, media, np.nan), desvio
+
+
+@dataclass
+class SerieDiaria:
+    """Precipitação diária (float32, NaN = sem dado) a partir de `inicio`."""
+
+    inicio: np.datetime64
+    precip: np.ndarray
+
+    @classmethod
+    def de_datas(cls, datas, precip):
+        """
+        Monta a série a partir de datas e valores soltos (em qualquer ordem).
+
+        Dias repetidos são somados; dias ausentes (e valores NaN) ficam NaN.
+        """
+        dias = np.asarray(datas, dtype="datetime64[D]")
+        valores = np.asarray(precip, dtype=np.float64)
+        validos = ~np.isnan(valores)
+        if len(dias) == 0:
+            raise ValueError("Série diária vazia")
+
+        inicio = dias.min()
+        posicao = (dias - inicio).astype(np.int64)
+        tamanho = int(posicao.max()) + 1
+
+        soma = np.bincount(posicao[validos], weights=valores[validos], minlength=tamanho)
+        n = np.bincount(posicao[validos], minlength=tamanho)
+        serie = np.where(n > 0, soma, np.nan).astype(np.float32)
+        return cls(inicio=inicio, precip=serie)
+
+    @classmethod
+    def de_dataframe(cls, df):
+        """Série a partir do DataFrame de `carregar_dados` (colunas data e precip)."""
+        return cls.de_datas(df["data"].to_numpy(), df["precip"].to_numpy())
+
+    def __len__(self):
+        return len(self.precip)
+
+    @property
+    def nbytes(self):
+        return self.precip.nbytes
+
+    # ===============================
+    # ÍNDICES DE CALENDÁRIO (sob demanda)
+    # ===============================
+    @property
+    def datas(self):
+        """Datas do calendário diário (datetime64[D])."""
+        return self.inicio + np.arange(len(self.precip))
+
+    @property
+    def indice_mes(self):
+        """Mês de cada dia, contado a partir do mês de `inicio` (int32)."""
+        meses = self.datas.astype("datetime64[M]")
+        return (meses - meses[0]).astype(np.int32)
+
+    @property
+    def ano(self):
+        return (self.datas.astype("datetime64[Y]").astype(np.int64) + 1970).astype(np.int16)
+
+    @property
+    def mes(self):
+        return (self.datas.astype("datetime64[M]").astype(np.int64) % 12 + 1).astype(np.int8)
+
+    @property
+    def dia_mes(self):
+        datas = self.datas
+        return ((datas - datas.astype("datetime64[M]")).astype(np.int64) + 1).astype(np.int8)
+
+    @property
+    def pentada(self):
+        """Pentada do mês (1-6; o dia 31 cai na pentada 7, como em carregar_dados)."""
+        return ((self.dia_mes.astype(np.int16) + 4) // 5).astype(np.int8)
+
+    def _limites_meses(self):
+        """Posição do primeiro dia de cada mês do calendário (para np.add.reduceat)."""
+        meses = np.arange(self.datas[0].astype("datetime64[M]"),
+                          self.datas[-1].astype("datetime64[M]") + 1)
+        return np.maximum((meses.astype("datetime64[D]") - self.inicio).astype(np.int64), 0), meses
+
+    # ===============================
+    # AGREGAÇÕES
+    # ===============================
+    def mensal(self):
+        """Série mensal no formato de AgregadosEstacao.mensal (meses sem nenhum dado são omitidos)."""
+        limites, meses = self._limites_meses()
+        validos = ~np.isnan(self.precip)
+        valores = np.where(validos, self.precip, 0).astype(np.float64)
+
+        n = np.add.reduceat(validos.astype(np.int64), limites)
+        soma = np.add.reduceat(valores, limites)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            media = soma / n
+            desvio_quad = np.where(validos, (valores - media[self.indice_mes]) ** 2, 0.0)
+            desvio = np.sqrt(np.add.reduceat(desvio_quad, limites) / (n - 1))
+        desvio[n < 2] = np.nan
+
+        com_dado = n > 0
+        ordinais = meses[com_dado].astype(np.int64)
+        ano_mes = pd.arrays.PeriodArray(ordinais, dtype=pd.PeriodDtype("M"))
+        mensal = pd.DataFrame({
+            "ano_mes": ano_mes,
+            "precip_total": soma[com_dado],
+            "n_dias": n[com_dado],
+            "media_diaria": media[com_dado],
+            "std_diaria": desvio[com_dado],
+        })
+        mensal["data"] = mensal["ano_mes"].dt.to_timestamp()
+        return mensal
+
+    def agregados(self):
+        """AgregadosEstacao completo (inclui os valores diários por mês e os dias com chuva)."""
+        validos = ~np.isnan(self.precip)
+        valores = self.precip[validos].astype(np.float64)
+        ano = self.ano[validos].astype(np.int64)
+        mes = self.mes[validos].astype(np.int64)
+        pentada = self.pentada[validos].astype(np.int64)
+
+        # Anual
+        ano0 = ano.min()
+        n_ano, soma_ano, _, _ = _estatisticas(ano - ano0, valores, ano.max() - ano0 + 1)
+        tem_ano = n_ano > 0
+        anual = pd.Series(soma_ano[tem_ano], name="precip",
+                          index=pd.Index(np.flatnonzero(tem_ano) + ano0, name="ano"))
+
+        # Climatologia por mês do ano
+        n_mes, _, media_mes, desvio_mes = _estatisticas(mes - 1, valores, 12)
+        tem_mes = n_mes > 0
+        climatologia = pd.DataFrame(
+            {"mean": media_mes[tem_mes], "std": desvio_mes[tem_mes]},
+            index=pd.Index(np.flatnonzero(tem_mes) + 1, name="mes"),
+        )
+
+        # Pentadas 1-6
+        ate_6 = pentada <= 6
+        n_p, soma_p, media_p, desvio_p = _estatisticas(pentada[ate_6] - 1, valores[ate_6], 6)
+        tem_p = n_p > 0
+        pentadal = pd.DataFrame({
+            "pentada": np.flatnonzero(tem_p) + 1,
+            "precip_total": soma_p[tem_p],
+            "media_diaria": media_p[tem_p],
+            "std_diaria": desvio_p[tem_p],
+            "n_dias": n_p[tem_p],
+        })
+
+        # Ano x pentada (1-7)
+        chave = (ano - ano0) * 7 + (pentada - 1)
+        n_ap, soma_ap, _, _ = _estatisticas(chave, valores, (ano.max() - ano0 + 1) * 7)
+        tem_ap = np.flatnonzero(n_ap > 0)
+        pentadal_anual = pd.DataFrame({
+            "ano": tem_ap // 7 + ano0,
+            "pentada": tem_ap % 7 + 1,
+            "precip": soma_ap[tem_ap],
+        })
+
+        # Valores diários por mês do ano (mesma ordem estável de _separar_por_mes)
+        ordem = np.argsort(mes, kind="stable")
+        por_mes = np.split(valores[ordem], np.searchsorted(mes[ordem], np.arange(2, 13)))
+
+        return AgregadosEstacao(
+            mensal=self.mensal(),
+            anual=anual,
+            climatologia=climatologia,
+            pentadal=pentadal,
+            pentadal_anual=pentadal_anual,
+            por_mes=por_mes,
+            dias_com_chuva=valores[valores > 0],
+        )
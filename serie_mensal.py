@@ -0,0 +1,118 @@
+"""
+Formato binário da série mensal de uma estação, trocado entre os scripts.
+
+main.py grava, em output/graficos/<pasta>/:
+
+- serie_mensal_<pasta>.npy: array estruturado, um registro por mês do
+  calendário contínuo (calendario.py), com `periodo` (datetime64[M]),
+  `precip_mm` (float64, NaN nos meses sem dado) e `n_dias` (dias com dado);
+- serie_mensal_<pasta>.json: metadados (nome da estação, pasta, arquivo de
+  origem, primeiro e último mês, número de meses, versão do formato).
+
+comparacao.py, glm_predicao.py e exemplo_arima.py abrem o .npy por memmap: as
+datas já vêm tipadas, sem reler texto nem converter strings "AAAA-MM". O CSV
+serie_temporal_mensal_arima_<pasta>.csv continua disponível como exportação
+opcional (`python main.py --csv`) para uso fora do projeto.
+
+Na leitura, completude (n_dias / dias do mês) e completo (completude >=
+limiar) são derivados de n_dias.
+"""
+
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from calendario import LIMIAR_COMPLETUDE, alinhar_mensal, completude
+
+# ===============================
+# CONFIGURAÇÕES
+# ===============================
+# Incrementar quando o layout mudar
+VERSAO_SERIE = 2
+
+DTYPE_SERIE = np.dtype([("periodo", "datetime64[M]"), ("precip_mm", "<f8"), ("n_dias", "<i2")])
+
+
+def caminho_serie(pasta_saida, pasta_estacao):
+    """Caminho do .npy da estação (o .json de metadados tem o mesmo nome)."""
+    return Path(pasta_saida) / f"serie_mensal_{pasta_estacao}.npy"
+
+def _gravar_atomico(destino, gravar):
+    temporario = destino.with_name(f".{destino.name}.{os.getpid()}.tmp")
+    with open(temporario, "wb") as f:
+        gravar(f)
+    os.replace(temporario, destino)
+
+def gravar_serie_mensal(mensal_df, pasta_saida, pasta_estacao, metadados=None):
+    """
+    Grava a série mensal (AgregadosEstacao.mensal) no calendário mensal contínuo.
+
+    `metadados` (dict) vai para o .json junto com o período da série. Retorna
+    os caminhos (.npy, .json).
+    """
+    alinhada = alinhar_mensal(mensal_df)
+    serie = np.empty(len(alinhada), dtype=DTYPE_SERIE)
+    serie["periodo"] = alinhada["ano_mes"].array.asi8.astype("datetime64[M]")
+    serie["precip_mm"] = alinhada["precip_total"].to_numpy(dtype=np.float64)
+    serie["n_dias"] = alinhada["n_dias"].to_numpy()
+
+    destino = caminho_serie(pasta_saida, pasta_estacao)
+    indice = {
+        "versao": VERSAO_SERIE,
+        "pasta": pasta_estacao,
+        **(metadados or {}),
+        "inicio": str(serie["periodo"][0]) if len(serie) else None,
+        "fim": str(serie["periodo"][-1]) if len(serie) else None,
+        "meses": len(serie),
+        "meses_com_dado": int(np.count_nonzero(serie["n_dias"])),
+    }
+    _gravar_atomico(destino, lambda f: np.save(f, serie))
+    destino_indice = destino.with_suffix(".json")
+    _gravar_atomico(destino_indice,
+                    lambda f: f.write(json.dumps(indice, indent=1, ensure_ascii=False).encode("utf-8")))
+    return destino, destino_indice
+
+def abrir_serie_mensal(pasta_saida, pasta_estacao):
+    """Array estruturado da estação (memmap somente leitura) e metadados; None se não existe."""
+    destino = caminho_serie(pasta_saida, pasta_estacao)
+    if not destino.exists():
+        return None
+    indice = json.loads(destino.with_suffix(".json").read_text(encoding="utf-8"))
+    if indice.get("versao") != VERSAO_SERIE:
+        raise ValueError(f"{destino} tem versão {indice.get('versao')} (esperada {VERSAO_SERIE})")
+    return np.load(destino, mmap_mode="r"), indice
+
+def ler_serie_mensal(pasta_saida, pasta_estacao, limiar=LIMIAR_COMPLETUDE):
+    """
+    Série mensal como DataFrame; None se não existe.
+
+    Colunas: periodo (datetime), precip_mm, n_dias, completude e completo
+    (completude >= limiar). Os metadados do .json ficam em `df.attrs`.
+    """
+    aberta = abrir_serie_mensal(pasta_saida, pasta_estacao)
+    if aberta is None:
+        return None
+    serie, indice = aberta
+    df = pd.DataFrame({
+        "periodo": serie["periodo"].astype("datetime64[ns]"),
+        "precip_mm": serie["precip_mm"],
+        "n_dias": serie["n_dias"],
+        "completude": completude(serie["n_dias"], serie["periodo"]),
+    })
+    df["completo"] = df["completude"] >= limiar
+    df.attrs.update(indice)
+    return df
+
+def exportar_csv(mensal_df, pasta_saida, pasta_estacao):
+    """
+    Exportação opcional em CSV no calendário contínuo: periodo (AAAA-MM),
+    precip_mm (vazio nos meses sem dado), n_dias e completude.
+    """
+    tabela = alinhar_mensal(mensal_df)[["ano_mes", "precip_total", "n_dias", "completude"]]
+    tabela.columns = ["periodo", "precip_mm", "n_dias", "completude"]
+    arquivo_csv = Path(pasta_saida) / f"serie_temporal_mensal_arima_{pasta_estacao}.csv"
+    tabela.to_csv(arquivo_csv, index=False, sep=",")
+    return arquivo_csv
@@ -0,0 +1,99 @@
+"""
+Leitura das estações: o parser C (engine="c") deve aceitar e converter
+exatamente as mesmas linhas que o laço original (engine="python").
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from main import _ler_tabela_em_blocos, _posicionar_apos_cabecalho, carregar_dados
+
+PREAMBULO = "Estacao X\nCodigo 1234\n\nData Precip\n"
+
+# Uma linha de cada caso que o laço original trata de forma particular
+CORPO_MISTO = "\n".join([
+    "01/01/2000   1,5",
+    "",
+    "02/01/2000   2.5",                 # ponto decimal
+    "03/01/2000",                       # linha curta
+    "04/01/2000   ---",                 # não numérico
+    "05/01/2000   nan",                 # float("nan") é aceito
+    "06/01/2000   NaN   obs",
+    "07/01/2000   3,0   x   y",         # colunas extras
+    "08/01/2000   1_0",                 # float("1_0") == 10.0
+    "09/01/2000\xa04,5",                # separado por NBSP
+    "10/01/2000\xa0abc 7,0",            # NBSP: a precipitação é "abc"
+    "11/01/2000\x0c1e1",                # form feed
+    "12/01/2000   -0,5",
+    "   ",
+    "13/01/2000   +inf",
+    "14/01/2000   6,25",
+]) + "\n"
+
+
+def _gravar(tmp_path, corpo, nome="estacao.txt"):
+    caminho = tmp_path / nome
+    caminho.write_text(PREAMBULO + corpo, encoding="latin1")
+    return caminho
+
+def _comparar(df_c, df_python):
+    pd.testing.assert_frame_equal(df_c, df_python, check_dtype=False)
+
+
+def test_engines_iguais_com_linhas_irregulares(tmp_path):
+    caminho = _gravar(tmp_path, CORPO_MISTO)
+    df_c = carregar_dados(caminho, engine="c")
+    df_python = carregar_dados(caminho, engine="python")
+
+    _comparar(df_c, df_python)
+    assert df_c["data"].dt.day.tolist() == [1, 2, 5, 6, 7, 8, 9, 11, 12, 13, 14]
+    np.testing.assert_array_equal(
+        df_c["precip"].to_numpy(),
+        [1.5, 2.5, np.nan, np.nan, 3.0, 10.0, 4.5, 10.0, -0.5, np.inf, 6.25],
+    )
+
+def test_engines_iguais_so_com_ponto_decimal(tmp_path):
+    # Regressão: coluna toda convertida no caminho não numérico quebrava o filtro
+    caminho = _gravar(tmp_path, "01/01/2000 1.5\n02/01/2000 2.5\n")
+    df_c = carregar_dados(caminho, engine="c")
+
+    _comparar(df_c, carregar_dados(caminho, engine="python"))
+    assert df_c["precip"].tolist() == [1.5, 2.5]
+
+def test_engines_iguais_so_com_virgula_decimal(tmp_path):
+    caminho = _gravar(tmp_path, "01/01/2000 1,5\n02/01/2000 0\n03/01/2000\n")
+    _comparar(carregar_dados(caminho, engine="c"), carregar_dados(caminho, engine="python"))
+
+def test_leitura_em_blocos_igual_ao_laco(tmp_path):
+    caminho = _gravar(tmp_path, CORPO_MISTO)
+    with open(caminho, encoding="latin1") as arquivo:
+        _posicionar_apos_cabecalho(arquivo, caminho)
+        blocos = pd.concat(list(_ler_tabela_em_blocos(arquivo, linhas_por_bloco=3)), ignore_index=True)
+
+    df_python = carregar_dados(caminho, engine="python")
+    assert blocos["data"].tolist() == df_python["data"].dt.strftime("%d/%m/%Y").tolist()
+    np.testing.assert_array_equal(blocos["precip"].to_numpy(), df_python["precip"].to_numpy())
+
+def test_sem_dados_levanta_erro(tmp_path):
+    caminho = _gravar(tmp_path, "\n---\n")
+    for engine in ("c", "python"):
+        with pytest.raises(ValueError, match="Nenhum dado"):
+            carregar_dados(caminho, engine=engine)
+
+def test_engines_iguais_com_nbsp_em_todas_as_linhas(tmp_path):
+    # Nenhuma linha tem dois campos para o parser C
+    caminho = _gravar(tmp_path, "01/01/2000\xa01,5\n02/01/2000\xa02\n")
+    df_c = carregar_dados(caminho, engine="c")
+
+    _comparar(df_c, carregar_dados(caminho, engine="python"))
+    assert df_c["precip"].tolist() == [1.5, 2.0]
+
+def test_bloco_so_com_linhas_curtas(tmp_path):
+    # O último bloco só tem linhas de um campo (rodapé)
+    caminho = _gravar(tmp_path, "01/01/2000 1,5\n02/01/2000 2,5\nFim\n---\n")
+    with open(caminho, encoding="latin1") as arquivo:
+        _posicionar_apos_cabecalho(arquivo, caminho)
+        blocos = list(_ler_tabela_em_blocos(arquivo, linhas_por_bloco=2))
+
+    assert [len(bloco) for bloco in blocos] == [2, 0]
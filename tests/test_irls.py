@@ -0,0 +1,99 @@
+"""
+IRLS em lote (irls.py): os coeficientes devem coincidir com os de
+statsmodels `GLM(...).fit()` nas famílias e ligações usadas pelo projeto.
+"""
+
+import warnings
+
+import numpy as np
+import pytest
+import statsmodels.api as sm
+
+from irls import ajustar_irls
+
+TOLERANCIA_RELATIVA = 1e-9
+
+
+def _serie_mensal(semente, meses=120):
+    """Matriz [1, t, mes, y_(t-1)] e precipitação mensal Gamma com ciclo sazonal."""
+    rng = np.random.default_rng(semente)
+    mes = np.tile(np.arange(1, 13), meses // 12).astype(float)
+    t = np.arange(meses, dtype=float)
+    media = 10 + 120 * (np.cos(2 * np.pi * (mes - 1) / 12) + 1)
+    y = rng.gamma(0.8, media / 0.8) + 0.1
+    X = np.column_stack([np.ones(meses), t, mes, np.r_[y[0], y[:-1]]])
+    return X, y
+
+def _statsmodels(X, y, familia, pesos=None):
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return sm.GLM(y, X, family=familia, freq_weights=pesos).fit()
+
+def _comparar(params, esperado):
+    np.testing.assert_allclose(params, esperado, rtol=TOLERANCIA_RELATIVA, atol=0)
+
+
+def test_gamma_inversa_com_iteracao_negativa():
+    # Regressão: a primeira iteração tem mu <= 0 em linhas usadas; o desvio
+    # virava NaN e o modelo parava sem convergir, com os parâmetros da iteração 1
+    X, y = _serie_mensal(semente=0)
+    primeira = ajustar_irls(X, y, familia="gamma", max_iteracoes=1)
+    assert (primeira.prever(X) <= 0).any()
+
+    ajuste = ajustar_irls(X, y, familia="gamma")
+    esperado = _statsmodels(X, y, sm.families.Gamma())
+
+    assert ajuste.convergiu.all()
+    assert ajuste.iteracoes[0] == esperado.fit_history["iteration"]
+    _comparar(ajuste.params[0], esperado.params)
+    np.testing.assert_allclose(ajuste.escala[0], esperado.scale, rtol=1e-9)
+
+def test_gamma_log():
+    X, y = _serie_mensal(semente=4)
+    ajuste = ajustar_irls(X, y, familia="gamma", ligacao="log")
+    esperado = _statsmodels(X, y, sm.families.Gamma(link=sm.families.links.Log()))
+
+    assert ajuste.convergiu.all()
+    assert ajuste.iteracoes[0] == esperado.fit_history["iteration"]
+    _comparar(ajuste.params[0], esperado.params)
+
+def test_gaussiana():
+    X, y = _serie_mensal(semente=2)
+    ajuste = ajustar_irls(X, y, familia="gaussian")
+    esperado = _statsmodels(X, y, sm.families.Gaussian())
+
+    assert ajuste.convergiu.all()
+    _comparar(ajuste.params[0], esperado.params)
+    np.testing.assert_allclose(ajuste.escala[0], esperado.scale, rtol=1e-9)
+
+@pytest.mark.parametrize("familia, familia_sm", [
+    ("gamma", sm.families.Gamma()),
+    ("gaussian", sm.families.Gaussian()),
+])
+def test_pesos_de_frequencia(familia, familia_sm):
+    # Contagens de reamostragem (como no bootstrap) e janelas 0/1 (como no backtest), em lote
+    X, y = _serie_mensal(semente=3)
+    rng = np.random.default_rng(3)
+    contagens = rng.poisson(1.0, size=(4, len(y))).astype(float)
+    janelas = (np.arange(len(y)) < np.array([[60], [84], [108]])).astype(float)
+    pesos = np.vstack([contagens, janelas])
+
+    ajuste = ajustar_irls(X, y, pesos, familia=familia)
+
+    assert ajuste.convergiu.all()
+    for params, peso in zip(ajuste.params, pesos):
+        usar = peso > 0
+        _comparar(params, _statsmodels(X[usar], y[usar], familia_sm, peso[usar]).params)
+
+def test_backtest_de_30_anos_converge():
+    # Janelas expansivas sobre 30 anos: com a ligação inversa, quase todas as
+    # origens passavam por mu <= 0 antes da correção do desvio
+    X, y = _serie_mensal(semente=4, meses=360)
+    origens = np.arange(60, len(y), 25)
+    pesos = (np.arange(len(y)) < origens[:, None]).astype(float)
+
+    ajuste = ajustar_irls(X, y, pesos, familia="gamma")
+
+    assert ajuste.convergiu.all()
+    for params, o in zip(ajuste.params, origens):
+        _comparar(params, _statsmodels(X[:o], y[:o], sm.families.Gamma()).params)